@@ -0,0 +1,56 @@
+from email.utils import format_datetime, parsedate_to_datetime
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Type
+from fastapi import Request, Response
+from pydantic import BaseModel, TypeAdapter
+
+@lru_cache(maxsize=None)
+def _list_adapter(model: Type[BaseModel]) -> TypeAdapter:
+    return TypeAdapter(List[model])
+
+def dump_model_list(model: Type[BaseModel], items: Iterable[Any], from_attributes: bool = False) -> bytes:
+    """
+    JSON bytes for a list of `model` instances, rendered by pydantic-core.
+    With `from_attributes`, `items` are ORM rows read into `model` first.
+    """
+    adapter = _list_adapter(model)
+    if from_attributes:
+        items = adapter.validate_python(items, from_attributes=True)
+    return adapter.dump_json(items)
+
+def model_list_response(model: Type[BaseModel], items: Iterable[Any], from_attributes: bool = False) -> Response:
+    """
+    Serializes a list of `model` instances straight to JSON bytes with pydantic-core,
+    skipping FastAPI's response_model pass (validate, dump to dicts, then encode).
+    Keep response_model on the route so the OpenAPI schema still describes the body.
+    """
+    return Response(dump_model_list(model, items, from_attributes), media_type="application/json")
+
+def _not_modified(request: Request, etag: str, last_modified) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # If-None-Match takes precedence; GET compares weakly (W/ prefixes ignored)
+        tags = [t.strip().removeprefix("W/") for t in if_none_match.split(",")]
+        return "*" in tags or etag in tags
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return last_modified <= parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+    return False
+
+def cached_json_response(request: Request, entry: Dict[str, Any]) -> Response:
+    """
+    Serves a pre-rendered body ({"body", "etag", "last_modified"}) with validators,
+    answering 304 Not Modified when the client's copy is current.
+    Clients may reuse their copy but must revalidate it on every use.
+    """
+    headers = {
+        "ETag": entry["etag"],
+        "Last-Modified": format_datetime(entry["last_modified"], usegmt=True),
+        "Cache-Control": "public, no-cache",
+    }
+    if _not_modified(request, entry["etag"], entry["last_modified"]):
+        return Response(status_code=304, headers=headers)
+    return Response(entry["body"], media_type="application/json", headers=headers)
@@ -1,9 +1,12 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.exc import IntegrityError
 from sqlmodel import Session, select
 from app.core.db import get_session
-from app.models.base import Appointment, User, UserRole, AppointmentStatus
+from app.models.base import Appointment, User, UserRole, AppointmentStatus, DoctorProfile
 from app.api.deps import get_current_user
-from app.schemas.appointment import AppointmentCreate
+from app.api.responses import model_list_response
+from app.schemas.appointment import AppointmentCreate, AppointmentRead, BulkStatusUpdate, BulkStatusResult
+from typing import List
 from datetime import datetime, timezone
 from uuid import UUID
 
@@ -19,9 +22,11 @@ def create_appointment(
     if current_user.role != UserRole.PATIENT:
         raise HTTPException(status_code=403, detail="Only patients can book appointments")
     
+    from app.services.slot_service import SlotService
+
     # Validate scheduled time is not in the past (allow same-day future times)
-    now = datetime.now(timezone.utc)
-    if payload.scheduled_at < now:
+    scheduled_at = SlotService.to_utc(payload.scheduled_at)
+    if scheduled_at < SlotService.to_utc(datetime.now(timezone.utc)):
         raise HTTPException(status_code=400, detail="Cannot book appointment in the past")
     
     # Merge symptoms from reason or notes
@@ -33,19 +38,32 @@ def create_appointment(
     doctor = session.get(User, payload.doctor_id)
     if not doctor or doctor.role != UserRole.DOCTOR:
         raise HTTPException(status_code=404, detail="Doctor not found")
+    profile = session.exec(select(DoctorProfile).where(DoctorProfile.user_id == doctor.id)).first()
+    if not profile:
+        raise HTTPException(status_code=404, detail="Doctor not found")
+    if not SlotService.is_slot_start(profile, scheduled_at):
+        raise HTTPException(status_code=400, detail="scheduled_at is not a slot in the doctor's working hours")
+    if SlotService.has_overlap(session, doctor.id, scheduled_at, profile.slot_minutes):
+        raise HTTPException(status_code=409, detail="Slot already booked")
     
     # Create appointment
     appointment = Appointment(
         patient_id=payload.patient_id,
         doctor_id=payload.doctor_id,
         doctor_name=payload.doctor_name,
-        scheduled_at=payload.scheduled_at,
+        scheduled_at=scheduled_at,
+        duration_minutes=profile.slot_minutes,
         reason=symptoms,
         status=AppointmentStatus.SCHEDULED
     )
     
     session.add(appointment)
-    session.commit()
+    try:
+        session.commit()
+    except IntegrityError:
+        # uq_appointments_doctor_slot / ex_appointments_doctor_overlap: a concurrent booking won
+        session.rollback()
+        raise HTTPException(status_code=409, detail="Slot already booked")
     session.refresh(appointment)
     
     return {
@@ -55,7 +73,7 @@ def create_appointment(
         "doctor_name": appointment.doctor_name
     }
 
-@router.get("/me")
+@router.get("/me", response_model=List[AppointmentRead])
 def get_my_appointments(
     session: Session = Depends(get_session),
     current_user: User = Depends(get_current_user)
@@ -66,7 +84,25 @@ def get_my_appointments(
         statement = select(Appointment).where(Appointment.doctor_id == current_user.id)
     else:
         statement = select(Appointment)
-    return session.exec(statement).all()
+    return model_list_response(AppointmentRead, session.exec(statement).all(), from_attributes=True)
+
+@router.patch("/status", response_model=BulkStatusResult)
+def bulk_update_status(
+    payload: BulkStatusUpdate,
+    session: Session = Depends(get_session),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Front desk batch check-in / no-show marking. Each change succeeds or fails
+    on its own; results come back in request order.
+    """
+    from app.services.appointment_service import AppointmentService
+
+    if current_user.role not in [UserRole.DOCTOR, UserRole.FRONT_DESK]:
+        raise HTTPException(status_code=403, detail="Insufficient permissions")
+
+    results = AppointmentService.bulk_update_status(session, [(c.id, c.status) for c in payload.changes])
+    return {"updated": sum(1 for r in results if r["ok"]), "results": results}
 
 @router.patch("/{id}/status")
 def update_status(
@@ -78,12 +114,27 @@ def update_status(
     if current_user.role not in [UserRole.DOCTOR, UserRole.FRONT_DESK]:
         raise HTTPException(status_code=403, detail="Insufficient permissions")
     
+    from app.services.appointment_service import AppointmentService
+    from app.services.slot_service import SlotService
+
     appointment = session.get(Appointment, id)
     if not appointment:
         raise HTTPException(status_code=404, detail="Appointment not found")
+    error = AppointmentService.transition_error(appointment.status, new_status)
+    if error:
+        raise HTTPException(status_code=409, detail=error)
+    if SlotService.retakes_slot(appointment.status, new_status) and SlotService.has_overlap(
+        session, appointment.doctor_id, appointment.scheduled_at, appointment.duration_minutes, exclude_id=appointment.id
+    ):
+        raise HTTPException(status_code=409, detail="Slot already booked")
     
     appointment.status = new_status
     appointment.updated_at = datetime.now(timezone.utc)
     session.add(appointment)
-    session.commit()
+    try:
+        session.commit()
+    except IntegrityError:
+        # Reviving a booking whose slot was taken since
+        session.rollback()
+        raise HTTPException(status_code=409, detail="Slot already booked")
     return {"message": f"Status updated to {new_status}"}
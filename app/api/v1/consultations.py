@@ -1,13 +1,22 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, BackgroundTasks, Header
+from fastapi.responses import StreamingResponse
 from sqlmodel import Session, select
-from app.core.db import get_session
-from app.models.base import Consultation, ConsultationStatus, Appointment, User, UserRole, AudioFile, SOAPNote, AudioUploaderType
+from app.core.db import engine, get_session
+from app.core.config import settings
+from app.models.base import Consultation, ConsultationStatus, ProcessingStage, Appointment, User, UserRole, AudioFile, SOAPNote, AudioUploaderType, PipelineSpan
 from app.api.deps import get_current_user, RoleChecker
+from app.api.responses import model_list_response
+from app.schemas.consultation import ConsultationRead
+from app.services.event_service import soap_events
+from app.services.tracing_service import emit_span
 from pydantic import BaseModel
-from typing import Optional, List, Any
+from typing import Optional, List
 from uuid import UUID, uuid4
+import asyncio
 import os
+import json
 import shutil
+import time
 
 router = APIRouter()
 
@@ -20,18 +29,9 @@ class ConsultationCreate(BaseModel):
     patient_id: Optional[UUID] = None # Optional if doctor creates it and patient is inferred from appointment
     notes: Optional[str] = None
 
-class ConsultationRead(BaseModel):
-    id: UUID
-    status: ConsultationStatus
-    patient_id: UUID
-    doctor_id: UUID
-    appointment_id: UUID
-    appointment: Optional[Any] = None
-    audio_file: Optional[Any] = None
-    soap_note: Optional[Any] = None
-
-    class Config:
-        orm_mode = True
+class STTWebhookPayload(BaseModel):
+    transcript_id: str
+    status: str
 
 @router.post("/", response_model=Consultation)
 def create_consultation(
@@ -64,6 +64,28 @@ def create_consultation(
 
 from sqlalchemy.orm import selectinload
 
+# Registered before /{id} so "me" is not parsed as a consultation id
+@router.get("/me", response_model=List[ConsultationRead])
+def get_my_consultations(
+    session: Session = Depends(get_session),
+    current_user: User = Depends(get_current_user)
+):
+    if current_user.role == UserRole.PATIENT:
+        statement = select(Consultation).where(Consultation.patient_id == current_user.id)
+    elif current_user.role == UserRole.DOCTOR:
+        statement = select(Consultation).where(Consultation.doctor_id == current_user.id)
+    else:
+        statement = select(Consultation)
+        
+    results = session.exec(
+        statement.options(
+            selectinload(Consultation.audio_file), 
+            selectinload(Consultation.soap_note),
+            selectinload(Consultation.appointment)
+        )
+    ).all()
+    return model_list_response(ConsultationRead, results, from_attributes=True)
+
 @router.get("/{id}", response_model=ConsultationRead) # Returning DB model direct for now, includes relationships
 def get_consultation(
     id: UUID,
@@ -90,28 +112,116 @@ def get_consultation(
          # Doctors can view their own patients' consultations
          pass 
          
-    return consultation
+    # Old transcripts / SOAP JSON live in the archive; list endpoints return them as null
+    from app.services.archive_service import ArchiveService
+    return ArchiveService.rehydrate(session, consultation)
 
-@router.get("/me", response_model=List[ConsultationRead])
-def get_my_consultations(
+FINAL_EVENTS = {ConsultationStatus.COMPLETED: "completed", ConsultationStatus.FAILED: "failed"}
+
+def _soap_snapshot(id: UUID) -> Optional[dict]:
+    """Status and persisted SOAP sections, read on a short-lived session (run it in a thread)."""
+    with Session(engine) as session:
+        consultation = session.get(Consultation, id)
+        if not consultation:
+            return None
+        soap_note = session.exec(select(SOAPNote).where(SOAPNote.consultation_id == id)).first()
+        if soap_note and soap_note.archived_at:
+            from app.services.archive_service import ArchiveService
+            ArchiveService.rehydrate_soap_note(session, soap_note)
+        return {
+            "patient_id": consultation.patient_id,
+            "doctor_id": consultation.doctor_id,
+            "status": consultation.status,
+            "sections": dict(soap_note.soap_json or {}) if soap_note else {},
+        }
+
+def _sse(event: dict) -> str:
+    return f"data: {json.dumps(event)}\n\n"
+
+@router.get("/{id}/soap/stream")
+async def stream_soap_note(
+    id: UUID,
     session: Session = Depends(get_session),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(RoleChecker([UserRole.DOCTOR, UserRole.PATIENT]))
 ):
-    if current_user.role == UserRole.PATIENT:
-        statement = select(Consultation).where(Consultation.patient_id == current_user.id)
-    elif current_user.role == UserRole.DOCTOR:
-        statement = select(Consultation).where(Consultation.doctor_id == current_user.id)
-    else:
-        statement = select(Consultation)
-        
-    results = session.exec(
-        statement.options(
-            selectinload(Consultation.audio_file), 
-            selectinload(Consultation.soap_note),
-            selectinload(Consultation.appointment)
-        )
-    ).all()
-    return results
+    """
+    Server-Sent Events feed of SOAP sections as the AI pipeline produces them.
+    Sections already persisted are replayed first, then live sections follow
+    until a "completed" or "failed" event. Idle streams get keepalive comments
+    and re-check the database, since the run may live in another worker.
+    """
+    # The auth lookup's session would otherwise hold a pooled connection for the whole stream
+    session.close()
+
+    # Subscribe before reading the snapshot so no section falls in between
+    queue = soap_events.subscribe(id)
+    try:
+        snapshot = await asyncio.to_thread(_soap_snapshot, id)
+        if not snapshot:
+            raise HTTPException(status_code=404, detail="Consultation not found")
+        owner_id = snapshot["patient_id"] if current_user.role == UserRole.PATIENT else snapshot["doctor_id"]
+        if owner_id != current_user.id:
+            raise HTTPException(status_code=403, detail="Not authorized")
+    except BaseException:
+        soap_events.unsubscribe(id, queue)
+        raise
+    sent = snapshot["sections"]
+
+    async def event_stream():
+        try:
+            for section, text in sent.items():
+                yield _sse({"event": "section", "section": section, "text": text})
+            if snapshot["status"] in FINAL_EVENTS:
+                yield _sse({"event": FINAL_EVENTS[snapshot["status"]]})
+                return
+            loop = asyncio.get_running_loop()
+            idle_since = loop.time()
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=settings.SSE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    if loop.time() - idle_since >= settings.SSE_IDLE_POLL_SECONDS:
+                        idle_since = loop.time()
+                        latest = await asyncio.to_thread(_soap_snapshot, id)
+                        if latest is None:
+                            return
+                        if latest["status"] in FINAL_EVENTS:
+                            for section, text in latest["sections"].items():
+                                if sent.get(section) != text:
+                                    yield _sse({"event": "section", "section": section, "text": text})
+                            yield _sse({"event": FINAL_EVENTS[latest["status"]]})
+                            return
+                    yield ": keepalive\n\n"
+                    continue
+                idle_since = loop.time()
+                if event.get("event") == "section":
+                    # Skip sections already sent from the snapshot
+                    if sent.get(event["section"]) == event["text"]:
+                        continue
+                    sent[event["section"]] = event["text"]
+                yield _sse(event)
+                if event.get("event") in ("completed", "failed"):
+                    return
+        finally:
+            soap_events.unsubscribe(id, queue)
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+@router.post("/stt/webhook")
+async def stt_webhook(
+    payload: STTWebhookPayload,
+    x_webhook_secret: Optional[str] = Header(default=None)
+):
+    """
+    AssemblyAI completion webhook. Wakes the waiting transcription immediately
+    instead of waiting for the next poll tick.
+    """
+    if settings.ASSEMBLYAI_WEBHOOK_SECRET and x_webhook_secret != settings.ASSEMBLYAI_WEBHOOK_SECRET:
+        raise HTTPException(status_code=401, detail="Invalid webhook secret")
+
+    from app.services.assemblyai_client import get_assemblyai_client
+    resolved = await get_assemblyai_client().handle_webhook(payload.transcript_id)
+    return {"received": True, "resolved": resolved}
 
 @router.post("/{id}/upload")
 async def upload_audio(
@@ -121,6 +231,7 @@ async def upload_audio(
     session: Session = Depends(get_session),
     current_user: User = Depends(RoleChecker([UserRole.DOCTOR, UserRole.PATIENT]))
 ):
+    upload_started = time.perf_counter()
     consultation = session.get(Consultation, id)
     if not consultation:
         raise HTTPException(status_code=404, detail="Consultation not found")
@@ -150,13 +261,48 @@ async def upload_audio(
     )
     session.add(audio_file)
     
-    # Update Status
+    # Update Status (new audio - the pipeline starts from the beginning)
     consultation.status = ConsultationStatus.IN_PROGRESS
+    consultation.processing_stage = ProcessingStage.PENDING
     session.add(consultation)
+    upload_span = PipelineSpan(
+        consultation_id=id,
+        stage="upload",
+        duration_ms=(time.perf_counter() - upload_started) * 1000,
+        bytes=os.path.getsize(file_path),
+        detail={"mime_type": file.content_type}
+    )
+    session.add(upload_span)
     session.commit()
+    emit_span(upload_span)
     
     # Trigger Background Task
     from app.services.consultation_processor import process_consultation_flow
     background_tasks.add_task(process_consultation_flow, consultation.id)
 
     return {"message": "Audio uploaded, processing started", "audio_id": file_id}
+
+@router.post("/{id}/retry")
+async def retry_processing(
+    id: UUID,
+    background_tasks: BackgroundTasks,
+    session: Session = Depends(get_session),
+    current_user: User = Depends(RoleChecker([UserRole.DOCTOR, UserRole.FRONT_DESK]))
+):
+    """
+    Re-runs AI processing for a failed consultation, resuming after the
+    last completed stage (a finished transcription is not redone).
+    """
+    consultation = session.get(Consultation, id)
+    if not consultation:
+        raise HTTPException(status_code=404, detail="Consultation not found")
+    if consultation.status == ConsultationStatus.COMPLETED:
+        raise HTTPException(status_code=409, detail="Consultation already processed")
+    from app.services.consultation_processor import holds_live_lease, process_consultation_flow
+    # An expired lease is a run that died mid-pipeline; claim_consultation lets the retry take it over
+    if holds_live_lease(consultation):
+        raise HTTPException(status_code=409, detail="Consultation is already being processed")
+
+    background_tasks.add_task(process_consultation_flow, consultation.id)
+
+    return {"message": "Processing resumed", "resume_from": consultation.processing_stage}
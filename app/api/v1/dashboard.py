@@ -1,13 +1,34 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, BackgroundTasks, Query
 from sqlmodel import Session, select
-from typing import List, Dict, Any
-from datetime import datetime
+from pydantic import BaseModel
+from typing import List, Dict, Any, Optional
+from datetime import datetime, timedelta
 from app.core.db import get_session
-from app.models.base import Consultation, PatientProfile, ConsultationStatus
+from app.api.responses import model_list_response
+from app.api.deps import RoleChecker
+from app.models.base import Consultation, PatientProfile, ConsultationStatus, ProcessingStage, TriageCategory, User, UserRole
 
 router = APIRouter()
 
-@router.get("/queue/failed", response_model=List[Dict[str, Any]])
+class FailedQueueEntry(BaseModel):
+    patient_name: str
+    consultation_id: str
+    reason: str
+    last_completed_stage: Optional[ProcessingStage] = None
+    retry_count: int
+    next_retry_at: Optional[datetime] = None
+    wait_time: str
+    status: str
+
+class QueueEntry(BaseModel):
+    consultation_id: str
+    patient_name: str
+    urgency_score: int
+    triage_category: Optional[TriageCategory] = None
+    wait_time_minutes: int
+    safety_warnings: int
+
+@router.get("/queue/failed", response_model=List[FailedQueueEntry])
 def get_failed_queue(session: Session = Depends(get_session)):
     """
     Returns patients whose AI processing failed and require manual review.
@@ -29,16 +50,49 @@ def get_failed_queue(session: Session = Depends(get_session)):
              minutes = int(delta.total_seconds() / 60)
              wait_time = f"{minutes} min"
 
-        queue.append({
-            "patient_name": f"{profile.first_name} {profile.last_name}",
-            "consultation_id": str(consult.id),
-            "reason": "AI Processing Failed (Quota/Error)",
-            "wait_time": wait_time,
-            "status": "REQUIRES_REVIEW"
-        })
-    return queue
+        queue.append(FailedQueueEntry(
+            patient_name=f"{profile.first_name} {profile.last_name}",
+            consultation_id=str(consult.id),
+            reason=consult.processing_error or "AI Processing Failed (Quota/Error)",
+            last_completed_stage=consult.processing_stage,
+            retry_count=consult.retry_count,
+            next_retry_at=consult.next_retry_at,
+            wait_time=wait_time,
+            status="REQUIRES_REVIEW"
+        ))
+    return model_list_response(FailedQueueEntry, queue)
+
+@router.post("/queue/failed/retry")
+def retry_failed_queue(
+    background_tasks: BackgroundTasks,
+    current_user: User = Depends(RoleChecker([UserRole.DOCTOR, UserRole.FRONT_DESK]))
+):
+    """
+    Runs one retry sweep now, ignoring the off-peak window. Backoff,
+    attempt limits and provider quota still apply.
+    """
+    from app.services.retry_scheduler_service import RetrySchedulerService
+    background_tasks.add_task(RetrySchedulerService.sweep_once, True)
+    return {"message": "Retry sweep started"}
+
+@router.get("/analytics/ai", response_model=Dict[str, Any])
+def get_ai_analytics(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    bucket: str = Query("hour", pattern="^(hour|day)$"),
+    model_version: Optional[str] = None,
+    session: Session = Depends(get_session)
+):
+    """
+    AI call analytics from AILog: p50/p95/p99 latency, failure rate and
+    throughput per model and per time bucket. Defaults to the last 24 hours.
+    """
+    from app.services.analytics_service import AnalyticsService
+    end = end or datetime.utcnow()
+    start = start or end - timedelta(hours=24)
+    return AnalyticsService.get_ai_log_analytics(session, start, end, bucket, model_version)
 
-@router.get("/queue", response_model=List[Dict[str, Any]])
+@router.get("/queue", response_model=List[QueueEntry])
 def get_patient_queue(session: Session = Depends(get_session)):
     """
     Returns the prioritized patient queue for the dashboard.
@@ -62,13 +116,13 @@ def get_patient_queue(session: Session = Depends(get_session)):
             delta = datetime.utcnow() - consultation.created_at
             wait_time_min = int(delta.total_seconds() / 60)
 
-        queue.append({
-            "consultation_id": str(consultation.id),
-            "patient_name": f"{patient.first_name} {patient.last_name}",
-            "urgency_score": consultation.urgency_score or 0,
-            "triage_category": consultation.triage_category,
-            "wait_time_minutes": wait_time_min,
-            "safety_warnings": len(consultation.safety_warnings) if consultation.safety_warnings else 0
-        })
+        queue.append(QueueEntry(
+            consultation_id=str(consultation.id),
+            patient_name=f"{patient.first_name} {patient.last_name}",
+            urgency_score=consultation.urgency_score or 0,
+            triage_category=consultation.triage_category,
+            wait_time_minutes=wait_time_min,
+            safety_warnings=len(consultation.safety_warnings) if consultation.safety_warnings else 0
+        ))
     
-    return queue
+    return model_list_response(QueueEntry, queue)
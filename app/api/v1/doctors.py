@@ -1,34 +1,129 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlmodel import Session, select
+from pydantic import BaseModel, ConfigDict, Field
+from datetime import date, datetime, timedelta, timezone
+from typing import List, Optional
+from uuid import UUID
 from app.core.db import get_session
+from app.api.responses import dump_model_list, cached_json_response
+from app.services.doctor_directory_service import DoctorDirectoryService
 from app.models.base import User, DoctorProfile, UserRole
 
 router = APIRouter()
 
-@router.get("/")
-def get_doctors(session: Session = Depends(get_session)):
+class DoctorSummary(BaseModel):
+    id: UUID
+    first_name: str
+    last_name: str
+    specialization: Optional[str] = None
+    clinic_address: Optional[str] = None
+
+@router.get("/", response_model=List[DoctorSummary])
+def get_doctors(request: Request, session: Session = Depends(get_session)):
     """
     Get list of available doctors.
     Public endpoint - no authentication required.
+    Served from the directory cache with ETag/Last-Modified (304 when unchanged).
+    """
+    def build() -> bytes:
+        # Query doctors with their profiles
+        statement = (
+            select(User, DoctorProfile)
+            .join(DoctorProfile, User.id == DoctorProfile.user_id)
+            .where(User.role == UserRole.DOCTOR)
+            .where(DoctorProfile.is_available == True)
+        )
+
+        results = session.exec(statement).all()
+
+        doctors = []
+        for user, profile in results:
+            doctors.append(DoctorSummary(
+                id=user.id,
+                first_name=profile.first_name,
+                last_name=profile.last_name,
+                specialization=profile.specialization,
+                clinic_address=profile.clinic_address
+            ))
+        return dump_model_list(DoctorSummary, doctors)
+
+    return cached_json_response(request, DoctorDirectoryService.get("available", build))
+
+class DoctorSearchItem(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: UUID = Field(validation_alias="user_id") # The doctor's user id, as in the directory
+    first_name: str
+    last_name: str
+    specialization: Optional[str] = None
+    city: Optional[str] = None
+    clinic_address: Optional[str] = None
+    consultation_fee: Optional[float] = None
+    is_available: bool
+
+class DoctorSearchPage(BaseModel):
+    items: List[DoctorSearchItem]
+    next_cursor: Optional[str] = None
+
+@router.get("/search", response_model=DoctorSearchPage)
+def search_doctors(
+    q: Optional[str] = Query(None, max_length=100, description="Prefix of any word of the doctor's name"),
+    specialization: Optional[str] = None,
+    city: Optional[str] = None,
+    available: Optional[bool] = None,
+    min_fee: Optional[float] = Query(None, ge=0),
+    max_fee: Optional[float] = Query(None, ge=0),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    limit: int = Query(20, ge=1, le=100),
+    session: Session = Depends(get_session)
+):
     """
-    # Query doctors with their profiles
-    statement = (
-        select(User, DoctorProfile)
-        .join(DoctorProfile, User.id == DoctorProfile.user_id)
-        .where(User.role == UserRole.DOCTOR)
-        .where(DoctorProfile.is_available == True)
+    Searches the directory by name prefix and filters, ordered by name.
+    Public endpoint - no authentication required.
+    """
+    try:
+        page = DoctorDirectoryService.search(
+            session, q=q, specialization=specialization, city=city, available=available,
+            min_fee=min_fee, max_fee=max_fee, cursor=cursor, limit=limit
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return DoctorSearchPage(
+        items=[DoctorSearchItem.model_validate(p) for p in page["items"]],
+        next_cursor=page["next_cursor"],
+    )
+
+class DoctorSlots(BaseModel):
+    doctor_id: UUID
+    slot_minutes: int
+    slots: List[datetime] # Free slot starts, UTC
+
+@router.get("/{doctor_id}/slots", response_model=DoctorSlots)
+def get_free_slots(
+    doctor_id: UUID,
+    start: Optional[date] = Query(None, description="First clinic-local day (default today)"),
+    end: Optional[date] = Query(None, description="Last clinic-local day, inclusive (default start + 6 days)"),
+    session: Session = Depends(get_session)
+):
+    """
+    Free appointment slots of a doctor, to book with POST /appointments/.
+    Public endpoint - no authentication required.
+    """
+    from zoneinfo import ZoneInfo
+    from app.core.config import settings
+    from app.services.slot_service import SlotService
+
+    start = start or datetime.now(ZoneInfo(settings.CLINIC_TIMEZONE)).date()
+    end = end or start + timedelta(days=6)
+    if end < start or (end - start).days >= settings.SLOT_QUERY_MAX_DAYS:
+        raise HTTPException(status_code=400, detail=f"Date range must be 1 to {settings.SLOT_QUERY_MAX_DAYS} days")
+
+    profile = session.exec(select(DoctorProfile).where(DoctorProfile.user_id == doctor_id)).first()
+    if not profile:
+        raise HTTPException(status_code=404, detail="Doctor not found")
+    free = SlotService.free_slots(session, profile, start, end)
+    return DoctorSlots(
+        doctor_id=doctor_id,
+        slot_minutes=profile.slot_minutes,
+        slots=[slot.replace(tzinfo=timezone.utc) for slot in free],
     )
-    
-    results = session.exec(statement).all()
-    
-    doctors = []
-    for user, profile in results:
-        doctors.append({
-            "id": str(user.id),
-            "first_name": profile.first_name,
-            "last_name": profile.last_name,
-            "specialization": profile.specialization,
-            "clinic_address": profile.clinic_address
-        })
-    
-    return doctors
@@ -1,14 +1,28 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlmodel import Session, select
 from app.core.db import get_session
 from app.models.base import User, PatientProfile, UserRole
 from app.api.deps import get_current_user
+from app.api.responses import dump_model_list, cached_json_response
+from app.services.doctor_directory_service import DoctorDirectoryService
+from app.services.safety_service import SafetyService
 from pydantic import BaseModel
 from typing import Optional, List
 from datetime import datetime
 
 router = APIRouter()
 
+DOCTOR_PLACEHOLDER_IMAGE = "https://images.unsplash.com/photo-1559839734-2b71ea197ec2?w=150&h=150&fit=crop&crop=face"
+
+class DoctorListing(BaseModel):
+    id: str
+    email: str
+    first_name: str
+    last_name: str
+    specialization: Optional[str] = None
+    clinic_address: Optional[str] = None
+    image: str = DOCTOR_PLACEHOLDER_IMAGE
+
 class PatientProfileUpdate(BaseModel):
     first_name: Optional[str] = None
     last_name: Optional[str] = None
@@ -45,8 +59,13 @@ def update_my_profile(
         session.add(profile)
     
     profile_data = profile_in.dict(exclude_unset=True)
+    history_changed = "medical_history" in profile_data and profile_data["medical_history"] != profile.medical_history
     for key, value in profile_data.items():
         setattr(profile, key, value)
+
+    # Re-derive the condition index only when the free-text history actually changed
+    if history_changed or profile.condition_codes is None:
+        profile.condition_codes = SafetyService.extract_condition_codes(profile.medical_history)
         
     profile.updated_at = datetime.utcnow()
     session.add(profile)
@@ -67,31 +86,35 @@ def get_my_profile(
         raise HTTPException(status_code=404, detail="Profile not found")
     return profile
 
-@router.get("/doctors", response_model=List[dict])
+@router.get("/doctors", response_model=List[DoctorListing])
 def list_doctors(
+    request: Request,
     session: Session = Depends(get_session)
 ):
     """
     Returns a list of all doctors with their profiles.
+    Served from the directory cache with ETag/Last-Modified (304 when unchanged).
     """
     from app.models.base import DoctorProfile
-    
-    query = (
-        select(User, DoctorProfile)
-        .join(DoctorProfile, User.id == DoctorProfile.user_id)
-        .where(User.role == UserRole.DOCTOR)
-    )
-    results = session.exec(query).all()
-    
-    doctors = []
-    for user, profile in results:
-        doctors.append({
-            "id": str(user.id),
-            "email": user.email,
-            "first_name": profile.first_name,
-            "last_name": profile.last_name,
-            "specialization": profile.specialization,
-            "clinic_address": profile.clinic_address,
-            "image": f"https://images.unsplash.com/photo-1559839734-2b71ea197ec2?w=150&h=150&fit=crop&crop=face" # Placeholder
-        })
-    return doctors
+
+    def build() -> bytes:
+        query = (
+            select(User, DoctorProfile)
+            .join(DoctorProfile, User.id == DoctorProfile.user_id)
+            .where(User.role == UserRole.DOCTOR)
+        )
+        results = session.exec(query).all()
+
+        doctors = []
+        for user, profile in results:
+            doctors.append(DoctorListing(
+                id=str(user.id),
+                email=user.email,
+                first_name=profile.first_name,
+                last_name=profile.last_name,
+                specialization=profile.specialization,
+                clinic_address=profile.clinic_address
+            ))
+        return dump_model_list(DoctorListing, doctors)
+
+    return cached_json_response(request, DoctorDirectoryService.get("all", build))
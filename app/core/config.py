@@ -8,9 +8,88 @@ class Settings(BaseSettings):
     JWT_SECRET: str
     JWT_ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 1440
-    ASSEMBLYAI_API_KEY: str
+    STT_PROVIDER: str = "assemblyai" # assemblyai | local | replay
+    LOCAL_STT_MODEL: str = "base.en" # faster-whisper model size/path
+    LOCAL_STT_COMPUTE_TYPE: str = "int8"
+    LOCAL_STT_BEAM_SIZE: int = 1
+    LOCAL_STT_WORKERS: int = 2
+    ASSEMBLYAI_API_KEY: Optional[str] = None # Required when STT_PROVIDER=assemblyai
+    ASSEMBLYAI_BASE_URL: str = "https://api.assemblyai.com/v2"
+    ASSEMBLYAI_POLL_INTERVAL_SECONDS: float = 3.0
+    ASSEMBLYAI_WEBHOOK_URL: Optional[str] = None # Public URL of /api/v1/consultations/stt/webhook
+    ASSEMBLYAI_WEBHOOK_SECRET: Optional[str] = None
+    STT_TIMEOUT_SECONDS: float = 1800.0
+    STT_REPLAY_LATENCY_MS: float = 2000.0
+    STT_REPLAY_JITTER_MS: float = 500.0
+    STT_REPLAY_ERROR_RATE: float = 0.0
+    LLM_PROVIDER: str = "gemini" # gemini | local | replay
+    LOCAL_LLM_MODEL_PATH: Optional[str] = None # GGUF model for llama-cpp-python
+    LOCAL_LLM_CONTEXT: int = 8192
+    LOCAL_LLM_THREADS: Optional[int] = None
+    LLM_FIXTURE_PATH: str = "fixtures/mock_soap_data.json"
+    LLM_REPLAY_LATENCY_MS: float = 800.0
+    LLM_REPLAY_JITTER_MS: float = 200.0
+    LLM_REPLAY_ERROR_RATE: float = 0.0
     GOOGLE_API_KEY: Optional[str] = None
     GEMINI_API_KEY: Optional[str] = None
+    GEMINI_MODEL: str = "gemini-2.5-flash"
+    # Provider quotas (per process) and circuit breaker
+    GEMINI_REQUESTS_PER_MINUTE: float = 10
+    GEMINI_TOKENS_PER_MINUTE: float = 250000
+    ASSEMBLYAI_REQUESTS_PER_MINUTE: float = 60
+    CIRCUIT_FAILURE_THRESHOLD: int = 5
+    CIRCUIT_RESET_SECONDS: float = 60.0
+    CIRCUIT_TRIAL_TIMEOUT_SECONDS: float = 300.0 # A half-open trial silent this long counts as failed
+    # Transcripts above this many (estimated) tokens are map-reduced in chunks
+    PROMPT_TRANSCRIPT_TOKEN_BUDGET: int = 8000
+    # Audio pre-processing before STT (downmix/resample, silence compaction, Opus re-encode)
+    AUDIO_PREPROCESSING_ENABLED: bool = True
+    AUDIO_MIN_SILENCE_MS: int = 1000 # Only silences longer than this are compacted
+    AUDIO_KEEP_GAP_MS: int = 300 # Pause left in place of each compacted silence
+    AUDIO_OPUS_BITRATE: str = "24k"
+    # Long recordings are split at pauses and the chunks transcribed concurrently
+    STT_CHUNK_SECONDS: int = 120
+    STT_CHUNK_OVERLAP_MS: int = 2000
+    STT_CHUNK_CONCURRENCY: int = 4
+    # A pipeline run older than this is presumed dead and may be re-claimed
+    PROCESSING_LEASE_SECONDS: int = 2400
+    # SOAP SSE stream: comment line this often while idle; after this long without events, check the DB
+    SSE_KEEPALIVE_SECONDS: float = 15.0
+    SSE_IDLE_POLL_SECONDS: float = 60.0
+    # Automatic retries of the manual-review queue (exponential backoff, off-peak batches)
+    RETRY_SCHEDULER_ENABLED: bool = False
+    RETRY_SWEEP_INTERVAL_SECONDS: int = 300
+    RETRY_BATCH_SIZE: int = 5
+    RETRY_MAX_ATTEMPTS: int = 5
+    RETRY_BACKOFF_BASE_SECONDS: int = 900
+    RETRY_BACKOFF_MAX_SECONDS: int = 86400
+    RETRY_OFF_PEAK_START_HOUR: int = 19 # Local clinic time; the window may wrap midnight
+    RETRY_OFF_PEAK_END_HOUR: int = 7
+    CLINIC_TIMEZONE: str = "UTC"
+    # Appointment sweeper: SCHEDULED -> NO_SHOW after the grace period, reminder batches before the visit
+    APPOINTMENT_SWEEPER_ENABLED: bool = False
+    APPOINTMENT_SWEEP_INTERVAL_SECONDS: int = 300
+    APPOINTMENT_SWEEP_BATCH_SIZE: int = 500
+    APPOINTMENT_SWEEP_MAX_BATCHES: int = 20 # Per action and sweep; the rest waits for the next sweep
+    NO_SHOW_GRACE_MINUTES: int = 30
+    REMINDER_LEAD_MINUTES: int = 1440
+    REMINDER_SINK: str = "log" # log | webhook
+    REMINDER_WEBHOOK_URL: Optional[str] = None
+    SLOT_QUERY_MAX_DAYS: int = 31 # Widest date range GET /doctors/{id}/slots computes at once
+    # Retention tiering: old transcripts / SOAP JSON / AI logs move to compressed archived_payloads rows
+    ARCHIVE_ENABLED: bool = False
+    ARCHIVE_INTERVAL_SECONDS: int = 3600
+    ARCHIVE_AFTER_DAYS: int = 180 # Completed consultations' transcripts and SOAP JSON
+    AILOG_RETENTION_DAYS: int = 90 # Only rows already covered by the analytics rollups are archived
+    ARCHIVE_BATCH_SIZE: int = 200 # Rows moved per guarded UPDATE/DELETE and commit
+    # AI analytics rollups: refreshed in the background; each refresh re-aggregates this trailing window
+    ANALYTICS_ROLLUP_ENABLED: bool = False
+    ANALYTICS_ROLLUP_INTERVAL_SECONDS: int = 300
+    ANALYTICS_LATE_ROW_MINUTES: int = 120 # Longer than a pipeline run (AILog rows are committed at its end)
+    LOG_LEVEL: str = "INFO"
+    METRICS_ENABLED: bool = True # Prometheus /metrics; set PROMETHEUS_MULTIPROC_DIR when running several workers
+    # Public doctor directory: in-process cache lifetime (bounds staleness across workers)
+    DOCTOR_DIRECTORY_CACHE_SECONDS: int = 60
     UPLOAD_DIR: str = "uploads"
     CORS_ORIGINS: List[str] = ["*"]
     PORT: int = 8000
@@ -26,4 +105,10 @@ class Settings(BaseSettings):
             self.GOOGLE_API_KEY = self.GEMINI_API_KEY
         return self
 
+    @model_validator(mode='after')
+    def check_stt_provider(self):
+        if self.STT_PROVIDER.lower() == "assemblyai" and not self.ASSEMBLYAI_API_KEY:
+            raise ValueError("ASSEMBLYAI_API_KEY is required when STT_PROVIDER=assemblyai")
+        return self
+
 settings = Settings()
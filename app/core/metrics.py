@@ -0,0 +1,149 @@
+import os
+import time
+from typing import Dict, Tuple
+from prometheus_client import (
+    CollectorRegistry, Counter, Gauge, Histogram, REGISTRY, CONTENT_TYPE_LATEST, generate_latest, multiprocess
+)
+from sqlalchemy import event
+from starlette.requests import Request
+from starlette.responses import Response
+
+# Multi-worker deployments set PROMETHEUS_MULTIPROC_DIR (an empty, writable directory,
+# wiped on restart): every worker writes its samples there and /metrics merges them.
+MULTIPROCESS = "PROMETHEUS_MULTIPROC_DIR" in os.environ
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+STAGE_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 900)
+STATUS_CLASSES = ("1xx", "2xx", "3xx", "4xx", "5xx")
+PIPELINE_STAGES = ("upload", "queue_wait", "preprocess", "stt", "llm", "triage", "safety", "commit")
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template",
+    ["method", "route"], buckets=LATENCY_BUCKETS
+)
+HTTP_REQUESTS = Counter("http_requests_total", "HTTP responses by route and status class", ["method", "route", "status"])
+HTTP_IN_PROGRESS = Gauge("http_requests_in_progress", "HTTP requests being served", multiprocess_mode="livesum")
+
+DB_POOL_CHECKED_OUT = Gauge("db_pool_checked_out", "Database connections currently checked out", multiprocess_mode="livesum")
+DB_POOL_SIZE = Gauge("db_pool_size", "Configured database pool size", multiprocess_mode="livesum")
+
+PIPELINE_STAGE_DURATION = Histogram(
+    "pipeline_stage_duration_seconds", "Consultation pipeline stage durations",
+    ["stage", "status"], buckets=STAGE_BUCKETS
+)
+PIPELINE_RUNS_IN_PROGRESS = Gauge("pipeline_runs_in_progress", "Consultation pipeline runs in flight", multiprocess_mode="livesum")
+QUEUE_DEPTH = Gauge("consultation_queue_depth", "Consultations waiting per queue", ["queue"], multiprocess_mode="mostrecent")
+
+CACHE_REQUESTS = Counter("cache_requests_total", "In-process cache lookups", ["cache", "result"])
+APPOINTMENT_SWEEP = Counter("appointment_sweep_total", "Appointments handled by the sweeper", ["action"])
+PROVIDER_ERRORS = Counter("provider_errors_total", "AI provider call failures", ["provider", "kind"])
+PROVIDER_QUOTA_WAIT = Histogram(
+    "provider_quota_wait_seconds", "Time spent waiting for provider quota",
+    ["provider"], buckets=(0, 0.1, 0.5, 1, 5, 10, 30, 60, 120)
+)
+
+# Pre-bound children so hot paths never resolve labels
+_stage_children: Dict[Tuple[str, str], object] = {
+    (stage, status): PIPELINE_STAGE_DURATION.labels(stage, status)
+    for stage in PIPELINE_STAGES for status in ("SUCCESS", "FAIL")
+}
+_route_children: Dict[Tuple[str, object], tuple] = {}
+_unmatched = (HTTP_REQUEST_DURATION.labels("ANY", "unmatched"), {c: HTTP_REQUESTS.labels("ANY", "unmatched", c) for c in STATUS_CLASSES})
+
+def bind_routes(app):
+    """
+    Pre-binds per-route children, keyed by (method, endpoint), for every API route.
+    Call once after all routers are included.
+    """
+    for route in app.routes:
+        methods = getattr(route, "methods", None)
+        endpoint = getattr(route, "endpoint", None)
+        if not methods or endpoint is None:
+            continue
+        for method in methods:
+            _route_children[(method, endpoint)] = (
+                HTTP_REQUEST_DURATION.labels(method, route.path),
+                {c: HTTP_REQUESTS.labels(method, route.path, c) for c in STATUS_CLASSES},
+            )
+
+class PrometheusMiddleware:
+    """
+    Pure ASGI middleware: one perf_counter pair, a dict lookup and two
+    pre-bound observations per request. The route template comes from the
+    endpoint the router stored in the (shared) scope.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        HTTP_IN_PROGRESS.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            HTTP_IN_PROGRESS.dec()
+            histogram, counters = _route_children.get((scope["method"], scope.get("endpoint")), _unmatched)
+            histogram.observe(elapsed)
+            counters[STATUS_CLASSES[min(status[0] // 100, 5) - 1]].inc()
+
+def observe_stage(stage: str, status: str, duration_ms: float):
+    child = _stage_children.get((stage, status)) or PIPELINE_STAGE_DURATION.labels(stage, status)
+    child.observe(duration_ms / 1000)
+
+def cache_counters(cache: str) -> Tuple[object, object]:
+    """(hit, miss) counter children for an in-process cache."""
+    return CACHE_REQUESTS.labels(cache, "hit"), CACHE_REQUESTS.labels(cache, "miss")
+
+def instrument_engine(engine):
+    """Tracks checked-out connections through pool events (no polling)."""
+    size = getattr(engine.pool, "size", None)
+    if callable(size):
+        DB_POOL_SIZE.set(size())
+
+    @event.listens_for(engine, "checkout")
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        DB_POOL_CHECKED_OUT.inc()
+
+    @event.listens_for(engine, "checkin")
+    def on_checkin(dbapi_connection, connection_record):
+        DB_POOL_CHECKED_OUT.dec()
+
+def refresh_queue_depths():
+    # Cheap COUNT queries, run per scrape rather than per request
+    from sqlmodel import Session, select, func
+    from app.core.db import engine
+    from app.models.base import Consultation, ConsultationStatus
+    with Session(engine) as session:
+        manual = session.exec(
+            select(func.count()).select_from(Consultation).where(Consultation.requires_manual_review == True)
+        ).one()
+        processing = session.exec(
+            select(func.count()).select_from(Consultation).where(Consultation.status == ConsultationStatus.IN_PROGRESS)
+        ).one()
+    QUEUE_DEPTH.labels("manual_review").set(manual)
+    QUEUE_DEPTH.labels("in_progress").set(processing)
+
+def metrics_endpoint(request: Request) -> Response:
+    try:
+        refresh_queue_depths()
+    except Exception:
+        # Metrics must still render when the database is unavailable
+        pass
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
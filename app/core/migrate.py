@@ -0,0 +1,177 @@
+"""
+Idempotent schema upgrade for databases created before the current models.
+
+init_db() does not touch the schema, so columns, indexes and tables added to
+app/models/base.py reach an existing database only through this script:
+
+    python -m app.core.migrate             # apply
+    python -m app.core.migrate --dry-run   # report what would change, write nothing
+
+Every step checks the live schema first, so re-running is safe. Before the
+appointment slot constraints are built, active appointments that double-book a
+doctor are resolved by cancelling the later-booked rows (listed in the output).
+"""
+import argparse
+from datetime import datetime, timedelta
+from typing import Dict, List
+from sqlalchemy import Enum, inspect, text
+from sqlalchemy.engine import Connection, Engine
+from sqlmodel import SQLModel
+from app.models.base import ACTIVE_APPOINTMENT_SQL, APPOINTMENT_OVERLAP_DDL, DOCTOR_FTS_DDL
+
+# Columns added after the original schema, with the value existing rows get
+NEW_COLUMNS: Dict[str, Dict[str, str]] = {
+    "patient_profiles": {"condition_codes": None},
+    "doctor_profiles": {
+        "city": None,
+        "work_start": "'09:00:00'",
+        "work_end": "'17:00:00'",
+        "slot_minutes": "30",
+        "working_days": "'[0, 1, 2, 3, 4]'",
+    },
+    "appointments": {"duration_minutes": "30", "reminder_sent_at": None},
+    "consultations": {
+        "processing_stage": "'PENDING'",
+        "processing_started_at": None,
+        "processing_error": None,
+        "retry_count": "0",
+        "next_retry_at": None,
+    },
+    "audio_files": {"utterances": None, "transcription_confidence": None, "archived_at": None},
+    "soap_notes": {"archived_at": None},
+    "ai_logs": {"input_tokens": None, "tokens_saved": None},
+}
+
+# Created after the columns they cover; uq_appointments_doctor_slot only after the dedupe
+NEW_INDEXES = {
+    "doctor_profiles": [
+        "ix_doctor_profiles_city", "ix_doctor_profiles_consultation_fee",
+        "ix_doctor_profiles_name_order", "ix_doctor_profiles_specialization_name",
+    ],
+    "appointments": ["ix_appointments_status_scheduled_at", "uq_appointments_doctor_slot"],
+    "audio_files": ["ix_audio_files_uploaded_at"],
+    "soap_notes": ["ix_soap_notes_created_at"],
+    "ai_logs": ["ix_ai_logs_created_at"],
+}
+
+def add_columns(connection: Connection, actions: List[str], dry_run: bool):
+    dialect = connection.dialect
+    for table_name, columns in NEW_COLUMNS.items():
+        existing = {c["name"] for c in inspect(connection).get_columns(table_name)}
+        for name, default in columns.items():
+            if name in existing:
+                continue
+            column = SQLModel.metadata.tables[table_name].c[name]
+            ddl = f"ALTER TABLE {table_name} ADD COLUMN {name} {column.type.compile(dialect=dialect)}"
+            if default is not None:
+                ddl += f" DEFAULT {default}"
+                if not column.nullable:
+                    ddl += " NOT NULL"
+            actions.append(ddl)
+            if dry_run:
+                continue
+            if isinstance(column.type, Enum) and dialect.name == "postgresql":
+                column.type.create(connection, checkfirst=True)
+            connection.execute(text(ddl))
+            if (table_name, name) == ("consultations", "processing_stage"):
+                # Completed consultations went through every stage; a retry must not redo them
+                connection.execute(text("UPDATE consultations SET processing_stage = 'TRIAGED' WHERE status = 'COMPLETED'"))
+
+def cancel_double_bookings(connection: Connection, actions: List[str], dry_run: bool):
+    """Cancels active appointments overlapping an earlier active one of the same doctor."""
+    columns = {c["name"] for c in inspect(connection).get_columns("appointments")}
+    duration = "duration_minutes" if "duration_minutes" in columns else "30" # Dry run before add_columns
+    rows = connection.execute(text(
+        f"SELECT id, doctor_id, scheduled_at, {duration} AS duration_minutes FROM appointments "
+        f"WHERE {ACTIVE_APPOINTMENT_SQL} ORDER BY doctor_id, scheduled_at, created_at"
+    )).all()
+    conflicts = []
+    doctor, latest_end = None, None
+    for row in rows:
+        start = row.scheduled_at
+        if isinstance(start, str): # SQLite hands back the stored text for a textual query
+            start = datetime.fromisoformat(start)
+        end = start + timedelta(minutes=row.duration_minutes)
+        if row.doctor_id != doctor:
+            doctor, latest_end = row.doctor_id, end
+        elif start < latest_end:
+            conflicts.append(row.id)
+        else:
+            latest_end = max(latest_end, end)
+    for appointment_id in conflicts:
+        actions.append(f"Cancel double-booked appointment {appointment_id}")
+        if not dry_run:
+            connection.execute(
+                text("UPDATE appointments SET status = 'CANCELLED', notes = COALESCE(notes || ' ', '') || :note WHERE id = :id"),
+                {"id": appointment_id, "note": "[Cancelled by schema migration: overlapped an earlier booking]"},
+            )
+
+def create_indexes(connection: Connection, actions: List[str], dry_run: bool):
+    for table_name, names in NEW_INDEXES.items():
+        existing = {i["name"] for i in inspect(connection).get_indexes(table_name)}
+        table = SQLModel.metadata.tables[table_name]
+        for index in table.indexes:
+            if index.name in names and index.name not in existing:
+                actions.append(f"CREATE INDEX {index.name}")
+                if not dry_run:
+                    index.create(connection)
+
+def create_dialect_objects(connection: Connection, actions: List[str], dry_run: bool):
+    if dry_run:
+        return
+    if connection.dialect.name == "postgresql":
+        connection.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        connection.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_doctor_profiles_full_name_trgm ON doctor_profiles "
+            "USING gin (lower(first_name || ' ' || last_name) gin_trgm_ops)"
+        ))
+        exists = connection.execute(text(
+            "SELECT 1 FROM pg_constraint WHERE conname = 'ex_appointments_doctor_overlap'"
+        )).first()
+        if not exists:
+            for statement in APPOINTMENT_OVERLAP_DDL:
+                connection.execute(text(statement))
+            actions.append("ADD CONSTRAINT ex_appointments_doctor_overlap")
+    elif connection.dialect.name == "sqlite":
+        for statement in DOCTOR_FTS_DDL:
+            connection.execute(text(statement))
+        # Profiles written before the triggers existed
+        backfilled = connection.execute(text(
+            "INSERT INTO doctor_profiles_fts (profile_id, full_name) "
+            "SELECT id, first_name || ' ' || last_name FROM doctor_profiles "
+            "WHERE id NOT IN (SELECT profile_id FROM doctor_profiles_fts)"
+        )).rowcount
+        if backfilled:
+            actions.append(f"Indexed {backfilled} doctor profile(s) for name search")
+
+def migrate(engine: Engine, dry_run: bool = False) -> List[str]:
+    """Brings the schema up to the models. Returns the actions taken (or planned, with dry_run)."""
+    actions: List[str] = []
+    existing_tables = set(inspect(engine).get_table_names())
+    missing = [t for name, t in SQLModel.metadata.tables.items() if name not in existing_tables]
+    if missing:
+        actions += [f"CREATE TABLE {t.name}" for t in missing]
+        if not dry_run:
+            SQLModel.metadata.create_all(engine, tables=missing)
+
+    with engine.connect() as connection:
+        add_columns(connection, actions, dry_run)
+        cancel_double_bookings(connection, actions, dry_run)
+        create_indexes(connection, actions, dry_run)
+        create_dialect_objects(connection, actions, dry_run)
+        connection.commit()
+    return actions
+
+def main():
+    parser = argparse.ArgumentParser(description="Upgrade an existing database schema to the current models")
+    parser.add_argument("--dry-run", action="store_true", help="Report the changes without writing them")
+    args = parser.parse_args()
+
+    from app.core.db import engine
+    actions = migrate(engine, dry_run=args.dry_run)
+    for action in actions:
+        print(action)
+    print(f"{len(actions)} change(s) {'planned' if args.dry_run else 'applied'}" if actions else "Schema is up to date")
+
+if __name__ == "__main__":
+    main()
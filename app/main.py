@@ -1,9 +1,19 @@
+import logging
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from app.api.v1 import auth, users, appointments, consultations, dashboard, doctors
-from app.core.db import init_db
+from app.core.db import init_db, engine
+from app.core.config import settings
+from app.services.retry_scheduler_service import RetrySchedulerService
+from app.services.appointment_sweeper_service import AppointmentSweeperService
+from app.services.archive_service import ArchiveService
+from app.services.analytics_service import AnalyticsService
 
-app = FastAPI()
+logging.basicConfig(level=settings.LOG_LEVEL, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+# orjson renders the (pydantic-core serialized) response bodies
+app = FastAPI(default_response_class=ORJSONResponse)
 
 # CORS middleware
 app.add_middleware(
@@ -14,6 +24,11 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+if settings.METRICS_ENABLED:
+    from app.core.metrics import PrometheusMiddleware, instrument_engine
+    app.add_middleware(PrometheusMiddleware)
+    instrument_engine(engine)
+
 # Routers
 app.include_router(auth.router, prefix="/api/v1/auth", tags=["Auth"])
 app.include_router(users.router, prefix="/api/v1/users", tags=["Users"])
@@ -22,6 +37,26 @@ app.include_router(consultations.router, prefix="/api/v1/consultations", tags=["
 app.include_router(dashboard.router, prefix="/api/v1/dashboard", tags=["Dashboard"])
 app.include_router(doctors.router, prefix="/api/v1/doctors", tags=["Doctors"])
 
+if settings.METRICS_ENABLED:
+    from app.core.metrics import bind_routes, metrics_endpoint
+    app.add_route("/metrics", metrics_endpoint, include_in_schema=False)
+    bind_routes(app)
+
 @app.on_event("startup")
 def startup():
     init_db()
+    if settings.RETRY_SCHEDULER_ENABLED:
+        RetrySchedulerService.start()
+    if settings.APPOINTMENT_SWEEPER_ENABLED:
+        AppointmentSweeperService.start()
+    if settings.ARCHIVE_ENABLED:
+        ArchiveService.start()
+    if settings.ANALYTICS_ROLLUP_ENABLED:
+        AnalyticsService.start()
+
+@app.on_event("shutdown")
+async def shutdown():
+    await RetrySchedulerService.stop()
+    await AppointmentSweeperService.stop()
+    await ArchiveService.stop()
+    await AnalyticsService.stop()
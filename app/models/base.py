@@ -1,8 +1,9 @@
 from enum import Enum
-from datetime import datetime
+from datetime import datetime, time
 from typing import List, Optional
 from uuid import UUID, uuid4
-from sqlmodel import Field, SQLModel, Relationship, JSON, Column
+from sqlalchemy import DDL, Index, event, func, text
+from sqlmodel import Field, SQLModel, Relationship, JSON, Column, UniqueConstraint, LargeBinary
 
 class UserRole(str, Enum):
     PATIENT = "PATIENT"
@@ -52,6 +53,7 @@ class PatientProfile(SQLModel, table=True):
     state: Optional[str] = None
     zip_code: Optional[str] = None
     medical_history: Optional[str] = None # Added for Safety Service
+    condition_codes: Optional[List[str]] = Field(default=None, sa_column=Column(JSON)) # Derived from medical_history
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
@@ -59,6 +61,11 @@ class PatientProfile(SQLModel, table=True):
 
 class DoctorProfile(SQLModel, table=True):
     __tablename__ = "doctor_profiles"
+    __table_args__ = (
+        # Keyset pagination order (DoctorDirectoryService.search), alone and under the specialization filter
+        Index("ix_doctor_profiles_name_order", "last_name", "first_name", "id"),
+        Index("ix_doctor_profiles_specialization_name", "specialization", "last_name", "first_name", "id"),
+    )
     id: UUID = Field(default_factory=uuid4, primary_key=True)
     user_id: UUID = Field(foreign_key="users.id", unique=True)
     first_name: str
@@ -69,24 +76,78 @@ class DoctorProfile(SQLModel, table=True):
     qualification: Optional[str] = None
     phone_number: Optional[str] = None
     clinic_address: Optional[str] = None
-    consultation_fee: Optional[float] = None
+    city: Optional[str] = Field(default=None, index=True)
+    consultation_fee: Optional[float] = Field(default=None, index=True)
     bio: Optional[str] = None
     is_available: bool = Field(default=True)
+    # Bookable hours in CLINIC_TIMEZONE, cut into slot_minutes slots (SlotService)
+    work_start: time = Field(default=time(9, 0))
+    work_end: time = Field(default=time(17, 0))
+    slot_minutes: int = Field(default=30)
+    working_days: List[int] = Field(default_factory=lambda: [0, 1, 2, 3, 4], sa_column=Column(JSON)) # Monday = 0
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
     user: User = Relationship(back_populates="doctor_profile")
 
+# Name search. PostgreSQL: trigram index on the lower-cased full name (serves LIKE 'q%' and
+# LIKE '% q%'). SQLite: an FTS5 table kept in sync by triggers, queried with prefix tokens.
+Index(
+    "ix_doctor_profiles_full_name_trgm",
+    func.lower(DoctorProfile.first_name + " " + DoctorProfile.last_name).label("full_name"),
+    postgresql_using="gin",
+    postgresql_ops={"full_name": "gin_trgm_ops"},
+).ddl_if(dialect="postgresql")
+event.listen(
+    DoctorProfile.__table__, "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"),
+)
+DOCTOR_FTS_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS doctor_profiles_fts USING fts5(profile_id UNINDEXED, full_name)",
+    "CREATE TRIGGER IF NOT EXISTS doctor_profiles_fts_insert AFTER INSERT ON doctor_profiles BEGIN "
+    "INSERT INTO doctor_profiles_fts (profile_id, full_name) VALUES (new.id, new.first_name || ' ' || new.last_name); END",
+    "CREATE TRIGGER IF NOT EXISTS doctor_profiles_fts_update AFTER UPDATE OF first_name, last_name ON doctor_profiles BEGIN "
+    "DELETE FROM doctor_profiles_fts WHERE profile_id = old.id; "
+    "INSERT INTO doctor_profiles_fts (profile_id, full_name) VALUES (new.id, new.first_name || ' ' || new.last_name); END",
+    "CREATE TRIGGER IF NOT EXISTS doctor_profiles_fts_delete AFTER DELETE ON doctor_profiles BEGIN "
+    "DELETE FROM doctor_profiles_fts WHERE profile_id = old.id; END",
+)
+for _statement in DOCTOR_FTS_DDL:
+    event.listen(DoctorProfile.__table__, "after_create", DDL(_statement).execute_if(dialect="sqlite"))
+event.listen(
+    DoctorProfile.__table__, "after_drop",
+    DDL("DROP TABLE IF EXISTS doctor_profiles_fts").execute_if(dialect="sqlite"),
+)
+
+# Appointments that still hold their slot (completed / no-show history is left out so
+# legacy duplicates never block the constraints). SlotService checks the same set.
+ACTIVE_APPOINTMENT_STATUSES = (AppointmentStatus.SCHEDULED, AppointmentStatus.CHECKED_IN, AppointmentStatus.IN_PROGRESS)
+ACTIVE_APPOINTMENT_SQL = "status IN (" + ", ".join(f"'{s.value}'" for s in ACTIVE_APPOINTMENT_STATUSES) + ")"
+
 class Appointment(SQLModel, table=True):
     __tablename__ = "appointments"
+    __table_args__ = (
+        # One active booking per doctor and slot start; cancelling frees the slot.
+        # Also serves the free-slot range scan (SlotService.free_slots). Overlaps with
+        # other start times are rejected by SlotService.has_overlap and, on PostgreSQL,
+        # by the ex_appointments_doctor_overlap exclusion constraint below.
+        Index(
+            "uq_appointments_doctor_slot", "doctor_id", "scheduled_at", unique=True,
+            sqlite_where=text(ACTIVE_APPOINTMENT_SQL), postgresql_where=text(ACTIVE_APPOINTMENT_SQL),
+        ),
+        # Sweeper scans: due SCHEDULED appointments in scheduled_at order (AppointmentSweeperService)
+        Index("ix_appointments_status_scheduled_at", "status", "scheduled_at"),
+    )
     id: UUID = Field(default_factory=uuid4, primary_key=True)
     patient_id: UUID = Field(foreign_key="users.id")
     doctor_id: UUID = Field(foreign_key="users.id")
     doctor_name: Optional[str] = Field(default=None)
-    scheduled_at: datetime = Field(index=True)
+    scheduled_at: datetime = Field(index=True) # Naive UTC
+    duration_minutes: int = Field(default=30) # The doctor's slot_minutes at booking time
     reason: Optional[str] = None
     status: AppointmentStatus = Field(default=AppointmentStatus.SCHEDULED, index=True)
     notes: Optional[str] = None
+    reminder_sent_at: Optional[datetime] = None # Claimed by the sweeper before the reminder is emitted
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
@@ -100,6 +161,18 @@ class Appointment(SQLModel, table=True):
     )
     consultation: Optional["Consultation"] = Relationship(back_populates="appointment", sa_relationship_kwargs={"uselist": False})
 
+# PostgreSQL: no two active appointments of a doctor may overlap, whatever their start times
+# (covers legacy off-grid rows and slot-length changes). Needs btree_gist for doctor_id WITH =.
+APPOINTMENT_OVERLAP_DDL = [
+    "CREATE EXTENSION IF NOT EXISTS btree_gist",
+    """ALTER TABLE appointments ADD CONSTRAINT ex_appointments_doctor_overlap EXCLUDE USING gist (
+        doctor_id WITH =,
+        tsrange(scheduled_at, scheduled_at + make_interval(mins => duration_minutes)) WITH &&
+    ) WHERE (""" + ACTIVE_APPOINTMENT_SQL + ")",
+]
+for _statement in APPOINTMENT_OVERLAP_DDL:
+    event.listen(Appointment.__table__, "after_create", DDL(_statement).execute_if(dialect="postgresql"))
+
 class ConsultationStatus(str, Enum):
     SCHEDULED = "SCHEDULED"
     IN_PROGRESS = "IN_PROGRESS"
@@ -107,6 +180,13 @@ class ConsultationStatus(str, Enum):
     CANCELLED = "CANCELLED"
     FAILED = "FAILED"
 
+class ProcessingStage(str, Enum):
+    # Last AI pipeline stage that completed; a retry resumes after it
+    PENDING = "PENDING"
+    TRANSCRIBED = "TRANSCRIBED"
+    SOAP_GENERATED = "SOAP_GENERATED"
+    TRIAGED = "TRIAGED"
+
 class TriageCategory(str, Enum):
     CRITICAL = "CRITICAL"
     HIGH = "HIGH"
@@ -129,6 +209,11 @@ class Consultation(SQLModel, table=True):
     triage_category: Optional[TriageCategory] = None
     safety_warnings: Optional[List[dict]] = Field(default=None, sa_column=Column(JSON))
     requires_manual_review: bool = Field(default=False)
+    processing_stage: ProcessingStage = Field(default=ProcessingStage.PENDING)
+    processing_started_at: Optional[datetime] = None # Lease held by the running pipeline
+    processing_error: Optional[str] = None # Why the last run FAILED, shown in the manual-review queue
+    retry_count: int = Field(default=0) # Automatic retries made by the scheduler
+    next_retry_at: Optional[datetime] = None
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
@@ -152,7 +237,10 @@ class AudioFile(SQLModel, table=True):
     duration: Optional[float] = None
     mime_type: Optional[str] = None
     transcription: Optional[str] = None # Text field
-    uploaded_at: datetime = Field(default_factory=datetime.utcnow)
+    utterances: Optional[List[dict]] = Field(default=None, sa_column=Column(JSON)) # Kept so SOAP generation can resume without re-transcribing
+    transcription_confidence: Optional[float] = None
+    uploaded_at: datetime = Field(default_factory=datetime.utcnow, index=True)
+    archived_at: Optional[datetime] = None # transcription/utterances moved to archived_payloads (ArchiveService)
 
     consultation: Consultation = Relationship(back_populates="audio_file")
 
@@ -165,8 +253,9 @@ class SOAPNote(SQLModel, table=True):
     confidence: Optional[float] = None
     generated_by_ai: bool = Field(default=True)
     reviewed_by_doctor: bool = Field(default=False)
-    created_at: datetime = Field(default_factory=datetime.utcnow)
+    created_at: datetime = Field(default_factory=datetime.utcnow, index=True)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
+    archived_at: Optional[datetime] = None # soap_json moved to archived_payloads (ArchiveService)
 
     consultation: Consultation = Relationship(back_populates="soap_note")
 
@@ -177,5 +266,47 @@ class AILog(SQLModel, table=True):
     model_version: str
     status: str # SUCCESS, FAIL
     latency_ms: Optional[float] = None
+    input_tokens: Optional[int] = None # Estimated prompt tokens sent
+    tokens_saved: Optional[int] = None # Saved by transcript compaction
+    error_message: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow, index=True)
+
+class ArchivedPayload(SQLModel, table=True):
+    __tablename__ = "archived_payloads"
+    __table_args__ = (Index("ix_archived_payloads_kind_source", "kind", "source_id"),)
+    id: UUID = Field(default_factory=uuid4, primary_key=True)
+    kind: str # transcript (AudioFile id), soap_note (SOAPNote id), ai_logs (consultation id, JSONL)
+    source_id: Optional[UUID] = None
+    codec: str # zstd or zlib
+    payload: bytes = Field(sa_column=Column(LargeBinary, nullable=False)) # Compressed JSON / JSONL
+    row_count: int = Field(default=1)
+    archived_at: datetime = Field(default_factory=datetime.utcnow)
+
+class AILogRollup(SQLModel, table=True):
+    """Hourly pre-aggregate of ai_logs per model, maintained by AnalyticsService."""
+    __tablename__ = "ai_log_rollups"
+    __table_args__ = (UniqueConstraint("bucket_start", "model_version"),)
+    id: UUID = Field(default_factory=uuid4, primary_key=True)
+    bucket_start: datetime = Field(index=True)
+    model_version: str
+    requests: int = 0
+    failures: int = 0
+    latency_count: int = 0 # Rows with a latency
+    latency_sum_ms: float = 0.0
+    latency_histogram: Optional[List[int]] = Field(default=None, sa_column=Column(JSON)) # Cumulative counts per LATENCY_EDGES_MS bound
+
+class PipelineSpan(SQLModel, table=True):
+    __tablename__ = "pipeline_spans"
+    id: UUID = Field(default_factory=uuid4, primary_key=True)
+    consultation_id: UUID = Field(foreign_key="consultations.id", index=True)
+    stage: str = Field(index=True) # upload, queue_wait, preprocess, stt, llm, triage, safety, commit
+    status: str = "SUCCESS" # SUCCESS, FAIL
+    started_at: datetime = Field(default_factory=datetime.utcnow)
+    duration_ms: float = 0.0
+    bytes: Optional[int] = None
+    input_tokens: Optional[int] = None
+    output_tokens: Optional[int] = None
+    retries: Optional[int] = None
+    detail: Optional[dict] = Field(default=None, sa_column=Column(JSON)) # Stage-specific extras (model, chunks, ...)
     error_message: Optional[str] = None
     created_at: datetime = Field(default_factory=datetime.utcnow)
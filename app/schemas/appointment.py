@@ -1,7 +1,8 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict, Field
 from uuid import UUID
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
+from app.models.base import AppointmentStatus
 
 class AppointmentCreate(BaseModel):
     patient_id: UUID
@@ -10,3 +11,36 @@ class AppointmentCreate(BaseModel):
     scheduled_at: datetime
     reason: Optional[str] = None
     notes: Optional[str] = None
+
+class AppointmentRead(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: UUID
+    patient_id: UUID
+    doctor_id: UUID
+    doctor_name: Optional[str] = None
+    scheduled_at: datetime
+    duration_minutes: int
+    reason: Optional[str] = None
+    status: AppointmentStatus
+    notes: Optional[str] = None
+    reminder_sent_at: Optional[datetime] = None
+    created_at: datetime
+    updated_at: datetime
+
+class AppointmentStatusChange(BaseModel):
+    id: UUID
+    status: AppointmentStatus
+
+class BulkStatusUpdate(BaseModel):
+    changes: List[AppointmentStatusChange] = Field(min_length=1, max_length=500)
+
+class StatusChangeResult(BaseModel):
+    id: UUID
+    ok: bool
+    status: Optional[AppointmentStatus] = None # Status after the request; None if unknown
+    detail: Optional[str] = None
+
+class BulkStatusResult(BaseModel):
+    updated: int
+    results: List[StatusChangeResult]
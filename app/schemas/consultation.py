@@ -0,0 +1,50 @@
+from pydantic import BaseModel, ConfigDict
+from uuid import UUID
+from datetime import datetime
+from typing import List, Optional
+from app.models.base import AudioUploaderType, ConsultationStatus, ProcessingStage
+from app.schemas.appointment import AppointmentRead
+
+class AudioFileRead(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: UUID
+    consultation_id: UUID
+    uploaded_by: AudioUploaderType
+    file_name: str
+    file_url: str
+    file_size: Optional[int] = None
+    duration: Optional[float] = None
+    mime_type: Optional[str] = None
+    transcription: Optional[str] = None
+    utterances: Optional[List[dict]] = None
+    transcription_confidence: Optional[float] = None
+    uploaded_at: datetime
+    archived_at: Optional[datetime] = None
+
+class SOAPNoteRead(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: UUID
+    consultation_id: UUID
+    soap_json: Optional[dict] = None
+    risk_flags: Optional[dict] = None
+    confidence: Optional[float] = None
+    generated_by_ai: bool
+    reviewed_by_doctor: bool
+    created_at: datetime
+    updated_at: datetime
+    archived_at: Optional[datetime] = None
+
+class ConsultationRead(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: UUID
+    status: ConsultationStatus
+    processing_stage: Optional[ProcessingStage] = None
+    patient_id: UUID
+    doctor_id: UUID
+    appointment_id: UUID
+    appointment: Optional[AppointmentRead] = None
+    audio_file: Optional[AudioFileRead] = None
+    soap_note: Optional[SOAPNoteRead] = None
@@ -0,0 +1,216 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import List, Dict, Any, Optional, Sequence
+from sqlalchemy import case, delete
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, select, func
+from app.core.config import settings
+from app.core.db import engine
+from app.models.base import AILog, AILogRollup
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (ms) of the cumulative latency histogram kept per rollup; merged
+# histograms give percentiles for any range without touching raw rows
+LATENCY_EDGES_MS = (250, 500, 1000, 2000, 3000, 5000, 7500, 10000, 15000, 20000, 30000, 45000, 60000, 120000)
+PERCENTILES = (0.5, 0.95, 0.99)
+BUCKET_SECONDS = {"hour": 3600, "day": 86400}
+
+class AnalyticsService:
+    """
+    AILog analytics over hourly pre-aggregates (ai_log_rollups).
+
+    Rollups are computed in SQL (GROUP BY hour, model) and refreshed
+    incrementally by a background task (ANALYTICS_ROLLUP_INTERVAL_SECONDS), never
+    by the report itself. Each refresh re-aggregates from the last stored hour
+    or the trailing ANALYTICS_LATE_ROW_MINUTES, whichever is older: AILog rows
+    carry the time of the call but are committed at the end of the pipeline run,
+    so they can land in an hour that was already rolled up.
+    Percentiles for every bucket size and for whole-range summaries come from
+    the merged per-hour latency histograms, so an hour and the day it rolls
+    into are estimated the same way.
+    """
+    _task: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def histogram_percentile(cumulative: Sequence[int], total: int, q: float) -> Optional[float]:
+        """
+        Percentile from cumulative bucket counts (count <= LATENCY_EDGES_MS[i]),
+        interpolated within the bucket. Values past the last bound report that bound.
+        """
+        if not total:
+            return None
+        rank = q * total
+        prev_edge, prev_count = 0.0, 0
+        for edge, count in zip(LATENCY_EDGES_MS, cumulative):
+            if count >= rank:
+                if count == prev_count:
+                    return float(edge)
+                return prev_edge + (edge - prev_edge) * (rank - prev_count) / (count - prev_count)
+            prev_edge, prev_count = float(edge), count
+        return float(LATENCY_EDGES_MS[-1])
+
+    @staticmethod
+    def _hour_expression(is_postgres: bool):
+        if is_postgres:
+            return func.date_trunc("hour", AILog.created_at)
+        return func.strftime("%Y-%m-%d %H:00:00", AILog.created_at)
+
+    @staticmethod
+    def _as_datetime(value) -> datetime:
+        return value if isinstance(value, datetime) else datetime.fromisoformat(value)
+
+    @staticmethod
+    def rescan_from(session: Session, now: Optional[datetime] = None) -> Optional[datetime]:
+        """
+        First hour the next refresh re-aggregates (None: nothing rolled up yet).
+        Rows older than this are final in the rollups; the archiver relies on it.
+        """
+        latest = session.exec(select(func.max(AILogRollup.bucket_start))).one()
+        if latest is None:
+            return None
+        late = (now or datetime.utcnow()) - timedelta(minutes=settings.ANALYTICS_LATE_ROW_MINUTES)
+        return min(AnalyticsService._as_datetime(latest), late.replace(minute=0, second=0, microsecond=0))
+
+    @staticmethod
+    def refresh_rollups(session: Session, now: Optional[datetime] = None) -> int:
+        """
+        Rebuilds the rollups from rescan_from onwards. Returns the number of rollup rows written.
+        """
+        is_postgres = session.get_bind().dialect.name == "postgresql"
+        watermark = AnalyticsService.rescan_from(session, now)
+        hour = AnalyticsService._hour_expression(is_postgres).label("bucket")
+
+        columns = [
+            hour,
+            AILog.model_version,
+            func.count(),
+            func.sum(case((AILog.status == "FAIL", 1), else_=0)),
+            func.count(AILog.latency_ms),
+            func.coalesce(func.sum(AILog.latency_ms), 0.0),
+        ]
+        columns += [func.sum(case((AILog.latency_ms <= edge, 1), else_=0)) for edge in LATENCY_EDGES_MS]
+
+        statement = select(*columns).group_by(hour, AILog.model_version)
+        if watermark is not None:
+            statement = statement.where(AILog.created_at >= watermark)
+        rows = session.exec(statement).all()
+
+        rollups = []
+        for row in rows:
+            bucket, model, requests, failures, latency_count, latency_sum = row[:6]
+            rollups.append(AILogRollup(
+                bucket_start=AnalyticsService._as_datetime(bucket),
+                model_version=model,
+                requests=requests,
+                failures=int(failures or 0),
+                latency_count=latency_count,
+                latency_sum_ms=float(latency_sum or 0.0),
+                latency_histogram=[int(c or 0) for c in row[6:]],
+            ))
+
+        if watermark is not None:
+            session.execute(delete(AILogRollup).where(AILogRollup.bucket_start >= watermark))
+        session.add_all(rollups)
+        try:
+            session.commit()
+        except IntegrityError:
+            # A concurrent refresh wrote the same hours first; its rows are equivalent
+            session.rollback()
+            return 0
+        return len(rollups)
+
+    @staticmethod
+    def _summarize(rows: List[AILogRollup], seconds: float) -> Dict[str, Any]:
+        requests = sum(r.requests for r in rows)
+        failures = sum(r.failures for r in rows)
+        latency_count = sum(r.latency_count for r in rows)
+        merged = [sum(col) for col in zip(*(r.latency_histogram or [0] * len(LATENCY_EDGES_MS) for r in rows))]
+        percentiles = [AnalyticsService.histogram_percentile(merged, latency_count, q) for q in PERCENTILES]
+        return {
+            "requests": requests,
+            "failures": failures,
+            "failure_rate": round(failures / requests, 4) if requests else 0.0,
+            "throughput_per_minute": round(requests / (seconds / 60), 4) if seconds > 0 else None,
+            "avg_latency_ms": round(sum(r.latency_sum_ms for r in rows) / latency_count, 1) if latency_count else None,
+            "p50_latency_ms": round(percentiles[0], 1) if percentiles[0] is not None else None,
+            "p95_latency_ms": round(percentiles[1], 1) if percentiles[1] is not None else None,
+            "p99_latency_ms": round(percentiles[2], 1) if percentiles[2] is not None else None,
+        }
+
+    @staticmethod
+    def get_ai_log_analytics(
+        session: Session,
+        start: datetime,
+        end: datetime,
+        bucket: str = "hour",
+        model_version: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Per-model summary and per-bucket series for [start, end), read from the
+        rollups as of the last background refresh.
+        """
+        start = start.replace(minute=0, second=0, microsecond=0)
+        statement = (
+            select(AILogRollup)
+            .where(AILogRollup.bucket_start >= start)
+            .where(AILogRollup.bucket_start < end)
+            .order_by(AILogRollup.bucket_start, AILogRollup.model_version)
+        )
+        if model_version:
+            statement = statement.where(AILogRollup.model_version == model_version)
+        rows = session.exec(statement).all()
+
+        by_model: Dict[str, List[AILogRollup]] = {}
+        by_bucket: Dict[tuple, List[AILogRollup]] = {}
+        for row in rows:
+            key = row.bucket_start if bucket == "hour" else row.bucket_start.replace(hour=0)
+            by_model.setdefault(row.model_version, []).append(row)
+            by_bucket.setdefault((key, row.model_version), []).append(row)
+
+        range_seconds = (end - start).total_seconds()
+        return {
+            "start": start,
+            "end": end,
+            "bucket": bucket,
+            "models": [
+                {"model_version": model, **AnalyticsService._summarize(model_rows, range_seconds)}
+                for model, model_rows in by_model.items()
+            ],
+            "series": [
+                {"bucket_start": key, "model_version": model, **AnalyticsService._summarize(bucket_rows, BUCKET_SECONDS[bucket])}
+                for (key, model), bucket_rows in by_bucket.items()
+            ],
+        }
+
+    @staticmethod
+    def refresh_once() -> int:
+        with Session(engine) as session:
+            return AnalyticsService.refresh_rollups(session)
+
+    @staticmethod
+    async def run():
+        while True:
+            try:
+                # Sync DB work: keep it off the event loop
+                await asyncio.to_thread(AnalyticsService.refresh_once)
+            except Exception as e:
+                logger.error("AI log rollup refresh failed: %s", e)
+            await asyncio.sleep(settings.ANALYTICS_ROLLUP_INTERVAL_SECONDS)
+
+    @staticmethod
+    def start():
+        if AnalyticsService._task is None:
+            AnalyticsService._task = asyncio.get_running_loop().create_task(AnalyticsService.run())
+
+    @staticmethod
+    async def stop():
+        task = AnalyticsService._task
+        AnalyticsService._task = None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
@@ -0,0 +1,115 @@
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+from uuid import UUID
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, select
+from app.models.base import Appointment, AppointmentStatus
+from app.services.slot_service import SlotService
+
+S = AppointmentStatus
+
+# Allowed status changes. Reinstating a cancelled booking or checking in a
+# late no-show is allowed; COMPLETED is final.
+TRANSITIONS: Dict[AppointmentStatus, Set[AppointmentStatus]] = {
+    S.SCHEDULED: {S.CHECKED_IN, S.IN_PROGRESS, S.COMPLETED, S.CANCELLED, S.NO_SHOW},
+    S.CHECKED_IN: {S.IN_PROGRESS, S.COMPLETED, S.CANCELLED, S.NO_SHOW},
+    S.IN_PROGRESS: {S.COMPLETED},
+    S.COMPLETED: set(),
+    S.CANCELLED: {S.SCHEDULED},
+    S.NO_SHOW: {S.CHECKED_IN},
+}
+
+class AppointmentService:
+    @staticmethod
+    def transition_error(current: AppointmentStatus, new_status: AppointmentStatus) -> Optional[str]:
+        """None when `current` may change to `new_status` (setting the same status is a no-op)."""
+        if new_status == current or new_status in TRANSITIONS[current]:
+            return None
+        return f"Cannot change status from {current.value} to {new_status.value}"
+
+    @staticmethod
+    def bulk_update_status(session: Session, changes: List[Tuple[UUID, AppointmentStatus]]) -> List[dict]:
+        """
+        Applies (id, status) changes with one SELECT to validate and one
+        UPDATE ... WHERE id IN (...) per target status, each committed on its own.
+        Returns one {"id", "ok", "status", "detail"} per input, in input order.
+        """
+        current = dict(session.exec(
+            select(Appointment.id, Appointment.status).where(Appointment.id.in_({id for id, _ in changes}))
+        ).all())
+
+        results: Dict[int, dict] = {}
+        groups: Dict[AppointmentStatus, List[int]] = defaultdict(list)
+        first_index: Dict[UUID, int] = {}
+        duplicates: List[int] = []
+        for index, (id, new_status) in enumerate(changes):
+            if id in first_index:
+                duplicates.append(index) # Answered once the first change for this id is applied
+                continue
+            first_index[id] = index
+            if id not in current:
+                error = "Appointment not found"
+            else:
+                error = AppointmentService.transition_error(current[id], new_status)
+            if not error and SlotService.retakes_slot(current[id], new_status):
+                # The slot may overlap a booking made since (rare, checked row by row)
+                appointment = session.get(Appointment, id)
+                if SlotService.has_overlap(
+                    session, appointment.doctor_id, appointment.scheduled_at, appointment.duration_minutes, exclude_id=id
+                ):
+                    error = "Slot already booked"
+            if error:
+                results[index] = {"id": id, "ok": False, "status": current.get(id), "detail": error}
+            elif new_status == current[id]:
+                results[index] = {"id": id, "ok": True, "status": new_status, "detail": None}
+            else:
+                groups[new_status].append(index)
+
+        for new_status, indexes in groups.items():
+            ids = [changes[i][0] for i in indexes]
+            try:
+                updated = AppointmentService._apply(session, ids, new_status)
+            except IntegrityError:
+                # A reinstated booking collides with a newer one for its slot: retry
+                # the group row by row so only the colliding rows fail
+                session.rollback()
+                updated = set()
+                for i in indexes:
+                    id = changes[i][0]
+                    try:
+                        updated |= AppointmentService._apply(session, [id], new_status)
+                    except IntegrityError:
+                        session.rollback()
+                        results[i] = {"id": id, "ok": False, "status": current[id], "detail": "Slot already booked"}
+            for i in indexes:
+                id = changes[i][0]
+                if i in results:
+                    continue
+                if id in updated:
+                    results[i] = {"id": id, "ok": True, "status": new_status, "detail": None}
+                else:
+                    results[i] = {"id": id, "ok": False, "status": None, "detail": "Status changed concurrently, reload and retry"}
+        for i in duplicates:
+            id = changes[i][0]
+            results[i] = {
+                "id": id, "ok": False, "status": results[first_index[id]]["status"],
+                "detail": "Duplicate appointment id in request",
+            }
+        return [results[i] for i in range(len(changes))]
+
+    @staticmethod
+    def _apply(session: Session, ids: List[UUID], new_status: AppointmentStatus) -> Set[UUID]:
+        # The status guard keeps the validation true for rows changed since the SELECT
+        sources = [status for status, targets in TRANSITIONS.items() if new_status in targets]
+        result = session.execute(
+            update(Appointment)
+            .where(Appointment.id.in_(ids))
+            .where(Appointment.status.in_(sources))
+            .values(status=new_status, updated_at=datetime.utcnow())
+            .returning(Appointment.id)
+        )
+        updated = set(result.scalars().all())
+        session.commit()
+        return updated
@@ -0,0 +1,224 @@
+import asyncio
+import logging
+import zlib
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+import httpx
+from sqlalchemy import text, update
+from sqlmodel import Session, select
+from app.core.config import settings
+from app.core.db import engine
+from app.core.metrics import APPOINTMENT_SWEEP
+from app.models.base import Appointment, AppointmentStatus
+
+logger = logging.getLogger(__name__)
+
+# pg_try_advisory_lock key shared by every worker running the sweeper
+SWEEP_LOCK_KEY = zlib.crc32(b"appointment_sweeper")
+
+class LogReminderSink:
+    """Default sink: writes each reminder to the application log."""
+    async def send(self, reminders: List[Dict[str, Any]]):
+        for reminder in reminders:
+            logger.info(f"Appointment reminder: {reminder}")
+
+class WebhookReminderSink:
+    """POSTs each batch as {"reminders": [...]} to REMINDER_WEBHOOK_URL (SMS/e-mail gateway)."""
+    def __init__(self, url: str):
+        self.url = url
+
+    async def send(self, reminders: List[Dict[str, Any]]):
+        async with httpx.AsyncClient(timeout=10) as client:
+            response = await client.post(self.url, json={"reminders": reminders})
+            response.raise_for_status()
+
+def get_reminder_sink():
+    """Returns the reminder sink selected by REMINDER_SINK (log or webhook)."""
+    sink = settings.REMINDER_SINK.lower()
+    if sink == "webhook":
+        if not settings.REMINDER_WEBHOOK_URL:
+            raise ValueError("REMINDER_WEBHOOK_URL is required when REMINDER_SINK=webhook")
+        return WebhookReminderSink(settings.REMINDER_WEBHOOK_URL)
+    if sink == "log":
+        return LogReminderSink()
+    raise ValueError(f"Unknown REMINDER_SINK: {settings.REMINDER_SINK}")
+
+class AppointmentSweeperService:
+    """
+    Periodic appointment housekeeping:
+
+    - SCHEDULED appointments NO_SHOW_GRACE_MINUTES past their start become NO_SHOW
+    - SCHEDULED appointments starting within REMINDER_LEAD_MINUTES get one reminder
+    Both walk the (status, scheduled_at) index in APPOINTMENT_SWEEP_BATCH_SIZE batches
+    with one guarded bulk UPDATE per batch. On PostgreSQL only one worker sweeps at
+    a time (advisory lock); elsewhere the guards alone keep overlapping sweeps from
+    doing anything twice. Database steps run in worker threads; the lock is held
+    for the no-show pass only, never across a sink call.
+    """
+    _task: Optional[asyncio.Task] = None
+
+    @staticmethod
+    @contextmanager
+    def sweep_lock():
+        """Yields False when another worker holds the sweep lock."""
+        if engine.dialect.name != "postgresql":
+            yield True
+            return
+        # Session-level lock on a dedicated connection: released on unlock or if the worker dies
+        with engine.connect() as connection:
+            acquired = connection.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": SWEEP_LOCK_KEY}).scalar()
+            try:
+                yield acquired
+            finally:
+                if acquired:
+                    connection.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": SWEEP_LOCK_KEY})
+                connection.commit()
+
+    @staticmethod
+    def _with_session(step, *args):
+        with Session(engine) as session:
+            return step(session, *args)
+
+    @staticmethod
+    def mark_no_shows_locked(now: Optional[datetime] = None) -> Optional[int]:
+        """mark_no_shows under the sweep lock. Returns None when another worker holds it."""
+        with AppointmentSweeperService.sweep_lock() as acquired:
+            if not acquired:
+                return None
+            return AppointmentSweeperService._with_session(AppointmentSweeperService.mark_no_shows, now)
+
+    @staticmethod
+    def _due_batch(session: Session, *conditions) -> List[UUID]:
+        return session.exec(
+            select(Appointment.id)
+            .where(Appointment.status == AppointmentStatus.SCHEDULED, *conditions)
+            .order_by(Appointment.scheduled_at)
+            .limit(settings.APPOINTMENT_SWEEP_BATCH_SIZE)
+        ).all()
+
+    @staticmethod
+    def mark_no_shows(session: Session, now: Optional[datetime] = None) -> int:
+        """Moves overdue SCHEDULED appointments to NO_SHOW. Returns how many changed."""
+        now = now or datetime.utcnow()
+        cutoff = now - timedelta(minutes=settings.NO_SHOW_GRACE_MINUTES)
+        total = 0
+        for _ in range(settings.APPOINTMENT_SWEEP_MAX_BATCHES):
+            ids = AppointmentSweeperService._due_batch(session, Appointment.scheduled_at < cutoff)
+            if not ids:
+                break
+            result = session.execute(
+                update(Appointment)
+                .where(Appointment.id.in_(ids))
+                .where(Appointment.status == AppointmentStatus.SCHEDULED) # Checked in since the SELECT
+                .values(status=AppointmentStatus.NO_SHOW, updated_at=now)
+            )
+            session.commit()
+            total += result.rowcount
+            if len(ids) < settings.APPOINTMENT_SWEEP_BATCH_SIZE:
+                break
+        APPOINTMENT_SWEEP.labels("no_show").inc(total)
+        return total
+
+    @staticmethod
+    def claim_reminders(session: Session, now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """
+        Claims one batch of upcoming appointments still owed a reminder by
+        stamping reminder_sent_at. The guarded UPDATE ... RETURNING makes a
+        claim exclusive even when two sweeps overlap.
+        """
+        now = now or datetime.utcnow()
+        ids = AppointmentSweeperService._due_batch(
+            session,
+            Appointment.scheduled_at >= now,
+            Appointment.scheduled_at <= now + timedelta(minutes=settings.REMINDER_LEAD_MINUTES),
+            Appointment.reminder_sent_at == None,
+        )
+        if not ids:
+            return []
+        rows = session.execute(
+            update(Appointment)
+            .where(Appointment.id.in_(ids))
+            .where(Appointment.reminder_sent_at == None)
+            .values(reminder_sent_at=now)
+            .returning(Appointment.id, Appointment.patient_id, Appointment.doctor_id, Appointment.doctor_name, Appointment.scheduled_at)
+        ).all()
+        session.commit()
+        return [{
+            "appointment_id": str(row.id),
+            "patient_id": str(row.patient_id),
+            "doctor_id": str(row.doctor_id),
+            "doctor_name": row.doctor_name,
+            "scheduled_at": row.scheduled_at.isoformat() + "Z",
+        } for row in rows]
+
+    @staticmethod
+    def release_reminders(session: Session, reminders: List[Dict[str, Any]]):
+        """Un-claims a batch the sink failed to take, so the next sweep retries it."""
+        session.execute(
+            update(Appointment)
+            .where(Appointment.id.in_([UUID(r["appointment_id"]) for r in reminders]))
+            .values(reminder_sent_at=None)
+        )
+        session.commit()
+
+    @staticmethod
+    async def send_reminders(sink=None, now: Optional[datetime] = None) -> int:
+        """
+        Emits reminder batches to the sink. Returns how many were delivered.
+        No connection is held while the sink runs; claims are exclusive on their own.
+        """
+        sink = sink or get_reminder_sink()
+        run = AppointmentSweeperService._with_session
+        total = 0
+        for _ in range(settings.APPOINTMENT_SWEEP_MAX_BATCHES):
+            reminders = await asyncio.to_thread(run, AppointmentSweeperService.claim_reminders, now)
+            if not reminders:
+                break
+            try:
+                await sink.send(reminders)
+            except BaseException: # Also on cancellation: a claimed but unsent batch is never retried
+                await asyncio.to_thread(run, AppointmentSweeperService.release_reminders, reminders)
+                raise
+            total += len(reminders)
+            if len(reminders) < settings.APPOINTMENT_SWEEP_BATCH_SIZE:
+                break
+        APPOINTMENT_SWEEP.labels("reminder").inc(total)
+        return total
+
+    @staticmethod
+    async def sweep_once(sink=None, now: Optional[datetime] = None) -> Dict[str, int]:
+        """One sweep. Returns {"no_show": n, "reminders": n}, or zeros when another worker holds the lock."""
+        no_shows = await asyncio.to_thread(AppointmentSweeperService.mark_no_shows_locked, now)
+        if no_shows is None:
+            return {"no_show": 0, "reminders": 0}
+        reminders = await AppointmentSweeperService.send_reminders(sink, now)
+        if no_shows or reminders:
+            logger.info(f"Appointment sweep: {no_shows} no-show(s), {reminders} reminder(s)")
+        return {"no_show": no_shows, "reminders": reminders}
+
+    @staticmethod
+    async def run():
+        while True:
+            try:
+                await AppointmentSweeperService.sweep_once()
+            except Exception as e:
+                logger.error(f"Appointment sweep failed: {e}")
+            await asyncio.sleep(settings.APPOINTMENT_SWEEP_INTERVAL_SECONDS)
+
+    @staticmethod
+    def start():
+        if AppointmentSweeperService._task is None:
+            AppointmentSweeperService._task = asyncio.get_running_loop().create_task(AppointmentSweeperService.run())
+
+    @staticmethod
+    async def stop():
+        task = AppointmentSweeperService._task
+        AppointmentSweeperService._task = None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
@@ -0,0 +1,237 @@
+import asyncio
+import json
+import logging
+import zlib
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from uuid import UUID
+from sqlalchemy import delete, null, update
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlmodel import Session, select
+from app.core.config import settings
+from app.core.db import engine
+from app.models.base import (
+    AILog, ArchivedPayload, AudioFile, Consultation, ConsultationStatus, SOAPNote
+)
+
+logger = logging.getLogger(__name__)
+
+def compress(data: bytes) -> Tuple[str, bytes]:
+    """Returns (codec, blob): zstd when the optional zstandard package is installed, else zlib."""
+    try:
+        import zstandard
+    except ImportError:
+        return "zlib", zlib.compress(data, 6)
+    return "zstd", zstandard.ZstdCompressor(level=10).compress(data)
+
+def decompress(codec: str, blob: bytes) -> bytes:
+    if codec == "zstd":
+        import zstandard
+        return zstandard.ZstdDecompressor().decompress(blob)
+    if codec == "zlib":
+        return zlib.decompress(blob)
+    raise ValueError(f"Unknown archive codec: {codec}")
+
+class ArchiveService:
+    """
+    Retention tiering for the bulky columns. Completed consultations older than
+    ARCHIVE_AFTER_DAYS have AudioFile.transcription/utterances and SOAPNote.soap_json
+    moved into compressed archived_payloads rows; the source row keeps archived_at
+    as its pointer. AILog rows past AILOG_RETENTION_DAYS (and already rolled up
+    for analytics) move there as one JSONL blob per consultation.
+
+    Reads rehydrate on access (rehydrate / ai_logs) without writing the payload
+    back, so hot tables and list queries only ever carry recent data.
+    Every move is a guarded UPDATE/DELETE ... RETURNING, so overlapping runs in
+    several workers never archive a row twice.
+    """
+    _task: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def _archive(kind: str, source_id: Optional[UUID], data: bytes, row_count: int = 1) -> ArchivedPayload:
+        codec, blob = compress(data)
+        return ArchivedPayload(kind=kind, source_id=source_id, codec=codec, payload=blob, row_count=row_count)
+
+    @staticmethod
+    def archive_transcripts(session: Session, now: Optional[datetime] = None) -> int:
+        now = now or datetime.utcnow()
+        rows = session.exec(
+            select(AudioFile.id, AudioFile.transcription, AudioFile.utterances)
+            .join(Consultation, Consultation.id == AudioFile.consultation_id)
+            .where(Consultation.status == ConsultationStatus.COMPLETED)
+            .where(AudioFile.archived_at == None)
+            .where(AudioFile.uploaded_at < now - timedelta(days=settings.ARCHIVE_AFTER_DAYS))
+            .order_by(AudioFile.uploaded_at)
+            .limit(settings.ARCHIVE_BATCH_SIZE)
+        ).all()
+        if not rows:
+            return 0
+        claimed = set(session.execute(
+            update(AudioFile)
+            .where(AudioFile.id.in_([row.id for row in rows]))
+            .where(AudioFile.archived_at == None)
+            .values(transcription=None, utterances=null(), archived_at=now)
+            .returning(AudioFile.id)
+            .execution_options(synchronize_session=False)
+        ).scalars().all())
+        session.add_all([
+            ArchiveService._archive("transcript", row.id, json.dumps(
+                {"transcription": row.transcription, "utterances": row.utterances}
+            ).encode("utf-8"))
+            for row in rows if row.id in claimed
+        ])
+        session.commit()
+        return len(claimed)
+
+    @staticmethod
+    def archive_soap_notes(session: Session, now: Optional[datetime] = None) -> int:
+        now = now or datetime.utcnow()
+        rows = session.exec(
+            select(SOAPNote.id, SOAPNote.soap_json)
+            .join(Consultation, Consultation.id == SOAPNote.consultation_id)
+            .where(Consultation.status == ConsultationStatus.COMPLETED)
+            .where(SOAPNote.archived_at == None)
+            .where(SOAPNote.created_at < now - timedelta(days=settings.ARCHIVE_AFTER_DAYS))
+            .order_by(SOAPNote.created_at)
+            .limit(settings.ARCHIVE_BATCH_SIZE)
+        ).all()
+        if not rows:
+            return 0
+        claimed = set(session.execute(
+            update(SOAPNote)
+            .where(SOAPNote.id.in_([row.id for row in rows]))
+            .where(SOAPNote.archived_at == None)
+            .values(soap_json=null(), archived_at=now)
+            .returning(SOAPNote.id)
+            .execution_options(synchronize_session=False)
+        ).scalars().all())
+        session.add_all([
+            ArchiveService._archive("soap_note", row.id, json.dumps({"soap_json": row.soap_json}).encode("utf-8"))
+            for row in rows if row.id in claimed
+        ])
+        session.commit()
+        return len(claimed)
+
+    @staticmethod
+    def archive_ai_logs(session: Session, now: Optional[datetime] = None) -> int:
+        from app.services.analytics_service import AnalyticsService
+
+        now = now or datetime.utcnow()
+        # Only archive rows that are final in the analytics rollups: a later
+        # refresh re-aggregates everything from rescan_from onwards
+        AnalyticsService.refresh_rollups(session, now)
+        settled = AnalyticsService.rescan_from(session, now)
+        if settled is None:
+            return 0
+        cutoff = min(now - timedelta(days=settings.AILOG_RETENTION_DAYS), settled)
+        rows = session.exec(
+            select(AILog).where(AILog.created_at < cutoff).order_by(AILog.created_at).limit(settings.ARCHIVE_BATCH_SIZE)
+        ).all()
+        if not rows:
+            return 0
+        dumped = {row.id: row.model_dump(mode="json") for row in rows}
+        deleted = set(session.execute(
+            delete(AILog).where(AILog.id.in_(list(dumped))).returning(AILog.id).execution_options(synchronize_session=False)
+        ).scalars().all())
+        by_consultation: Dict[Optional[UUID], List[dict]] = defaultdict(list)
+        for row in rows:
+            if row.id in deleted:
+                by_consultation[row.consultation_id].append(dumped[row.id])
+        session.expunge_all() # The deleted rows are still in the identity map
+        session.add_all([
+            ArchiveService._archive(
+                "ai_logs", consultation_id, "\n".join(json.dumps(r) for r in records).encode("utf-8"), len(records)
+            )
+            for consultation_id, records in by_consultation.items()
+        ])
+        session.commit()
+        return len(deleted)
+
+    @staticmethod
+    def archive_once(now: Optional[datetime] = None) -> Dict[str, int]:
+        """Archives everything due, batch by batch. Returns rows moved per kind."""
+        steps = {
+            "transcripts": ArchiveService.archive_transcripts,
+            "soap_notes": ArchiveService.archive_soap_notes,
+            "ai_logs": ArchiveService.archive_ai_logs,
+        }
+        counts = {}
+        with Session(engine) as session:
+            for kind, step in steps.items():
+                counts[kind] = 0
+                while True:
+                    moved = step(session, now)
+                    counts[kind] += moved
+                    if moved < settings.ARCHIVE_BATCH_SIZE:
+                        break
+        if any(counts.values()):
+            logger.info(f"Archived {counts}")
+        return counts
+
+    @staticmethod
+    def _load(session: Session, kind: str, source_id: Optional[UUID]) -> List[bytes]:
+        archives = session.exec(
+            select(ArchivedPayload)
+            .where(ArchivedPayload.kind == kind, ArchivedPayload.source_id == source_id)
+            .order_by(ArchivedPayload.archived_at)
+        ).all()
+        return [decompress(a.codec, a.payload) for a in archives]
+
+    @staticmethod
+    def rehydrate(session: Session, consultation: Consultation) -> Consultation:
+        """
+        Puts archived transcript / SOAP JSON back on the loaded rows, in memory
+        only: the values are set as committed state so a later commit does not
+        write them back to the hot table.
+        """
+        audio_file, soap_note = consultation.audio_file, consultation.soap_note
+        if audio_file is not None and audio_file.archived_at is not None:
+            for data in ArchiveService._load(session, "transcript", audio_file.id):
+                payload = json.loads(data)
+                set_committed_value(audio_file, "transcription", payload["transcription"])
+                set_committed_value(audio_file, "utterances", payload["utterances"])
+        if soap_note is not None:
+            ArchiveService.rehydrate_soap_note(session, soap_note)
+        return consultation
+
+    @staticmethod
+    def rehydrate_soap_note(session: Session, soap_note: SOAPNote) -> SOAPNote:
+        if soap_note.archived_at is not None:
+            for data in ArchiveService._load(session, "soap_note", soap_note.id):
+                set_committed_value(soap_note, "soap_json", json.loads(data)["soap_json"])
+        return soap_note
+
+    @staticmethod
+    def ai_logs(session: Session, consultation_id: UUID) -> List[AILog]:
+        """A consultation's AI calls, live and archived, oldest first. Archived rows are detached."""
+        logs = list(session.exec(select(AILog).where(AILog.consultation_id == consultation_id)).all())
+        for data in ArchiveService._load(session, "ai_logs", consultation_id):
+            logs += [AILog.model_validate(json.loads(line)) for line in data.decode("utf-8").splitlines()]
+        return sorted(logs, key=lambda log: log.created_at)
+
+    @staticmethod
+    async def run():
+        while True:
+            try:
+                # Sync DB work: keep it off the event loop
+                await asyncio.to_thread(ArchiveService.archive_once)
+            except Exception as e:
+                logger.error(f"Archive run failed: {e}")
+            await asyncio.sleep(settings.ARCHIVE_INTERVAL_SECONDS)
+
+    @staticmethod
+    def start():
+        if ArchiveService._task is None:
+            ArchiveService._task = asyncio.get_running_loop().create_task(ArchiveService.run())
+
+    @staticmethod
+    async def stop():
+        task = ArchiveService._task
+        ArchiveService._task = None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
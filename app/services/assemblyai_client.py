@@ -0,0 +1,194 @@
+import asyncio
+import logging
+from typing import Dict, Any, Optional
+import httpx
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_CHUNK_SIZE = 5 * 1024 * 1024
+
+class TranscriptPoller:
+    """
+    Tracks every pending transcript ID with one shared polling coroutine.
+    The loop runs only while something is pending, so a hundred concurrent
+    transcriptions cost one coroutine and one GET per transcript per tick.
+    Webhook deliveries resolve waiters early through `resolve()`.
+    """
+    def __init__(self, client: "AssemblyAIAsyncClient", interval: float):
+        self.client = client
+        self.interval = interval
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def pending_count(self) -> int:
+        return len(self._pending)
+
+    def wait(self, transcript_id: str) -> asyncio.Future:
+        future = self._pending.get(transcript_id)
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            self._pending[transcript_id] = future
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        return future
+
+    def resolve(self, transcript_id: str, payload: Dict[str, Any]) -> bool:
+        future = self._pending.pop(transcript_id, None)
+        if future is None or future.done():
+            return False
+        future.set_result(payload)
+        return True
+
+    def stop(self):
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+        self._task = None
+
+    def is_pending(self, transcript_id: str) -> bool:
+        return transcript_id in self._pending
+
+    def discard(self, transcript_id: str):
+        self._pending.pop(transcript_id, None)
+
+    async def _run(self):
+        while self._pending:
+            await asyncio.sleep(self.interval)
+            ids = list(self._pending)
+            results = await asyncio.gather(
+                *(self.client.get_transcript(transcript_id) for transcript_id in ids),
+                return_exceptions=True
+            )
+            for transcript_id, result in zip(ids, results):
+                if isinstance(result, Exception):
+                    # Transient network error - keep the job pending for the next tick
+                    logger.warning("Polling transcript %s failed: %s", transcript_id, result)
+                    continue
+                if result.get("status") in ("completed", "error"):
+                    self.resolve(transcript_id, result)
+
+class AssemblyAIAsyncClient:
+    """
+    Minimal async client for the AssemblyAI v2 REST API: upload, submit, then
+    wait on the shared poller. Connections are pooled and kept alive on one
+    httpx.AsyncClient. `transport` allows tests to point it at a fake server.
+    """
+    def __init__(
+        self,
+        api_key: str,
+        base_url: str,
+        poll_interval: float = 3.0,
+        timeout: float = 1800.0,
+        webhook_url: Optional[str] = None,
+        webhook_secret: Optional[str] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.webhook_url = webhook_url
+        self.webhook_secret = webhook_secret
+        self._transport = transport
+        self._http: Optional[httpx.AsyncClient] = None
+        # With webhooks the poller is only a safety net (e.g. delivery landed on another worker)
+        self.poller = TranscriptPoller(self, max(poll_interval, 30.0) if webhook_url else poll_interval)
+
+    @property
+    def http(self) -> httpx.AsyncClient:
+        if self._http is None or self._http.is_closed:
+            self._http = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers={"authorization": self.api_key},
+                timeout=httpx.Timeout(60.0),
+                limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+                transport=self._transport,
+            )
+        return self._http
+
+    async def aclose(self):
+        self.poller.stop()
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+    async def upload(self, file_path: str) -> str:
+        async def read_chunks():
+            with open(file_path, "rb") as f:
+                while True:
+                    chunk = f.read(UPLOAD_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    yield chunk
+
+        response = await self.http.post("/upload", content=read_chunks())
+        response.raise_for_status()
+        return response.json()["upload_url"]
+
+    async def submit(self, audio_url: str, config: Dict[str, Any]) -> str:
+        payload = {"audio_url": audio_url, **config}
+        if self.webhook_url:
+            payload["webhook_url"] = self.webhook_url
+            if self.webhook_secret:
+                payload["webhook_auth_header_name"] = "X-Webhook-Secret"
+                payload["webhook_auth_header_value"] = self.webhook_secret
+        response = await self.http.post("/transcript", json=payload)
+        response.raise_for_status()
+        return response.json()["id"]
+
+    async def get_transcript(self, transcript_id: str) -> Dict[str, Any]:
+        response = await self.http.get(f"/transcript/{transcript_id}")
+        response.raise_for_status()
+        return response.json()
+
+    async def wait_for_transcript(self, transcript_id: str) -> Dict[str, Any]:
+        try:
+            return await asyncio.wait_for(asyncio.shield(self.poller.wait(transcript_id)), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            self.poller.discard(transcript_id)
+            raise Exception(f"Transcription {transcript_id} timed out after {self.timeout:.0f}s")
+
+    async def transcribe(self, file_path: str, config: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Uploads a local file (URLs are submitted as-is) and waits for the finished transcript.
+        """
+        if file_path.startswith(("http://", "https://")):
+            audio_url = file_path
+        else:
+            audio_url = await self.upload(file_path)
+        transcript_id = await self.submit(audio_url, config)
+        return await self.wait_for_transcript(transcript_id)
+
+    async def handle_webhook(self, transcript_id: str) -> bool:
+        """
+        Called by the webhook receiver: fetches the finished transcript and wakes its waiter.
+        Returns False if the job is not waited on in this process (the poller there picks it up).
+        """
+        if not self.poller.is_pending(transcript_id):
+            return False
+        transcript = await self.get_transcript(transcript_id)
+        if transcript.get("status") not in ("completed", "error"):
+            return False
+        return self.poller.resolve(transcript_id, transcript)
+
+_clients: Dict[int, AssemblyAIAsyncClient] = {}
+
+def get_assemblyai_client() -> AssemblyAIAsyncClient:
+    """
+    Shared client for the running event loop (httpx pools and futures are loop-bound).
+    """
+    loop_id = id(asyncio.get_running_loop())
+    client = _clients.get(loop_id)
+    if client is None:
+        # Drop clients created on loops that have since been closed (e.g. repeated asyncio.run in scripts)
+        _clients.clear()
+        client = AssemblyAIAsyncClient(
+            api_key=settings.ASSEMBLYAI_API_KEY,
+            base_url=settings.ASSEMBLYAI_BASE_URL,
+            poll_interval=settings.ASSEMBLYAI_POLL_INTERVAL_SECONDS,
+            timeout=settings.STT_TIMEOUT_SECONDS,
+            webhook_url=settings.ASSEMBLYAI_WEBHOOK_URL,
+            webhook_secret=settings.ASSEMBLYAI_WEBHOOK_SECRET,
+        )
+        _clients[loop_id] = client
+    return client
@@ -0,0 +1,265 @@
+import bisect
+import os
+import shutil
+import subprocess
+import wave
+from typing import List, Tuple, Dict, Any
+import numpy as np
+from app.core.config import settings
+
+TARGET_SAMPLE_RATE = 16000
+
+class AudioPreprocessingService:
+    """
+    Decode once -> 16kHz mono -> energy VAD -> compact long silences -> re-encode.
+
+    Long empty stretches (e.g. 12.5s-25.6s in the consultation TextGrids) are
+    cut down to a short pause, which shrinks upload bytes and billed STT
+    minutes. The offset map keeps processed timestamps translatable back to
+    the original recording.
+    """
+
+    @staticmethod
+    def decode(file_path: str) -> np.ndarray:
+        """
+        Returns 16kHz mono int16 samples. Uses ffmpeg when available (any format);
+        otherwise falls back to 16-bit PCM WAV via the stdlib.
+        """
+        if shutil.which("ffmpeg"):
+            cmd = [
+                "ffmpeg", "-nostdin", "-v", "error", "-i", file_path,
+                "-f", "s16le", "-ac", "1", "-ar", str(TARGET_SAMPLE_RATE), "-"
+            ]
+            out = subprocess.run(cmd, capture_output=True, check=True).stdout
+            return np.frombuffer(out, dtype=np.int16)
+
+        with wave.open(file_path, "rb") as wf:
+            channels = wf.getnchannels()
+            rate = wf.getframerate()
+            if wf.getsampwidth() != 2:
+                raise ValueError("Only 16-bit PCM WAV can be decoded without ffmpeg")
+            data = np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16)
+
+        samples = data.astype(np.float32)
+        if channels > 1:
+            # Downmix: average the interleaved channels
+            samples = samples.reshape(-1, channels).mean(axis=1)
+        if rate != TARGET_SAMPLE_RATE and len(samples):
+            # Linear-interpolation resample (adequate for speech at 16kHz)
+            target_len = int(round(len(samples) * TARGET_SAMPLE_RATE / rate))
+            positions = np.linspace(0, len(samples) - 1, target_len)
+            samples = np.interp(positions, np.arange(len(samples)), samples)
+        return np.clip(samples, -32768, 32767).astype(np.int16)
+
+    @staticmethod
+    def detect_speech(
+        samples: np.ndarray,
+        sample_rate: int = TARGET_SAMPLE_RATE,
+        frame_ms: int = 30,
+        margin_db: float = 10.0,
+        range_db: float = 25.0,
+        floor_db: float = -60.0,
+        pad_ms: int = 200,
+        min_silence_ms: int = 1000,
+    ) -> List[Tuple[int, int]]:
+        """
+        Vectorized energy VAD. Returns (start_sample, end_sample) speech regions.
+        The threshold adapts to the recording: noise floor (10th percentile frame
+        energy) + margin, capped at `range_db` below the loud (90th percentile) frames
+        so recordings without pauses are not cut. Only silences longer than
+        `min_silence_ms` separate regions.
+        """
+        frame = int(sample_rate * frame_ms / 1000)
+        n_frames = len(samples) // frame
+        if n_frames == 0:
+            return [(0, len(samples))] if len(samples) else []
+
+        frames = samples[:n_frames * frame].astype(np.float32).reshape(n_frames, frame)
+        rms = np.sqrt(np.mean(frames * frames, axis=1)) + 1e-9
+        db = 20 * np.log10(rms / 32768.0)
+        noise_floor, loud = np.percentile(db, [10, 90])
+        threshold = max(min(noise_floor + margin_db, loud - range_db), floor_db)
+        speech = db > threshold
+
+        # Hangover padding on both sides of every voiced frame
+        pad = max(1, pad_ms // frame_ms)
+        speech = np.convolve(speech.astype(np.int32), np.ones(2 * pad + 1, dtype=np.int32), mode="same") > 0
+
+        edges = np.diff(np.concatenate(([0], speech.astype(np.int8), [0])))
+        starts = np.flatnonzero(edges == 1)
+        ends = np.flatnonzero(edges == -1)
+        if len(starts) == 0:
+            return []
+
+        # Merge regions separated by short silences
+        min_gap = max(1, min_silence_ms // frame_ms)
+        regions = [[starts[0], ends[0]]]
+        for s, e in zip(starts[1:], ends[1:]):
+            if s - regions[-1][1] < min_gap:
+                regions[-1][1] = e
+            else:
+                regions.append([s, e])
+
+        total = len(samples)
+        # The trailing partial frame belongs to the last region if it reaches the end
+        return [(int(s * frame), total if e == n_frames else int(e * frame)) for s, e in regions]
+
+    @staticmethod
+    def compact(
+        samples: np.ndarray,
+        regions: List[Tuple[int, int]],
+        sample_rate: int = TARGET_SAMPLE_RATE,
+        keep_gap_ms: int = 300,
+    ) -> Tuple[np.ndarray, List[Tuple[int, int, int]]]:
+        """
+        Concatenates speech regions with a short pause between them.
+        Returns (samples, offsets) where each offset is
+        (processed_start_ms, original_start_ms, length_ms).
+        """
+        gap = np.zeros(int(sample_rate * keep_gap_ms / 1000), dtype=samples.dtype)
+        pieces = []
+        offsets = []
+        cursor = 0
+        for i, (start, end) in enumerate(regions):
+            if i:
+                pieces.append(gap)
+                cursor += len(gap)
+            pieces.append(samples[start:end])
+            offsets.append((
+                cursor * 1000 // sample_rate,
+                start * 1000 // sample_rate,
+                (end - start) * 1000 // sample_rate,
+            ))
+            cursor += end - start
+        if not pieces:
+            return samples[:0], []
+        return np.concatenate(pieces), offsets
+
+    @staticmethod
+    def map_time(processed_ms: int, offsets: List[Tuple[int, int, int]]) -> int:
+        """
+        Maps a timestamp in the processed audio back to the original recording.
+        """
+        if not offsets or processed_ms is None:
+            return processed_ms
+        starts = [o[0] for o in offsets]
+        i = max(0, bisect.bisect_right(starts, processed_ms) - 1)
+        proc_start, orig_start, length = offsets[i]
+        # Times inside an inserted pause clamp to the end of the preceding region
+        return orig_start + min(max(processed_ms - proc_start, 0), length)
+
+    @staticmethod
+    def remap_utterances(utterances: List[Dict[str, Any]], offsets: List[Tuple[int, int, int]]) -> List[Dict[str, Any]]:
+        for utter in utterances:
+            for key in ("start", "end"):
+                if utter.get(key) is not None:
+                    utter[key] = AudioPreprocessingService.map_time(utter[key], offsets)
+        return utterances
+
+    @staticmethod
+    def encode(samples: np.ndarray, base_path: str, sample_rate: int = TARGET_SAMPLE_RATE) -> str:
+        """
+        Encodes to Opus (ogg) when ffmpeg is available, else 16kHz mono WAV.
+        Returns the written path.
+        """
+        if shutil.which("ffmpeg"):
+            out_path = f"{base_path}.ogg"
+            cmd = [
+                "ffmpeg", "-nostdin", "-v", "error", "-y",
+                "-f", "s16le", "-ar", str(sample_rate), "-ac", "1", "-i", "-",
+                "-c:a", "libopus", "-b:a", settings.AUDIO_OPUS_BITRATE, out_path
+            ]
+            result = subprocess.run(cmd, input=samples.tobytes(), capture_output=True)
+            if result.returncode == 0:
+                return out_path
+
+        out_path = f"{base_path}.wav"
+        with wave.open(out_path, "wb") as wf:
+            wf.setnchannels(1)
+            wf.setsampwidth(2)
+            wf.setframerate(sample_rate)
+            wf.writeframes(samples.astype(np.int16).tobytes())
+        return out_path
+
+    @staticmethod
+    def plan_chunks(
+        samples: np.ndarray,
+        chunk_ms: int,
+        overlap_ms: int,
+        sample_rate: int = TARGET_SAMPLE_RATE,
+        min_pause_ms: int = 250,
+    ) -> List[Dict[str, int]]:
+        """
+        Splits long audio at the pause nearest to every `chunk_ms`. Each chunk owns
+        [own_start, own_end) and its audio extends `overlap_ms` past both cuts so a
+        word at a boundary is heard whole by at least one chunk. Values are samples.
+        """
+        total = len(samples)
+        chunk = int(sample_rate * chunk_ms / 1000)
+        if chunk <= 0 or total <= chunk * 1.5:
+            return [{"start": 0, "end": total, "own_start": 0, "own_end": total}]
+
+        regions = AudioPreprocessingService.detect_speech(samples, sample_rate, pad_ms=60, min_silence_ms=min_pause_ms)
+        pauses = [(regions[i][1] + regions[i + 1][0]) // 2 for i in range(len(regions) - 1)]
+
+        cuts = []
+        position = 0
+        while total - position > chunk * 1.5:
+            target = position + chunk
+            # Prefer a pause within half a chunk of the target; hard cut if the speaker never stops
+            candidates = [p for p in pauses if position + chunk // 2 <= p <= position + chunk * 3 // 2]
+            cut = min(candidates, key=lambda p: abs(p - target)) if candidates else target
+            cuts.append(cut)
+            position = cut
+
+        overlap = int(sample_rate * overlap_ms / 1000)
+        bounds = [0] + cuts + [total]
+        return [
+            {"start": max(0, s - overlap), "end": min(total, e + overlap), "own_start": s, "own_end": e}
+            for s, e in zip(bounds[:-1], bounds[1:])
+        ]
+
+    @staticmethod
+    def preprocess(file_path: str) -> Dict[str, Any]:
+        """
+        Runs the full stage and returns the encoded chunk files (one for short
+        recordings), the offset map and before/after sizes. CPU-bound - call
+        from a worker thread. Chunk times are ms on the processed timeline.
+        """
+        samples = AudioPreprocessingService.decode(file_path)
+        regions = AudioPreprocessingService.detect_speech(samples, min_silence_ms=settings.AUDIO_MIN_SILENCE_MS)
+        compacted, offsets = AudioPreprocessingService.compact(samples, regions, keep_gap_ms=settings.AUDIO_KEEP_GAP_MS)
+        if not len(compacted):
+            # Nothing above the noise floor - send the decoded audio untouched
+            compacted, offsets = samples, [(0, 0, len(samples) * 1000 // TARGET_SAMPLE_RATE)]
+
+        plan = AudioPreprocessingService.plan_chunks(
+            compacted, settings.STT_CHUNK_SECONDS * 1000, settings.STT_CHUNK_OVERLAP_MS
+        )
+        base_path = f"{os.path.splitext(file_path)[0]}.prep"
+        chunks = []
+        try:
+            for i, c in enumerate(plan):
+                path = AudioPreprocessingService.encode(
+                    compacted[c["start"]:c["end"]], base_path if len(plan) == 1 else f"{base_path}{i}"
+                )
+                chunks.append({
+                    "path": path,
+                    "start_ms": c["start"] * 1000 // TARGET_SAMPLE_RATE,
+                    "own_start_ms": c["own_start"] * 1000 // TARGET_SAMPLE_RATE,
+                    "own_end_ms": c["own_end"] * 1000 // TARGET_SAMPLE_RATE,
+                })
+        except Exception:
+            for chunk in chunks:
+                if os.path.exists(chunk["path"]):
+                    os.remove(chunk["path"])
+            raise
+
+        return {
+            "chunks": chunks,
+            "offsets": offsets,
+            "original_seconds": len(samples) / TARGET_SAMPLE_RATE,
+            "processed_seconds": len(compacted) / TARGET_SAMPLE_RATE,
+            "original_bytes": os.path.getsize(file_path),
+            "processed_bytes": sum(os.path.getsize(c["path"]) for c in chunks),
+        }
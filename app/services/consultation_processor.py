@@ -1,43 +1,176 @@
 from sqlmodel import Session, select
+from sqlalchemy import delete, update, or_
 from app.core.db import engine
-from app.models.base import Consultation, ConsultationStatus, AudioFile, SOAPNote, PatientProfile, AILog
-from app.services.stt_service import AssemblyAIService
-from app.services.llm_service import GeminiService
+from app.models.base import Consultation, ConsultationStatus, ProcessingStage, AudioFile, SOAPNote, PatientProfile, AILog
+from app.services.stt_service import get_stt_service
+from app.services.llm_service import get_llm_service, get_llm_model_version
+from app.services.transcript_stitching_service import TranscriptStitchingService
 from app.services.triage_service import TriageService
 from app.services.safety_service import SafetyService
+from app.services.event_service import soap_events
+from app.services.tracing_service import PipelineTrace
+from app.core.metrics import PIPELINE_RUNS_IN_PROGRESS
+from app.core.config import settings
+from typing import Optional
 from uuid import UUID
+from datetime import datetime, timedelta
 import asyncio
+import logging
+import os
 import time
 
+logger = logging.getLogger(__name__)
+
+async def transcribe_audio_file(file_path: str, trace: Optional[PipelineTrace] = None) -> dict:
+    """
+    Pre-processes the recording (16kHz mono, silence compacted, re-encoded),
+    transcribes it with the configured STT backend and maps utterance times
+    back onto the original recording. Long recordings are split at pauses and
+    the chunks transcribed concurrently, then stitched. Falls back to the raw
+    file if pre-processing fails. Records preprocess and stt spans on `trace`.
+    """
+    trace = trace or PipelineTrace(None)
+    prep = None
+    if settings.AUDIO_PREPROCESSING_ENABLED and os.path.exists(file_path):
+        try:
+            from app.services.audio_preprocessing_service import AudioPreprocessingService
+            with trace.span("preprocess", bytes=os.path.getsize(file_path)) as span:
+                loop = asyncio.get_running_loop()
+                prep = await loop.run_in_executor(None, AudioPreprocessingService.preprocess, file_path)
+                span.detail = {
+                    "original_seconds": round(prep["original_seconds"], 1),
+                    "processed_seconds": round(prep["processed_seconds"], 1),
+                    "processed_bytes": prep["processed_bytes"],
+                    "chunks": len(prep["chunks"]),
+                }
+            logger.info(
+                f"Pre-processed audio: {prep['original_seconds']:.1f}s -> {prep['processed_seconds']:.1f}s, "
+                f"{prep['original_bytes']} -> {prep['processed_bytes']} bytes in {len(prep['chunks'])} chunk(s)"
+            )
+        except Exception as e:
+            logger.warning(f"Audio pre-processing skipped: {e}")
+            prep = None
+
+    stt = get_stt_service()
+    with trace.span("stt", detail={"provider": settings.STT_PROVIDER}) as span:
+        if not prep:
+            span.bytes = os.path.getsize(file_path) if os.path.exists(file_path) else None
+            return await stt.transcribe_audio_async(file_path)
+
+        span.bytes = prep["processed_bytes"]
+        span.detail["chunks"] = len(prep["chunks"])
+        semaphore = asyncio.Semaphore(settings.STT_CHUNK_CONCURRENCY)
+
+        async def transcribe_chunk(chunk: dict):
+            async with semaphore:
+                return await stt.transcribe_audio_async(chunk["path"])
+
+        try:
+            # Let every chunk finish before the files are removed, then surface the first error
+            results = await asyncio.gather(*(transcribe_chunk(c) for c in prep["chunks"]), return_exceptions=True)
+        finally:
+            for chunk in prep["chunks"]:
+                if os.path.exists(chunk["path"]):
+                    os.remove(chunk["path"])
+        for r in results:
+            if isinstance(r, BaseException):
+                raise r
+
+    result = TranscriptStitchingService.stitch(prep["chunks"], results)
+    AudioPreprocessingService.remap_utterances(result.get("utterances", []), prep["offsets"])
+    result["duration"] = prep["original_seconds"]
+    return result
+
+# Stage order; a consultation at index i has completed every stage up to i
+PIPELINE_STAGES = [
+    ProcessingStage.PENDING,
+    ProcessingStage.TRANSCRIBED,
+    ProcessingStage.SOAP_GENERATED,
+    ProcessingStage.TRIAGED,
+]
+
+def stage_reached(consultation: Consultation, stage: ProcessingStage) -> bool:
+    return PIPELINE_STAGES.index(consultation.processing_stage or ProcessingStage.PENDING) >= PIPELINE_STAGES.index(stage)
+
+def lease_expired_before(now: datetime) -> datetime:
+    """Leases taken before this time belong to runs that died without releasing them."""
+    return now - timedelta(seconds=settings.PROCESSING_LEASE_SECONDS)
+
+def holds_live_lease(consultation: Consultation, now: Optional[datetime] = None) -> bool:
+    started = consultation.processing_started_at
+    return started is not None and started >= lease_expired_before(now or datetime.utcnow())
+
+def mark_failed(consultation: Consultation, error: str):
+    """Puts the consultation in the manual-review queue and releases the lease so a retry can resume."""
+    consultation.status = ConsultationStatus.FAILED
+    consultation.requires_manual_review = True
+    consultation.processing_error = error[:500]
+    consultation.processing_started_at = None
+
+def claim_consultation(session: Session, consultation_id: UUID) -> bool:
+    """
+    Atomically takes the processing lease. Returns False when another run
+    holds a live lease, so a double-trigger does not process twice.
+    """
+    now = datetime.utcnow()
+    result = session.execute(
+        update(Consultation)
+        .where(Consultation.id == consultation_id)
+        .where(or_(Consultation.processing_started_at == None, Consultation.processing_started_at < lease_expired_before(now)))
+        .values(processing_started_at=now)
+    )
+    session.commit()
+    return result.rowcount == 1
+
 async def process_consultation_flow(consultation_id: UUID):
     """
-    Orchestrates the AI processing flow:
-    1. Transcribe Audio (AssemblyAI)
-    2. Generate SOAP Note (Gemini)
-    3. Update Database
+    Orchestrates the AI processing flow, checkpointing after each stage:
+    1. Transcribe Audio (AssemblyAI) -> TRANSCRIBED
+    2. Generate SOAP Note (Gemini) -> SOAP_GENERATED
+    3. Triage + Safety Checks -> TRIAGED
+    Idempotent: a re-run (retry or double-trigger) resumes after the last
+    completed stage and never creates a second SOAP note.
+    Every stage is timed into pipeline_spans, written in one batch at the end.
     """
-    print(f"Starting processing for consultation {consultation_id}")
-    
+    with PIPELINE_RUNS_IN_PROGRESS.track_inprogress():
+        await _run_pipeline(consultation_id)
+
+async def _run_pipeline(consultation_id: UUID):
+    logger.info(f"Starting processing for consultation {consultation_id}")
+    trace = PipelineTrace(consultation_id)
+
     # We use a new session per background task execution
     with Session(engine) as session:
         consultation = session.get(Consultation, consultation_id)
         if not consultation:
-            print(f"Consultation {consultation_id} not found.")
+            logger.warning(f"Consultation {consultation_id} not found.")
             return
-        
+
+        if not claim_consultation(session, consultation_id):
+            logger.info(f"Consultation {consultation_id} is already being processed.")
+            return
+        session.refresh(consultation)
+
         # 1. Update Status: Transcribing
         consultation.status = ConsultationStatus.IN_PROGRESS
         session.add(consultation)
         session.commit()
-        
+
         # 2. Get Audio File
         audio_file = session.exec(select(AudioFile).where(AudioFile.consultation_id == consultation_id)).first()
         if not audio_file:
-            print("Audio file missing.")
-            # We treat this as a failure state, but keep it in IN_PROGRESS or move to CANCELLED?
-            # For now, let's leave it but log it.
+            logger.warning(f"Audio file missing for consultation {consultation_id}.")
+            mark_failed(consultation, "Audio file missing")
+            session.add(consultation)
+            session.commit()
+            soap_events.publish(consultation_id, {"event": "failed"})
             return
 
+        if not stage_reached(consultation, ProcessingStage.TRANSCRIBED) and audio_file.uploaded_at:
+            # Time between upload and a worker picking the job up
+            queued_ms = max(0.0, (consultation.processing_started_at - audio_file.uploaded_at).total_seconds() * 1000)
+            trace.add("queue_wait", queued_ms, started_at=audio_file.uploaded_at)
+
         # Fetch Patient Context
         patient_profile = session.exec(select(PatientProfile).where(PatientProfile.user_id == consultation.patient_id)).first()
         patient_context = {}
@@ -45,11 +178,10 @@ async def process_consultation_flow(consultation_id: UUID):
             # Calculate Age (Rough approx is fine for now)
             age = "N/A"
             if patient_profile.date_of_birth:
-                from datetime import datetime
                 today = datetime.now()
                 dob = patient_profile.date_of_birth
                 age = today.year - dob.year - ((today.month, today.day) < (dob.month, dob.day))
-            
+
             patient_context = {
                 "first_name": patient_profile.first_name,
                 "last_name": patient_profile.last_name,
@@ -58,85 +190,153 @@ async def process_consultation_flow(consultation_id: UUID):
                 "notes": f"Address: {patient_profile.city}, {patient_profile.state}" # Add more history if available in DB
             }
 
+        llm_failure_log = None
         try:
-            # 3. Transcribe (AssemblyAI)
-            print("Starting transcription...")
-            transcript_result = await AssemblyAIService.transcribe_audio_async(audio_file.file_url)
-            transcript_text = transcript_result["text"]
-            utterances = transcript_result.get("utterances", [])
-            
-            # Update AudioFile with transcription
-            audio_file.transcription = transcript_text
-            session.add(audio_file)
-            session.commit() # Commit intermediate progress
-            print("Transcription complete.")
-            
-            # 4. Generate SOAP (Gemini) - ENABLED
-            print("Generating SOAP note...")
-            start_time = time.time()
-            try:
-                soap_data = await GeminiService.generate_soap_note_async(transcript_text, utterances, patient_context)
-                latency = (time.time() - start_time) * 1000
-                
-                # Log Success
-                session.add(AILog(
-                    consultation_id=consultation.id,
-                    model_version="gemini-2.0-flash",
-                    status="SUCCESS",
-                    latency_ms=latency
-                ))
-            except Exception as llm_error:
-                # Log LLM Failure but allow flow to fail gracefully if needed (here we catch to log, then re-raise or handle)
-                session.add(AILog(
-                    consultation_id=consultation.id,
-                    model_version="gemini-2.0-flash",
-                    status="FAIL",
-                    error_message=str(llm_error)
-                ))
-                raise llm_error
-
-            soap_content = soap_data.get("soap_note", {})
-            risk_flags = soap_data.get("risk_flags", [])
-            
-            # 5. Create SOAP Note Record
-            soap_note = SOAPNote(
-                consultation_id=consultation.id,
-                soap_json=soap_content,
-                risk_flags={"flags": risk_flags}, # Wrap in dict as risk_flags is JSON type
-                confidence=transcript_result.get("confidence"), # Use STT confidence as proxy or from LLM if available
-                generated_by_ai=True
-            )
-            session.add(soap_note)
-            
+            # 3. Transcribe (AssemblyAI or the configured STT backend)
+            if stage_reached(consultation, ProcessingStage.TRANSCRIBED) and audio_file.transcription is not None:
+                logger.info("Transcription already complete, resuming.")
+            else:
+                logger.info("Starting transcription...")
+                transcript_result = await transcribe_audio_file(audio_file.file_url, trace)
+
+                # Update AudioFile with transcription
+                audio_file.transcription = transcript_result["text"]
+                audio_file.utterances = transcript_result.get("utterances", [])
+                audio_file.transcription_confidence = transcript_result.get("confidence")
+                if audio_file.duration is None and transcript_result.get("duration"):
+                    audio_file.duration = transcript_result["duration"]
+                consultation.processing_stage = ProcessingStage.TRANSCRIBED
+                session.add(audio_file)
+                session.add(consultation)
+                session.commit() # Checkpoint
+                logger.info("Transcription complete.")
+            transcript_text = audio_file.transcription
+            utterances = audio_file.utterances or []
+
+            # The SOAP note row is unique per consultation; reuse it on every run
+            soap_note = session.exec(select(SOAPNote).where(SOAPNote.consultation_id == consultation.id)).first()
+
+            # 4. Generate SOAP (Gemini or the configured LLM backend)
+            if stage_reached(consultation, ProcessingStage.SOAP_GENERATED) and soap_note:
+                logger.info("SOAP note already generated, resuming.")
+            else:
+                # The SOAP note row exists up front so streamed sections are persisted as they complete
+                if not soap_note:
+                    soap_note = SOAPNote(consultation_id=consultation.id, soap_json={}, generated_by_ai=True)
+
+                async def on_section(section: str, text: str):
+                    # Reassign (not mutate) so the JSON column is flagged dirty
+                    soap_note.soap_json = {**(soap_note.soap_json or {}), section: text}
+                    soap_note.updated_at = datetime.utcnow()
+                    session.add(soap_note)
+                    session.commit()
+                    soap_events.publish(consultation_id, {"event": "section", "section": section, "text": text})
+
+                logger.info("Generating SOAP note...")
+                model_version = get_llm_model_version()
+                start_time = time.time()
+                try:
+                    with trace.span("llm", detail={"model": model_version}) as span:
+                        soap_data = await get_llm_service().generate_soap_note_async(transcript_text, utterances, patient_context, on_section=on_section)
+                        prompt_stats = soap_data.get("prompt_stats", {})
+                        span.input_tokens = prompt_stats.get("prompt_tokens")
+                        span.output_tokens = prompt_stats.get("output_tokens")
+                        span.retries = prompt_stats.get("retries")
+                        span.detail.update({
+                            "tokens_saved": prompt_stats.get("tokens_saved"),
+                            "chunks": prompt_stats.get("chunks"),
+                            "quota_wait_ms": prompt_stats.get("quota_wait_ms"),
+                        })
+                    latency = (time.time() - start_time) * 1000
+                    if prompt_stats:
+                        logger.info(f"Prompt tokens: {prompt_stats.get('prompt_tokens')} (saved {prompt_stats.get('tokens_saved')} by compaction, {prompt_stats.get('chunks')} chunk(s))")
+
+                    # Log Success
+                    session.add(AILog(
+                        consultation_id=consultation.id,
+                        model_version=model_version,
+                        status="SUCCESS",
+                        latency_ms=latency,
+                        input_tokens=prompt_stats.get("prompt_tokens"),
+                        tokens_saved=prompt_stats.get("tokens_saved")
+                    ))
+                except Exception as llm_error:
+                    # Written by the failure handler below, after it rolls back
+                    llm_failure_log = AILog(
+                        consultation_id=consultation.id,
+                        model_version=model_version,
+                        status="FAIL",
+                        latency_ms=(time.time() - start_time) * 1000,
+                        error_message=str(llm_error)
+                    )
+                    raise llm_error
+
+                soap_content = soap_data.get("soap_note", {})
+                risk_flags = soap_data.get("risk_flags", [])
+
+                # 5. Finalize SOAP Note Record
+                soap_note.soap_json = soap_content
+                soap_note.risk_flags = {"flags": risk_flags} # Wrap in dict as risk_flags is JSON type
+                soap_note.confidence = audio_file.transcription_confidence # Use STT confidence as proxy or from LLM if available
+                soap_note.updated_at = datetime.utcnow()
+                consultation.processing_stage = ProcessingStage.SOAP_GENERATED
+                session.add(soap_note)
+                session.add(consultation)
+                session.commit() # Checkpoint
+
             # --- NEW: Phase 2 Logic ---
-            # 5a. Triage Analysis
-            if patient_profile:
-                urgency, category = TriageService.calculate_urgency(soap_note, patient_profile)
-                consultation.urgency_score = urgency
-                consultation.triage_category = category
-                print(f"Triage Result: {category} (Score: {urgency})")
-            
-            # 5b. Safety Checks
-            if patient_profile:
-                warnings = SafetyService.check_drug_interactions(soap_note, patient_profile)
-                consultation.safety_warnings = warnings
-                if warnings:
-                    print(f"Safety Warnings Found: {len(warnings)}")
+            if not stage_reached(consultation, ProcessingStage.TRIAGED):
+                # 5a. Triage Analysis
+                if patient_profile:
+                    with trace.span("triage"):
+                        urgency, category = TriageService.calculate_urgency(soap_note, patient_profile)
+                    consultation.urgency_score = urgency
+                    consultation.triage_category = category
+                    logger.info(f"Triage Result: {category} (Score: {urgency})")
+
+                # 5b. Safety Checks
+                if patient_profile:
+                    with trace.span("safety") as span:
+                        warnings = SafetyService.check_drug_interactions(soap_note, patient_profile)
+                        span.detail = {"warnings": len(warnings)}
+                    consultation.safety_warnings = warnings
+                    if warnings:
+                        logger.info(f"Safety Warnings Found: {len(warnings)}")
+                consultation.processing_stage = ProcessingStage.TRIAGED
 
             # 6. Update Final Status
             consultation.status = ConsultationStatus.COMPLETED
-            session.add(consultation)
-            session.commit()
-            
-            print(f"Processing successfully completed for {consultation_id}")
-            
+            consultation.requires_manual_review = False
+            consultation.processing_error = None
+            consultation.processing_started_at = None
+            with trace.span("commit"):
+                session.add(consultation)
+                session.commit()
+            soap_events.publish(consultation_id, {"event": "completed"})
+
+            logger.info(f"Processing successfully completed for {consultation_id}")
+
         except Exception as e:
-            print(f"Processing failed: {e}")
+            # Drop whatever the failed step left pending; after a failed flush the
+            # session accepts nothing else. The consultation reloads at its last checkpoint.
+            session.rollback()
+            logger.error(f"Processing failed at stage {consultation.processing_stage}: {e}")
             # Set status to FAILED so we can track errors in DB
-            consultation.status = ConsultationStatus.FAILED
-            consultation.requires_manual_review = True # Flag for Manual Intervention
-            
+            mark_failed(consultation, str(e))
+            if llm_failure_log is not None:
+                session.add(llm_failure_log)
+            if not stage_reached(consultation, ProcessingStage.SOAP_GENERATED):
+                # Sections streamed before the failure are not a SOAP note; the retry regenerates it
+                session.execute(
+                    delete(SOAPNote)
+                    .where(SOAPNote.consultation_id == consultation_id)
+                    .where(SOAPNote.generated_by_ai == True)
+                )
+
             # Log General Failure if not logged by LLM block
             session.add(consultation)
             session.commit()
+            soap_events.publish(consultation_id, {"event": "failed"})
 
+        # One batched write for every span of this run
+        trace.flush(session)
@@ -0,0 +1,182 @@
+import base64
+import hashlib
+import json
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, Any, List, Optional
+from uuid import UUID
+from sqlalchemy import event, or_, tuple_, text, table, column, literal
+from sqlalchemy.orm import Session as OrmSession
+from sqlmodel import Session, select, func
+from app.core.config import settings
+from app.core.metrics import cache_counters
+from app.models.base import User, UserRole, DoctorProfile
+
+_cache_hit, _cache_miss = cache_counters("doctor_directory")
+
+class DoctorDirectoryService:
+    """
+    Doctor directory: a versioned in-process cache of the public directory
+    payloads, and the indexed search behind GET /doctors/search.
+
+    Each entry holds the rendered JSON body with its strong ETag and build time,
+    so a hit (or a 304) touches neither the database nor the serializer.
+    Committed writes to DoctorProfile/User in this process bump the version;
+    writes made by other workers are picked up when the entry expires
+    (DOCTOR_DIRECTORY_CACHE_SECONDS). Stale entries stay in place until
+    rebuilt, so an unchanged body keeps its ETag and Last-Modified.
+    """
+    _version = 0
+    _entries: Dict[str, Dict[str, Any]] = {}
+    _lock = threading.Lock()
+    _fts_available: Dict[str, bool] = {} # Per database URL
+
+    @staticmethod
+    def invalidate():
+        with DoctorDirectoryService._lock:
+            DoctorDirectoryService._version += 1
+
+    @staticmethod
+    def get(key: str, build: Callable[[], bytes]) -> Dict[str, Any]:
+        """
+        Returns {"body", "etag", "last_modified"} for `key`, calling `build`
+        (which queries and serializes) only when the entry is missing or stale.
+        """
+        now = time.monotonic()
+        entry = DoctorDirectoryService._entries.get(key)
+        if entry is not None and entry["version"] == DoctorDirectoryService._version and entry["expires_at"] > now:
+            _cache_hit.inc()
+            return entry
+
+        _cache_miss.inc()
+        version = DoctorDirectoryService._version
+        body = build()
+        etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+        # An unchanged rebuild (expiry, unrelated write) keeps its validators
+        unchanged = entry is not None and entry["etag"] == etag
+        entry = {
+            "body": body,
+            "etag": etag,
+            # HTTP dates have second precision
+            "last_modified": entry["last_modified"] if unchanged else datetime.now(timezone.utc).replace(microsecond=0),
+            "version": version,
+            "expires_at": now + settings.DOCTOR_DIRECTORY_CACHE_SECONDS,
+        }
+        with DoctorDirectoryService._lock:
+            # A write that landed while building leaves the entry uncached
+            if version == DoctorDirectoryService._version:
+                DoctorDirectoryService._entries[key] = entry
+        return entry
+
+    @staticmethod
+    def encode_cursor(profile: DoctorProfile) -> str:
+        key = [profile.last_name, profile.first_name, profile.id.hex]
+        return base64.urlsafe_b64encode(json.dumps(key).encode("utf-8")).decode("ascii")
+
+    @staticmethod
+    def decode_cursor(cursor: str) -> tuple:
+        """Raises ValueError for a malformed cursor."""
+        try:
+            last_name, first_name, profile_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+            return last_name, first_name, UUID(profile_id)
+        except (TypeError, ValueError, UnicodeError) as e:
+            raise ValueError("Invalid cursor") from e
+
+    @staticmethod
+    def _name_filter(session: Session, q: str):
+        dialect = session.get_bind().dialect.name
+        if dialect == "sqlite" and DoctorDirectoryService._has_fts(session):
+            # Every word must match a name token by prefix: "jo smi" -> "jo"* "smi"*
+            tokens = re.findall(r"\w+", q)
+            if not tokens:
+                return None
+            match = " ".join(f'"{t}"*' for t in tokens)
+            matches = (
+                select(column("profile_id"))
+                .select_from(table("doctor_profiles_fts"))
+                .where(text("doctor_profiles_fts MATCH :fts_query").bindparams(fts_query=match))
+            )
+            return DoctorProfile.id.in_(matches)
+
+        # PostgreSQL (served by the trigram index) and the plain-LIKE fallback
+        term = q.lower().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        full_name = func.lower(DoctorProfile.first_name + " " + DoctorProfile.last_name)
+        return or_(full_name.like(f"{term}%", escape="\\"), full_name.like(f"% {term}%", escape="\\"))
+
+    @staticmethod
+    def _has_fts(session: Session) -> bool:
+        # Databases created before the FTS table existed fall back to LIKE
+        url = str(session.get_bind().url)
+        if url not in DoctorDirectoryService._fts_available:
+            DoctorDirectoryService._fts_available[url] = session.exec(
+                text("SELECT 1 FROM sqlite_master WHERE name = 'doctor_profiles_fts'")
+            ).first() is not None
+        return DoctorDirectoryService._fts_available[url]
+
+    @staticmethod
+    def search(
+        session: Session,
+        q: Optional[str] = None,
+        specialization: Optional[str] = None,
+        city: Optional[str] = None,
+        available: Optional[bool] = None,
+        min_fee: Optional[float] = None,
+        max_fee: Optional[float] = None,
+        cursor: Optional[str] = None,
+        limit: int = 20,
+    ) -> Dict[str, Any]:
+        """
+        Filtered doctor search ordered by (last_name, first_name, id) with keyset
+        pagination: `cursor` is the opaque next_cursor of the previous page.
+        Returns {"items": [DoctorProfile], "next_cursor": str | None}.
+        """
+        statement = select(DoctorProfile)
+        if q and q.strip():
+            condition = DoctorDirectoryService._name_filter(session, q.strip())
+            if condition is not None:
+                statement = statement.where(condition)
+        if specialization:
+            statement = statement.where(DoctorProfile.specialization == specialization)
+        if city:
+            statement = statement.where(DoctorProfile.city == city)
+        if available is not None:
+            statement = statement.where(DoctorProfile.is_available == available)
+        if min_fee is not None:
+            statement = statement.where(DoctorProfile.consultation_fee >= min_fee)
+        if max_fee is not None:
+            statement = statement.where(DoctorProfile.consultation_fee <= max_fee)
+        if cursor:
+            keys = (DoctorProfile.last_name, DoctorProfile.first_name, DoctorProfile.id)
+            values = DoctorDirectoryService.decode_cursor(cursor)
+            statement = statement.where(
+                tuple_(*keys) > tuple_(*(literal(v, k.type) for k, v in zip(keys, values)))
+            )
+
+        rows: List[DoctorProfile] = session.exec(
+            statement.order_by(DoctorProfile.last_name, DoctorProfile.first_name, DoctorProfile.id).limit(limit + 1)
+        ).all()
+        next_cursor = DoctorDirectoryService.encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+        return {"items": rows[:limit], "next_cursor": next_cursor}
+
+def _is_directory_row(target) -> bool:
+    # Patient and staff accounts are not part of the directory
+    return isinstance(target, DoctorProfile) or (isinstance(target, User) and target.role == UserRole.DOCTOR)
+
+def _note_directory_change(session, flush_context):
+    if any(_is_directory_row(target) for target in (*session.new, *session.dirty, *session.deleted)):
+        session.info["doctor_directory_changed"] = True
+
+def _invalidate_after_commit(session):
+    # Flushed rows are invisible to other connections until commit; invalidating
+    # at flush time would let a concurrent rebuild cache the old rows again
+    if session.info.pop("doctor_directory_changed", False):
+        DoctorDirectoryService.invalidate()
+
+def _forget_directory_change(session):
+    session.info.pop("doctor_directory_changed", None)
+
+event.listen(OrmSession, "after_flush", _note_directory_change)
+event.listen(OrmSession, "after_commit", _invalidate_after_commit)
+event.listen(OrmSession, "after_rollback", _forget_directory_change)
@@ -0,0 +1,33 @@
+import asyncio
+from collections import defaultdict
+from typing import Dict, List, Any
+from uuid import UUID
+
+class SoapEventBroker:
+    """
+    In-process pub/sub for consultation processing events.
+    The processor publishes SOAP sections as they stream in; SSE subscribers
+    (the doctor's open consultation view) each get their own queue.
+    """
+    def __init__(self):
+        self._subscribers: Dict[UUID, List[asyncio.Queue]] = defaultdict(list)
+
+    def subscribe(self, consultation_id: UUID) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue()
+        self._subscribers[consultation_id].append(queue)
+        return queue
+
+    def unsubscribe(self, consultation_id: UUID, queue: asyncio.Queue):
+        queues = self._subscribers.get(consultation_id)
+        if not queues:
+            return
+        if queue in queues:
+            queues.remove(queue)
+        if not queues:
+            del self._subscribers[consultation_id]
+
+    def publish(self, consultation_id: UUID, event: Dict[str, Any]):
+        for queue in self._subscribers.get(consultation_id, []):
+            queue.put_nowait(event)
+
+soap_events = SoapEventBroker()
@@ -1,114 +1,264 @@
-import google.generativeai as genai
 import json
 import asyncio
-from typing import List, Dict, Any
+import os
+from contextvars import ContextVar
+from typing import List, Dict, Any, Optional, Callable, Awaitable, Protocol, TYPE_CHECKING
 from app.core.config import settings
 
-# Configure global API key
-genai.configure(api_key=settings.GOOGLE_API_KEY)
-
-from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type, before_sleep_log
+from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type, retry_if_not_exception_type, before_sleep_log
+from app.services.rate_limit_service import gemini_limiter, estimate_tokens, is_rate_limit_error, CircuitOpenError
+from app.core.metrics import cache_counters
+from app.services.prompt_service import PromptService
+from app.services.soap_stream_parser import SoapStreamParser
 import logging
 
+if TYPE_CHECKING:
+    import google.generativeai as genai
+
 logger = logging.getLogger(__name__)
 
+SOAP_GENERATION_CONFIG = {"response_mime_type": "application/json"}
+_model_cache_hit, _model_cache_miss = cache_counters("gemini_models")
+
+# Call accounting for the current generate_soap_note_async (retries, quota wait, output tokens).
+# A shared dict, so the gathered map-phase tasks (which copy the context) add to the same counters.
+_call_stats: ContextVar[Optional[Dict[str, Any]]] = ContextVar("llm_call_stats", default=None)
+
+def _count_retry(retry_state):
+    stats = _call_stats.get()
+    if stats is not None:
+        stats["retries"] += 1
+
+# Retry policy for Gemini calls (quota errors); an open circuit fails fast into manual review
+quota_retry = retry(
+    stop=stop_after_attempt(5), # Increased attempts for quota
+    wait=wait_exponential(multiplier=2, min=4, max=60), # Exponential backoff: 4s, 8s, 16s, 32s, 60s
+    retry=retry_if_not_exception_type(CircuitOpenError),
+    before_sleep=_count_retry,
+    reraise=True
+)
+
 class GeminiService:
+    # Long-lived model clients keyed by (model name, generation config).
+    # GenerativeModel lazily binds to the SDK's process-wide async gRPC client,
+    # so reusing it keeps the channel (and its connections) alive between calls.
+    # That channel belongs to the event loop it was created on, so the cache
+    # (and the SDK clients) are rebuilt when called from a different loop.
+    # google.generativeai (~1s to import, plus gRPC) is only loaded on first use,
+    # so API workers and the local/replay providers never import it.
+    _models: Dict[tuple, Any] = {}
+    _configured = False
+    _loop_id: Optional[int] = None
+
     @staticmethod
-    @retry(
-        stop=stop_after_attempt(5), # Increased attempts for quota
-        wait=wait_exponential(multiplier=2, min=4, max=60), # Exponential backoff: 4s, 8s, 16s, 32s, 60s
-        reraise=True
-    )
-    async def generate_soap_note_async(transcript_text: str, speaker_labels: List[Dict[str, Any]] = None, patient_context: Dict[str, Any] = None) -> Dict[str, Any]:
+    def get_model(model_name: Optional[str] = None, generation_config: Optional[Dict[str, Any]] = None) -> "genai.GenerativeModel":
         """
-        Generates a structured SOAP note from the transcript using Gemini.
-        Returns a dictionary matching the SOAP note schema.
-        Includes robust retry logic for 429 Quota errors.
+        Returns a cached GenerativeModel for the given name/config, creating it on first use.
         """
-        # Construct a speaker-aware transcript if labels are provided
-        formatted_transcript = transcript_text
-        if speaker_labels:
-            formatted_lines = []
-            for utter in speaker_labels:
-                 # utter is expected to be a dict like {'speaker': 'A', 'text': '...', ...}
-                 speaker = utter.get('speaker', 'Unknown')
-                 text = utter.get('text', '')
-                 formatted_lines.append(f"Speaker {speaker}: {text}")
-            formatted_transcript = "\n".join(formatted_lines)
-            
-        # Format Patient Context for Prompt
-        context_str = "Unknown"
-        if patient_context:
-            context_str = (
-                f"Name: {patient_context.get('first_name', '')} {patient_context.get('last_name', '')}\n"
-                f"Age: {patient_context.get('age', 'N/A')}\n"
-                f"Gender: {patient_context.get('gender', 'N/A')}\n"
-                f"Medical History/Notes: {patient_context.get('notes', 'None provided')}"
-            )
-            
-        # Initialize Model (gemini-2.5-flash is available and efficient)
-        model = genai.GenerativeModel(
-            'gemini-2.5-flash',
-            generation_config={"response_mime_type": "application/json"}
-        )
-        
-        prompt = f"""
-        You are an expert medical scribe. Your task is to analyze the following Doctor-Patient consultation transcript and generate a professional, structured SOAP note encoded as JSON.
-        
-        Patient Context:
-        {context_str}
-        
-        Transcript:
-        {formatted_transcript}
-        
-        Instructions:
-        1. Analyze the transcript in the context of the patient's demographics and history.
-        2. Extrapolate the Subjective, Objective, Assessment, and Plan sections.
-        3. **STRICT GROUNDING**: Do NOT infer information not present in the audio. If a vital sign or detail is not explicitly stated or strongly implied by the transcript, do NOT invent it.
-        4. **UNCERTAINTY**: If a term is ambiguous (e.g., "measure" vs "mention") or if the speaker is unclear, flag it in the "low_confidence" list.
-        5. Identify any Risk Flags (e.g., Suicide risk, Severe allergies, Abuse).
-        6. Return STRICTLY valid JSON. No markdown formatting.
-        
-        Required JSON Structure:
-        {{
-            "soap_note": {{
-                "subjective": "Patient's presenting complaints, history of present illness...",
-                "objective": "Observations, physical findings (if mentioned), vitals...",
-                "assessment": "Diagnosis or differential diagnoses...",
-                "plan": "Treatment plan, medications, follow-up..."
-            }},
-            "low_confidence": ["list", "of", "ambiguous", "terms"],
-            "risk_flags": ["Risk 1", "Risk 2"] 
-        }}
+        model_name = model_name or settings.GEMINI_MODEL
+        key = (model_name, json.dumps(generation_config or {}, sort_keys=True))
+        try:
+            loop_id = id(asyncio.get_running_loop())
+        except RuntimeError:
+            loop_id = None
+        if loop_id != GeminiService._loop_id:
+            # Drop models bound to another (likely closed) loop, e.g. repeated asyncio.run in scripts
+            GeminiService._models.clear()
+            GeminiService._configured = False
+            GeminiService._loop_id = loop_id
+        model = GeminiService._models.get(key)
+        if model is not None:
+            _model_cache_hit.inc()
+        else:
+            _model_cache_miss.inc()
+            import google.generativeai as genai
+            if not GeminiService._configured:
+                # Configure the API key on first use rather than at import time;
+                # configuring again also resets the SDK's shared clients for this loop
+                genai.configure(api_key=settings.GOOGLE_API_KEY)
+                GeminiService._configured = True
+            model = genai.GenerativeModel(model_name, generation_config=generation_config)
+            GeminiService._models[key] = model
+        return model
+
+    @staticmethod
+    async def _call_model_async(prompt: str, generation_config: Optional[Dict[str, Any]] = None, on_text: Optional[Callable[[str], Awaitable[None]]] = None) -> str:
+        """
+        Single Gemini call behind the shared limiter. Returns the response text.
+        With `on_text`, the streaming API is used and each text chunk is passed
+        to the callback as it arrives.
         """
-        
-        # Offload the blocking API call to a thread
-        loop = asyncio.get_event_loop()
-        
+        # Reuse the configured model client (gemini-2.5-flash by default)
+        model = GeminiService.get_model(settings.GEMINI_MODEL, generation_config)
+
+        # Wait for our share of the shared requests/min and tokens/min quota
+        waited = await gemini_limiter.acquire(tokens=estimate_tokens(prompt))
+        stats = _call_stats.get()
+        if stats is not None:
+            stats["quota_wait_ms"] += waited * 1000
+
         try:
-            print("   (Gemini) Sending request...")
-            response = await loop.run_in_executor(
-                None, 
-                lambda: model.generate_content(prompt)
-            )
+            logger.debug("Gemini: sending request")
+            # Native async call path - no threadpool thread held while waiting
+            if on_text is None:
+                response = await model.generate_content_async(prompt)
+                text = response.text
+            else:
+                response = await model.generate_content_async(prompt, stream=True)
+                parts = []
+                async for chunk in response:
+                    parts.append(chunk.text)
+                    await on_text(chunk.text)
+                text = "".join(parts)
+            gemini_limiter.record_success()
+            if stats is not None:
+                stats["output_tokens"] += estimate_tokens(text)
+            return text
         except Exception as e:
-            # Check for quota errors to print explicit warning (Tenacity handles the retry)
-            if "429" in str(e) or "quota" in str(e).lower() or "resource exhausted" in str(e).lower():
-                print(f"   ⚠️ Quota Limit Hit (429). Retrying in background...")
+            rate_limited = is_rate_limit_error(e)
+            gemini_limiter.record_failure(rate_limited=rate_limited)
+            # Check for quota errors to log an explicit warning (Tenacity handles the retry)
+            if rate_limited:
+                logger.warning("Gemini quota limit hit (429), retrying in background")
             raise e
-        
+
+    @staticmethod
+    def parse_soap_json(text: str) -> Dict[str, Any]:
         try:
             # Parse JSON result
-            result_json = json.loads(response.text)
-            return result_json
+            return json.loads(text, strict=False)
         except json.JSONDecodeError:
             # Fallback if strict JSON fails (rare with response_mime_type set)
-            print(f"JSON Decode Error. Raw response: {response.text}")
+            # Length only: the raw output is clinical content (PHI)
+            logger.warning("Gemini returned invalid JSON (%d chars), retrying without markdown fences", len(text))
             # Attempt to clean potential markdown
-            cleaned_text = response.text.replace("```json", "").replace("```", "").strip()
+            cleaned_text = text.replace("```json", "").replace("```", "").strip()
             try:
-                return json.loads(cleaned_text)
+                return json.loads(cleaned_text, strict=False)
             except:
                  raise Exception("Failed to generate valid JSON SOAP note")
         except Exception as e:
             raise Exception(f"Gemini generation failed: {str(e)}")
+
+    @staticmethod
+    @quota_retry
+    async def _generate_soap_json_async(prompt: str, on_section: Optional[Callable[[str, str], Awaitable[None]]] = None) -> Dict[str, Any]:
+        if on_section is None:
+            text = await GeminiService._call_model_async(prompt, SOAP_GENERATION_CONFIG)
+            return GeminiService.parse_soap_json(text)
+
+        # Stream the response and hand over each SOAP section as soon as its JSON string closes
+        parser = SoapStreamParser()
+        streaming = True
+
+        async def on_text(chunk: str):
+            # Streaming is best-effort: a parser or callback error ends it, not the provider call
+            nonlocal streaming
+            if not streaming:
+                return
+            try:
+                for section, value in parser.feed(chunk):
+                    await on_section(section, value)
+            except Exception as e:
+                streaming = False
+                logger.warning("SOAP section streaming stopped: %s", e)
+
+        text = await GeminiService._call_model_async(prompt, SOAP_GENERATION_CONFIG, on_text=on_text)
+        return GeminiService.parse_soap_json(text)
+
+    @staticmethod
+    @quota_retry
+    async def _summarize_chunk_async(prompt: str) -> str:
+        text = await GeminiService._call_model_async(prompt)
+        return text.strip()
+
+    @staticmethod
+    async def generate_soap_note_async(
+        transcript_text: str,
+        speaker_labels: List[Dict[str, Any]] = None,
+        patient_context: Dict[str, Any] = None,
+        on_section: Optional[Callable[[str, str], Awaitable[None]]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Generates a structured SOAP note from the transcript using Gemini.
+        Returns a dictionary matching the SOAP note schema, plus "prompt_stats"
+        with the token accounting from the prompt builder.
+        If `on_section` is given, the response is streamed and the callback receives
+        (section, text) for each SOAP section as soon as it is complete.
+        Includes robust retry logic for 429 Quota errors; "prompt_stats" also
+        reports the retries, quota wait and (estimated) output tokens of the run.
+        """
+        call_stats = {"retries": 0, "quota_wait_ms": 0.0, "output_tokens": 0}
+        token = _call_stats.set(call_stats)
+        try:
+            result = await GeminiService._generate_soap_note_async(transcript_text, speaker_labels, patient_context, on_section)
+        finally:
+            _call_stats.reset(token)
+        call_stats["quota_wait_ms"] = round(call_stats["quota_wait_ms"], 1)
+        result["prompt_stats"].update(call_stats)
+        return result
+
+    @staticmethod
+    async def _generate_soap_note_async(
+        transcript_text: str,
+        speaker_labels: List[Dict[str, Any]],
+        patient_context: Dict[str, Any],
+        on_section: Optional[Callable[[str, str], Awaitable[None]]],
+    ) -> Dict[str, Any]:
+        # Compact the transcript (fillers dropped, same-speaker turns merged) within the token budget
+        build = PromptService.build_soap_prompt(transcript_text, speaker_labels, patient_context)
+        stats = build["stats"]
+        prompt = build["prompt"]
+
+        if prompt is None:
+            # Over budget: map each chunk to a fact summary (the limiter paces these),
+            # then reduce the ordered summaries into one SOAP note
+            logger.info("Gemini: transcript over budget, summarizing %d chunks", len(build["chunks"]))
+            summaries = await asyncio.gather(*(GeminiService._summarize_chunk_async(c) for c in build["chunks"]))
+            summary_text = "\n\n".join(f"Part {i + 1}:\n{summary}" for i, summary in enumerate(summaries))
+            prompt = PromptService.soap_prompt(summary_text, build["context"], label="Transcript Summary (chronological parts)")
+            stats["prompt_tokens"] = PromptService.count_tokens(prompt)
+
+        result = await GeminiService._generate_soap_json_async(prompt, on_section)
+        result["prompt_stats"] = stats
+        return result
+
+class LLMProvider(Protocol):
+    """
+    Interface every SOAP generation backend implements. Returns
+    {"soap_note": {...}, "low_confidence": [...], "risk_flags": [...], "prompt_stats": {...}}
+    and calls `on_section(section, text)` as sections become available.
+    """
+    @staticmethod
+    async def generate_soap_note_async(
+        transcript_text: str,
+        speaker_labels: List[Dict[str, Any]] = None,
+        patient_context: Dict[str, Any] = None,
+        on_section: Optional[Callable[[str, str], Awaitable[None]]] = None,
+    ) -> Dict[str, Any]: ...
+
+def get_llm_service() -> LLMProvider:
+    """
+    Returns the SOAP generator selected by Settings.LLM_PROVIDER ("gemini", "local" or "replay").
+    """
+    provider = settings.LLM_PROVIDER.lower()
+    if provider == "gemini":
+        return GeminiService
+    if provider == "local":
+        from app.services.local_llm_service import LocalLlamaService
+        return LocalLlamaService
+    if provider == "replay":
+        from app.services.replay_llm_service import FixtureReplayService
+        return FixtureReplayService
+    raise ValueError(f"Unknown LLM_PROVIDER: {settings.LLM_PROVIDER}")
+
+def get_llm_model_version() -> str:
+    """
+    Model identifier recorded in AILog / pipeline spans for the configured provider.
+    """
+    provider = settings.LLM_PROVIDER.lower()
+    if provider == "gemini":
+        return settings.GEMINI_MODEL
+    if provider == "local":
+        return f"local:{os.path.basename(settings.LOCAL_LLM_MODEL_PATH or 'unknown')}"
+    return provider
@@ -0,0 +1,91 @@
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Callable, Awaitable
+from app.core.config import settings
+from app.services.prompt_service import PromptService
+from app.services.soap_stream_parser import SOAP_SECTIONS
+
+class LocalLlamaService:
+    """
+    CPU SOAP generation with a local GGUF model through llama-cpp-python.
+    llama.cpp releases the GIL while decoding; calls are serialized on one
+    dedicated thread because a Llama instance is not safe for concurrent use.
+    """
+    _llm = None
+    _executor: Optional[ThreadPoolExecutor] = None
+
+    @staticmethod
+    def get_llm():
+        if LocalLlamaService._llm is None:
+            try:
+                from llama_cpp import Llama
+            except ImportError:
+                raise RuntimeError("LLM_PROVIDER=local requires the optional 'llama-cpp-python' package")
+            if not settings.LOCAL_LLM_MODEL_PATH:
+                raise RuntimeError("LLM_PROVIDER=local requires LOCAL_LLM_MODEL_PATH")
+            LocalLlamaService._llm = Llama(
+                model_path=settings.LOCAL_LLM_MODEL_PATH,
+                n_ctx=settings.LOCAL_LLM_CONTEXT,
+                n_threads=settings.LOCAL_LLM_THREADS,
+                verbose=False,
+            )
+        return LocalLlamaService._llm
+
+    @staticmethod
+    def _complete(prompt: str, json_mode: bool) -> str:
+        llm = LocalLlamaService.get_llm()
+        kwargs = {"response_format": {"type": "json_object"}} if json_mode else {}
+        response = llm.create_chat_completion(
+            messages=[{"role": "user", "content": prompt}],
+            temperature=0.2,
+            **kwargs
+        )
+        return response["choices"][0]["message"]["content"]
+
+    @staticmethod
+    async def _complete_async(prompt: str, json_mode: bool = False) -> str:
+        if LocalLlamaService._executor is None:
+            LocalLlamaService._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="llama")
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(LocalLlamaService._executor, LocalLlamaService._complete, prompt, json_mode)
+
+    @staticmethod
+    async def generate_soap_note_async(
+        transcript_text: str,
+        speaker_labels: List[Dict[str, Any]] = None,
+        patient_context: Dict[str, Any] = None,
+        on_section: Optional[Callable[[str, str], Awaitable[None]]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Same contract as GeminiService.generate_soap_note_async. Sections are
+        handed to `on_section` once the full JSON is parsed.
+        """
+        build = PromptService.build_soap_prompt(
+            transcript_text, speaker_labels, patient_context,
+            token_budget=min(settings.PROMPT_TRANSCRIPT_TOKEN_BUDGET, settings.LOCAL_LLM_CONTEXT // 2)
+        )
+        stats = build["stats"]
+        prompt = build["prompt"]
+
+        if prompt is None:
+            # Map-reduce over the chunks, sequentially (one model instance)
+            summaries = [await LocalLlamaService._complete_async(c) for c in build["chunks"]]
+            summary_text = "\n\n".join(f"Part {i + 1}:\n{s.strip()}" for i, s in enumerate(summaries))
+            prompt = PromptService.soap_prompt(summary_text, build["context"], label="Transcript Summary (chronological parts)")
+            stats["prompt_tokens"] = PromptService.count_tokens(prompt)
+
+        text = await LocalLlamaService._complete_async(prompt, json_mode=True)
+        try:
+            result = json.loads(text)
+        except json.JSONDecodeError:
+            raise Exception("Failed to generate valid JSON SOAP note")
+
+        if on_section is not None:
+            soap_note = result.get("soap_note", {})
+            for section in SOAP_SECTIONS:
+                if section in soap_note:
+                    await on_section(section, soap_note[section])
+
+        result["prompt_stats"] = stats
+        return result
@@ -0,0 +1,84 @@
+import asyncio
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Dict, Any
+from uuid import uuid4
+from app.core.config import settings
+
+# Per-worker-process model cache (loaded once per process, reused for every file)
+_worker_model = None
+
+def _transcribe_in_worker(file_path: str, model_size: str, compute_type: str, beam_size: int) -> Dict[str, Any]:
+    """
+    Runs inside a pool process. faster-whisper is imported here so the API
+    process never loads it, and the quantized model is created once per worker.
+    """
+    global _worker_model
+    if _worker_model is None:
+        try:
+            from faster_whisper import WhisperModel
+        except ImportError:
+            raise RuntimeError("STT_PROVIDER=local requires the optional 'faster-whisper' package")
+        _worker_model = WhisperModel(model_size, device="cpu", compute_type=compute_type)
+
+    segments, info = _worker_model.transcribe(file_path, beam_size=beam_size, vad_filter=True)
+
+    utterances = []
+    texts = []
+    confidences = []
+    for segment in segments:
+        text = segment.text.strip()
+        if not text:
+            continue
+        texts.append(text)
+        # avg_logprob is per-token log probability; exp() gives a 0..1 proxy
+        confidences.append(math.exp(segment.avg_logprob))
+        utterances.append({
+            # No diarization in the local engine - a single speaker track
+            "speaker": "A",
+            "text": text,
+            "start": int(segment.start * 1000),
+            "end": int(segment.end * 1000),
+        })
+
+    return {
+        "text": " ".join(texts),
+        "utterances": utterances,
+        "confidence": sum(confidences) / len(confidences) if confidences else None,
+        "duration": info.duration,
+    }
+
+class LocalWhisperService:
+    """
+    Offline CPU speech-to-text using quantized faster-whisper models in a process pool.
+    No network and no quota - used for local runs and load tests.
+    """
+    _pool: Optional[ProcessPoolExecutor] = None
+
+    @staticmethod
+    def get_pool() -> ProcessPoolExecutor:
+        if LocalWhisperService._pool is None:
+            LocalWhisperService._pool = ProcessPoolExecutor(max_workers=settings.LOCAL_STT_WORKERS)
+        return LocalWhisperService._pool
+
+    @staticmethod
+    async def transcribe_audio_async(file_path: str) -> dict:
+        """
+        Transcribes a local audio file in the worker pool.
+        Returns the same structure as AssemblyAIService.
+        """
+        if not os.path.exists(file_path):
+            raise Exception(f"Transcription failed: file not found: {file_path}")
+
+        loop = asyncio.get_running_loop()
+        result = await loop.run_in_executor(
+            LocalWhisperService.get_pool(),
+            _transcribe_in_worker,
+            file_path,
+            settings.LOCAL_STT_MODEL,
+            settings.LOCAL_STT_COMPUTE_TYPE,
+            settings.LOCAL_STT_BEAM_SIZE,
+        )
+        result["id"] = f"local-{uuid4()}"
+        return result
@@ -0,0 +1,162 @@
+import re
+from typing import List, Dict, Any, Optional
+from app.core.config import settings
+from app.services.rate_limit_service import estimate_tokens
+
+# Disfluencies that carry no clinical meaning: standalone um/uh/erm/hmm, lowercase or
+# sentence-capitalized. Case-sensitive and never after a number or inside a token,
+# so units and abbreviations survive ("5 um", "mm", "ER", "Hmm-level" ...).
+FILLER_PATTERN = re.compile(r"(?<![\w/.-])(?<!\d )(?:[Uu]m+|[Uu]h+|[Ee]rm+|[Hh]m{2,})(?![\w/-])[,.]?\s*")
+# Immediate word repetitions from stutters ("I I think" -> "I think")
+REPEAT_PATTERN = re.compile(r"\b([A-Za-z]+)(?:[\s,]+\1\b)+", re.IGNORECASE)
+# Repeats that are grammatical or carry emphasis ("had had", "that that", "very very")
+GRAMMATICAL_DOUBLES = {"had", "that", "is", "was", "do", "does", "very", "really", "no"}
+WHITESPACE_PATTERN = re.compile(r"\s+")
+SENTENCE_SPLIT_PATTERN = re.compile(r"(?<=[.!?])\s+")
+
+SOAP_INSTRUCTIONS = """Instructions:
+1. Analyze the transcript in the context of the patient's demographics and history.
+2. Extrapolate the Subjective, Objective, Assessment, and Plan sections.
+3. **STRICT GROUNDING**: Do NOT infer information not present in the audio. If a vital sign or detail is not explicitly stated or strongly implied by the transcript, do NOT invent it.
+4. **UNCERTAINTY**: If a term is ambiguous (e.g., "measure" vs "mention") or if the speaker is unclear, flag it in the "low_confidence" list.
+5. Identify any Risk Flags (e.g., Suicide risk, Severe allergies, Abuse).
+6. Return STRICTLY valid JSON. No markdown formatting.
+
+Required JSON Structure:
+{"soap_note": {"subjective": "Patient's presenting complaints, history of present illness...", "objective": "Observations, physical findings (if mentioned), vitals...", "assessment": "Diagnosis or differential diagnoses...", "plan": "Treatment plan, medications, follow-up..."}, "low_confidence": ["list", "of", "ambiguous", "terms"], "risk_flags": ["Risk 1", "Risk 2"]}"""
+
+CHUNK_SUMMARY_INSTRUCTIONS = """You are an expert medical scribe. The following is one part of a longer Doctor-Patient consultation transcript.
+Extract every clinically relevant fact stated in this part (complaints, history, findings, vitals, diagnoses discussed, medications, plans, risks, ambiguous terms), as concise bullet points attributed to the speaker.
+Do NOT infer anything that is not stated. Return plain text bullet points only."""
+
+class PromptService:
+    @staticmethod
+    def count_tokens(text: str) -> int:
+        return estimate_tokens(text) if text else 0
+
+    @staticmethod
+    def clean_text(text: str) -> str:
+        """Drops disfluencies and stutter repetitions, collapsing whitespace."""
+        text = FILLER_PATTERN.sub("", text or "")
+        text = REPEAT_PATTERN.sub(
+            lambda m: m.group(0) if m.group(1).lower() in GRAMMATICAL_DOUBLES else m.group(1), text
+        )
+        return WHITESPACE_PATTERN.sub(" ", text).strip()
+
+    @staticmethod
+    def compact_utterances(utterances: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Cleans each utterance and merges consecutive utterances from the same speaker,
+        so the speaker label is only emitted on turn changes.
+        """
+        compacted: List[Dict[str, Any]] = []
+        for utter in utterances:
+            text = PromptService.clean_text(utter.get("text", ""))
+            if not text:
+                continue
+            speaker = utter.get("speaker", "Unknown")
+            if compacted and compacted[-1]["speaker"] == speaker:
+                compacted[-1]["text"] = f"{compacted[-1]['text']} {text}"
+                if utter.get("end") is not None:
+                    compacted[-1]["end"] = utter.get("end")
+            else:
+                compacted.append({"speaker": speaker, "text": text, "start": utter.get("start"), "end": utter.get("end")})
+        return compacted
+
+    @staticmethod
+    def format_utterances(utterances: List[Dict[str, Any]]) -> str:
+        return "\n".join(f"Speaker {u.get('speaker', 'Unknown')}: {u.get('text', '')}" for u in utterances)
+
+    @staticmethod
+    def format_patient_context(patient_context: Optional[Dict[str, Any]]) -> str:
+        if not patient_context:
+            return "Unknown"
+        return (
+            f"Name: {patient_context.get('first_name', '')} {patient_context.get('last_name', '')}\n"
+            f"Age: {patient_context.get('age', 'N/A')}\n"
+            f"Gender: {patient_context.get('gender', 'N/A')}\n"
+            f"Medical History/Notes: {patient_context.get('notes', 'None provided')}"
+        )
+
+    @staticmethod
+    def chunk_lines(lines: List[str], token_budget: int) -> List[str]:
+        """Greedily packs whole transcript lines into chunks of at most `token_budget` tokens."""
+        chunks: List[str] = []
+        current: List[str] = []
+        current_tokens = 0
+        for line in lines:
+            line_tokens = PromptService.count_tokens(line) + 1
+            if current and current_tokens + line_tokens > token_budget:
+                chunks.append("\n".join(current))
+                current, current_tokens = [], 0
+            current.append(line)
+            current_tokens += line_tokens
+        if current:
+            chunks.append("\n".join(current))
+        return chunks
+
+    @staticmethod
+    def soap_prompt(transcript: str, context_str: str, label: str = "Transcript") -> str:
+        return (
+            "You are an expert medical scribe. Your task is to analyze the following Doctor-Patient consultation "
+            "transcript and generate a professional, structured SOAP note encoded as JSON.\n\n"
+            f"Patient Context:\n{context_str}\n\n"
+            f"{label}:\n{transcript}\n\n"
+            f"{SOAP_INSTRUCTIONS}"
+        )
+
+    @staticmethod
+    def chunk_summary_prompt(chunk: str, index: int, total: int) -> str:
+        return f"{CHUNK_SUMMARY_INSTRUCTIONS}\n\nTranscript part {index} of {total}:\n{chunk}"
+
+    @staticmethod
+    def build_soap_prompt(
+        transcript_text: str,
+        utterances: Optional[List[Dict[str, Any]]] = None,
+        patient_context: Optional[Dict[str, Any]] = None,
+        token_budget: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """
+        Builds the SOAP prompt from a compacted transcript.
+
+        Returns a dict with:
+          - "prompt": the single-shot prompt (None when map-reduce is required)
+          - "chunks": map-step prompts when the transcript exceeds the budget
+          - "context": formatted patient context, for the reduce step
+          - "stats": raw vs compact token counts and tokens saved
+        """
+        token_budget = token_budget or settings.PROMPT_TRANSCRIPT_TOKEN_BUDGET
+        context_str = PromptService.format_patient_context(patient_context)
+
+        if utterances:
+            raw_transcript = PromptService.format_utterances(utterances)
+            lines = PromptService.format_utterances(PromptService.compact_utterances(utterances)).split("\n")
+        else:
+            # No diarization: sentences become the unit for chunking
+            raw_transcript = transcript_text or ""
+            cleaned = PromptService.clean_text(raw_transcript)
+            lines = SENTENCE_SPLIT_PATTERN.split(cleaned) if cleaned else []
+        compact_transcript = "\n".join(lines) if utterances else " ".join(lines)
+
+        raw_tokens = PromptService.count_tokens(raw_transcript)
+        compact_tokens = PromptService.count_tokens(compact_transcript)
+        stats = {
+            "raw_transcript_tokens": raw_tokens,
+            "compact_transcript_tokens": compact_tokens,
+            "tokens_saved": max(0, raw_tokens - compact_tokens),
+            "chunks": 1,
+        }
+
+        if compact_tokens <= token_budget:
+            prompt = PromptService.soap_prompt(compact_transcript, context_str)
+            stats["prompt_tokens"] = PromptService.count_tokens(prompt)
+            return {"prompt": prompt, "chunks": [], "context": context_str, "stats": stats}
+
+        chunks = PromptService.chunk_lines(lines, token_budget)
+        stats["chunks"] = len(chunks)
+        return {
+            "prompt": None,
+            "chunks": [PromptService.chunk_summary_prompt(c, i + 1, len(chunks)) for i, c in enumerate(chunks)],
+            "context": context_str,
+            "stats": stats,
+        }
@@ -0,0 +1,221 @@
+import asyncio
+import logging
+import time
+from typing import Optional, Dict, Any
+from app.core.config import settings
+from app.core.metrics import PROVIDER_ERRORS, PROVIDER_QUOTA_WAIT
+
+logger = logging.getLogger(__name__)
+
+class CircuitOpenError(Exception):
+    """Raised when a provider's circuit is open and calls should fail fast."""
+    pass
+
+class TokenBucket:
+    """
+    Classic token bucket refilled continuously at `rate_per_minute`.
+    Capacity defaults to one minute's worth of tokens.
+    """
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        self.rate_per_second = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else rate_per_minute
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+
+    def _refill(self, now: float):
+        elapsed = now - self.updated_at
+        if elapsed > 0:
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.rate_per_second)
+            self.updated_at = now
+
+    def time_until_available(self, amount: float, now: Optional[float] = None) -> float:
+        """Seconds to wait before `amount` tokens can be taken (0 if available now)."""
+        now = time.monotonic() if now is None else now
+        self._refill(now)
+        # Requests larger than the bucket can never fit; let them through once full
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate_per_second
+
+    def available(self, now: Optional[float] = None) -> float:
+        self._refill(time.monotonic() if now is None else now)
+        return self.tokens
+
+    def consume(self, amount: float):
+        self.tokens -= min(amount, self.capacity)
+
+class CircuitBreaker:
+    """
+    CLOSED -> OPEN after `failure_threshold` consecutive failures.
+    OPEN -> HALF_OPEN after `reset_timeout` seconds; one trial call decides the next state.
+    HALF_OPEN -> OPEN when the trial has not reported back within `trial_timeout`
+    seconds (cancelled, or died on a non-Exception), counted as a failure.
+    """
+    CLOSED = "CLOSED"
+    OPEN = "OPEN"
+    HALF_OPEN = "HALF_OPEN"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 60.0, trial_timeout: float = 120.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.trial_timeout = trial_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trial_started_at = 0.0
+
+    def before_call(self, name: str):
+        now = time.monotonic()
+        if self.state == self.HALF_OPEN and now - self.trial_started_at >= self.trial_timeout:
+            logger.warning("%s circuit: trial call never reported back, reopening", name)
+            self.record_failure()
+        if self.state == self.OPEN:
+            if now - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self.trial_started_at = now
+            else:
+                raise CircuitOpenError(f"{name} circuit open - failing fast")
+        elif self.state == self.HALF_OPEN:
+            # A trial call is already in flight
+            raise CircuitOpenError(f"{name} circuit half-open - trial call in progress")
+
+    def retry_after(self) -> float:
+        """Seconds until an open circuit lets a trial call through (0 when not open)."""
+        if self.state != self.OPEN:
+            return 0.0
+        return max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+
+    def record_success(self):
+        self.state = self.CLOSED
+        self.failures = 0
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+
+class ProviderLimiter:
+    """
+    Shared per-process limiter for one AI provider: requests/min and tokens/min
+    buckets in front of a circuit breaker, plus wait-time metrics.
+    """
+    def __init__(
+        self,
+        name: str,
+        requests_per_minute: float,
+        tokens_per_minute: Optional[float] = None,
+        failure_threshold: int = 5,
+        reset_timeout: float = 60.0,
+        trial_timeout: float = 120.0,
+    ):
+        self.name = name
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout, trial_timeout)
+        self._lock: Optional[asyncio.Lock] = None
+        self._lock_loop_id: Optional[int] = None
+
+        # Metrics (Prometheus children bound once per provider)
+        self._wait_histogram = PROVIDER_QUOTA_WAIT.labels(name)
+        self._error_counters = {kind: PROVIDER_ERRORS.labels(name, kind) for kind in ("rate_limited", "error", "circuit_open")}
+        self.acquisitions = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.rejections = 0
+
+    async def acquire(self, tokens: int = 0) -> float:
+        """
+        Waits until the request (and `tokens` input tokens) fit the quota.
+        Raises CircuitOpenError without waiting if the circuit is open.
+        Returns the seconds spent waiting.
+        """
+        try:
+            self.breaker.before_call(self.name)
+        except CircuitOpenError:
+            self.rejections += 1
+            self._error_counters["circuit_open"].inc()
+            raise
+
+        loop_id = id(asyncio.get_running_loop())
+        if self._lock is None or self._lock_loop_id != loop_id:
+            # asyncio.Lock binds to the loop it first waits on (e.g. repeated asyncio.run in scripts)
+            self._lock = asyncio.Lock()
+            self._lock_loop_id = loop_id
+
+        waited = 0.0
+        # Serialize acquirers so concurrent consultations queue up instead of all firing at once
+        async with self._lock:
+            while True:
+                delay = self.requests.time_until_available(1)
+                if self.tokens is not None and tokens:
+                    delay = max(delay, self.tokens.time_until_available(tokens))
+                if delay <= 0:
+                    break
+                await asyncio.sleep(delay)
+                waited += delay
+            self.requests.consume(1)
+            if self.tokens is not None and tokens:
+                self.tokens.consume(tokens)
+
+        self.acquisitions += 1
+        self.total_wait_seconds += waited
+        self.max_wait_seconds = max(self.max_wait_seconds, waited)
+        self._wait_histogram.observe(waited)
+        if waited >= 1.0:
+            logger.info("%s limiter: waited %.2fs for quota", self.name, waited)
+        return waited
+
+    def headroom(self) -> int:
+        """Requests that could start right now without waiting (0 while the circuit is open)."""
+        if self.breaker.retry_after() > 0:
+            return 0
+        return int(self.requests.available())
+
+    def record_success(self):
+        self.breaker.record_success()
+
+    def record_failure(self, rate_limited: bool = False):
+        self._error_counters["rate_limited" if rate_limited else "error"].inc()
+        self.breaker.record_failure()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "provider": self.name,
+            "circuit_state": self.breaker.state,
+            "acquisitions": self.acquisitions,
+            "rejections": self.rejections,
+            "total_wait_seconds": round(self.total_wait_seconds, 3),
+            "max_wait_seconds": round(self.max_wait_seconds, 3),
+            "avg_wait_seconds": round(self.total_wait_seconds / self.acquisitions, 3) if self.acquisitions else 0.0,
+        }
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """True for provider quota errors (HTTP 429 / "resource exhausted")."""
+    response = getattr(error, "response", None)
+    if getattr(response, "status_code", None) == 429:
+        return True
+    message = str(error).lower()
+    return "429" in message or "quota" in message or "resource exhausted" in message
+
+def estimate_tokens(text: str) -> int:
+    """Rough token estimate (~4 characters per token) used for tokens/min budgeting."""
+    return max(1, len(text) // 4)
+
+# Shared limiters - one per provider, used by the STT and LLM services
+gemini_limiter = ProviderLimiter(
+    "gemini",
+    requests_per_minute=settings.GEMINI_REQUESTS_PER_MINUTE,
+    tokens_per_minute=settings.GEMINI_TOKENS_PER_MINUTE,
+    failure_threshold=settings.CIRCUIT_FAILURE_THRESHOLD,
+    reset_timeout=settings.CIRCUIT_RESET_SECONDS,
+    trial_timeout=settings.CIRCUIT_TRIAL_TIMEOUT_SECONDS,
+)
+assemblyai_limiter = ProviderLimiter(
+    "assemblyai",
+    requests_per_minute=settings.ASSEMBLYAI_REQUESTS_PER_MINUTE,
+    failure_threshold=settings.CIRCUIT_FAILURE_THRESHOLD,
+    reset_timeout=settings.CIRCUIT_RESET_SECONDS,
+    trial_timeout=settings.STT_TIMEOUT_SECONDS, # A trial transcription may legitimately poll this long
+)
@@ -0,0 +1,61 @@
+import asyncio
+import hashlib
+import json
+import random
+from typing import List, Dict, Any, Optional, Callable, Awaitable
+from app.core.config import settings
+from app.services.prompt_service import PromptService
+from app.services.soap_stream_parser import SOAP_SECTIONS
+
+class FixtureReplayService:
+    """
+    Deterministic LLM stand-in for load tests and offline runs.
+    Serves SOAP notes from fixtures/mock_soap_data.json with configurable
+    latency, jitter and injected errors - no network, no quota.
+    The same transcript always gets the same case, latency and error outcome.
+    """
+    _cases: Optional[List[Dict[str, Any]]] = None
+
+    @staticmethod
+    def load_cases() -> List[Dict[str, Any]]:
+        if FixtureReplayService._cases is None:
+            with open(settings.LLM_FIXTURE_PATH, "r") as f:
+                FixtureReplayService._cases = json.load(f)
+        return FixtureReplayService._cases
+
+    @staticmethod
+    async def generate_soap_note_async(
+        transcript_text: str,
+        speaker_labels: List[Dict[str, Any]] = None,
+        patient_context: Dict[str, Any] = None,
+        on_section: Optional[Callable[[str, str], Awaitable[None]]] = None,
+    ) -> Dict[str, Any]:
+        # Build the real prompt so CPU cost and prompt_stats match the Gemini path
+        build = PromptService.build_soap_prompt(transcript_text, speaker_labels, patient_context)
+
+        seed = int(hashlib.sha256((transcript_text or "").encode("utf-8")).hexdigest(), 16)
+        rng = random.Random(seed)
+        cases = FixtureReplayService.load_cases()
+        case = cases[seed % len(cases)]
+
+        latency = max(0.0, settings.LLM_REPLAY_LATENCY_MS + rng.uniform(-1, 1) * settings.LLM_REPLAY_JITTER_MS) / 1000
+        fail = rng.random() < settings.LLM_REPLAY_ERROR_RATE
+
+        soap_note = case.get("soap_note", {})
+        sections = [s for s in SOAP_SECTIONS if s in soap_note]
+        # Spread the latency over the sections so streaming consumers see incremental output
+        step = latency / (len(sections) + 1)
+        await asyncio.sleep(step)
+        if fail:
+            raise Exception("429 Resource exhausted (injected by FixtureReplayService)")
+        for section in sections:
+            await asyncio.sleep(step)
+            if on_section is not None:
+                await on_section(section, soap_note[section])
+
+        return {
+            "soap_note": dict(soap_note),
+            "low_confidence": list(case.get("low_confidence", [])),
+            "risk_flags": list(case.get("risk_flags", [])),
+            "prompt_stats": build["stats"],
+        }
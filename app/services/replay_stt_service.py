@@ -0,0 +1,53 @@
+import asyncio
+import hashlib
+import os
+import random
+from typing import Dict, Any, List
+from app.core.config import settings
+from app.services.replay_llm_service import FixtureReplayService
+
+class ReplaySTTService:
+    """
+    Deterministic STT stand-in for load tests and offline runs.
+    Builds a two-speaker transcript from the SOAP fixtures with configurable
+    latency, jitter and injected errors - no network, no quota.
+    The same file name always gets the same transcript, latency and error outcome.
+    """
+
+    @staticmethod
+    def build_utterances(case: Dict[str, Any]) -> List[Dict[str, Any]]:
+        soap_note = case.get("soap_note", {})
+        turns = [
+            ("A", "What brings you in today?"),
+            ("B", soap_note.get("subjective", "")),
+            ("A", "Any other history I should know about?"),
+            ("B", case.get("patient_profile", {}).get("medical_history", "Nothing else.")),
+        ]
+        utterances, position = [], 0
+        for speaker, text in turns:
+            # ~350 ms per word keeps timestamps plausible for the stitcher and spans
+            end = position + 350 * max(1, len(text.split()))
+            utterances.append({"speaker": speaker, "text": text, "start": position, "end": end})
+            position = end + 400
+        return utterances
+
+    @staticmethod
+    async def transcribe_audio_async(file_path: str) -> dict:
+        name = os.path.basename(file_path)
+        seed = int(hashlib.sha256(name.encode("utf-8")).hexdigest(), 16)
+        rng = random.Random(seed)
+        cases = FixtureReplayService.load_cases()
+        case = cases[seed % len(cases)]
+
+        latency = max(0.0, settings.STT_REPLAY_LATENCY_MS + rng.uniform(-1, 1) * settings.STT_REPLAY_JITTER_MS) / 1000
+        await asyncio.sleep(latency)
+        if rng.random() < settings.STT_REPLAY_ERROR_RATE:
+            raise Exception("Transcription failed: injected by ReplaySTTService")
+
+        utterances = ReplaySTTService.build_utterances(case)
+        return {
+            "text": " ".join(u["text"] for u in utterances),
+            "utterances": utterances,
+            "confidence": 0.9,
+            "id": f"replay-{seed % 10**8}",
+        }
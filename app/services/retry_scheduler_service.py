@@ -0,0 +1,131 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import List, Optional
+from uuid import UUID
+from zoneinfo import ZoneInfo
+from sqlalchemy import update
+from sqlmodel import Session, select
+from app.core.config import settings
+from app.core.db import engine
+from app.models.base import Consultation, ConsultationStatus
+from app.services.rate_limit_service import gemini_limiter, assemblyai_limiter
+
+logger = logging.getLogger(__name__)
+
+class RetrySchedulerService:
+    """
+    Sweeps the manual-review queue and re-runs failed consultations without a human.
+
+    - Per-item exponential backoff (retry_count / next_retry_at on the consultation)
+    - Only during the clinic's off-peak window, so retries never compete with live traffic
+    - Batches are sized to the provider quota left right now; nothing runs while a circuit is open
+    Consultations that exhaust RETRY_MAX_ATTEMPTS stay in the queue for manual review.
+    """
+    _task: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def backoff_seconds(attempt: int) -> float:
+        """Delay before retry number `attempt + 1` (base, 2x base, 4x base ... capped)."""
+        return min(settings.RETRY_BACKOFF_BASE_SECONDS * (2 ** attempt), settings.RETRY_BACKOFF_MAX_SECONDS)
+
+    @staticmethod
+    def is_off_peak(now: Optional[datetime] = None) -> bool:
+        now = now or datetime.now(ZoneInfo(settings.CLINIC_TIMEZONE))
+        start, end = settings.RETRY_OFF_PEAK_START_HOUR, settings.RETRY_OFF_PEAK_END_HOUR
+        if start <= end:
+            return start <= now.hour < end
+        # Window wraps midnight (e.g. 19:00 - 07:00)
+        return now.hour >= start or now.hour < end
+
+    @staticmethod
+    def quota_headroom() -> int:
+        """Consultations that can start now: bounded by the tightest provider's request bucket."""
+        return min(gemini_limiter.headroom(), assemblyai_limiter.headroom())
+
+    @staticmethod
+    def claim_due(session: Session, limit: int, now: Optional[datetime] = None) -> List[UUID]:
+        """
+        Picks up to `limit` failed consultations whose backoff has elapsed and
+        schedules their next attempt before running this one. Each claim is a
+        guarded UPDATE on the retry_count read, so concurrent sweeps (several
+        workers, or a manual trigger during a scheduled sweep) never claim or
+        count the same attempt twice.
+        """
+        now = now or datetime.utcnow()
+        due = session.exec(
+            select(Consultation.id, Consultation.retry_count)
+            .where(Consultation.requires_manual_review == True)
+            .where(Consultation.status == ConsultationStatus.FAILED)
+            .where(Consultation.processing_started_at == None)
+            .where(Consultation.retry_count < settings.RETRY_MAX_ATTEMPTS)
+            .where((Consultation.next_retry_at == None) | (Consultation.next_retry_at <= now))
+            .order_by(Consultation.created_at.asc())
+            .limit(limit)
+            .with_for_update(skip_locked=True) # PostgreSQL: leave rows another sweep is claiming to it
+        ).all()
+
+        claimed = []
+        for consultation_id, attempts in due:
+            result = session.execute(
+                update(Consultation)
+                .where(Consultation.id == consultation_id)
+                .where(Consultation.retry_count == attempts) # Claimed elsewhere since the SELECT
+                .values(
+                    retry_count=attempts + 1,
+                    next_retry_at=now + timedelta(seconds=RetrySchedulerService.backoff_seconds(attempts)),
+                )
+            )
+            if result.rowcount == 1:
+                claimed.append(consultation_id)
+        session.commit()
+        return claimed
+
+    @staticmethod
+    async def sweep_once(force: bool = False) -> List[UUID]:
+        """
+        Runs one batch. `force` skips the off-peak check (used by manual triggers).
+        Returns the consultation ids that were re-enqueued.
+        """
+        if not force and not RetrySchedulerService.is_off_peak():
+            return []
+
+        limit = min(settings.RETRY_BATCH_SIZE, RetrySchedulerService.quota_headroom())
+        if limit <= 0:
+            logger.info("Retry sweep skipped: provider quota exhausted or circuit open")
+            return []
+
+        with Session(engine) as session:
+            ids = RetrySchedulerService.claim_due(session, limit)
+        if not ids:
+            return []
+
+        from app.services.consultation_processor import process_consultation_flow
+        logger.info("Retry sweep: re-running %d failed consultation(s)", len(ids))
+        await asyncio.gather(*(process_consultation_flow(i) for i in ids))
+        return ids
+
+    @staticmethod
+    async def run():
+        while True:
+            try:
+                await RetrySchedulerService.sweep_once()
+            except Exception as e:
+                logger.error("Retry sweep failed: %s", e)
+            await asyncio.sleep(settings.RETRY_SWEEP_INTERVAL_SECONDS)
+
+    @staticmethod
+    def start():
+        if RetrySchedulerService._task is None:
+            RetrySchedulerService._task = asyncio.get_running_loop().create_task(RetrySchedulerService.run())
+
+    @staticmethod
+    async def stop():
+        task = RetrySchedulerService._task
+        RetrySchedulerService._task = None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
@@ -1,7 +1,52 @@
-from typing import List, Dict
+from typing import List, Dict, Optional
 from app.models.base import SOAPNote, PatientProfile
 
+# Normalized condition codes and the free-text keywords that map onto them.
+# medical_history is scanned against this table once (when it changes) and the
+# resulting codes are persisted on PatientProfile.condition_codes.
+CONDITION_KEYWORDS: Dict[str, tuple] = {
+    "ulcer": ("ulcer",),
+    "bleeding": ("bleeding",),
+    "allergy": ("allergy",),
+    "kidney": ("kidney",),
+    "asthma": ("asthma",),
+}
+
+# Mock Knowledge Base of Interactions, keyed by condition code
+# Format: condition code -> [(Drug Keyword, Warning Message)]
+INTERACTIONS_BY_CONDITION: Dict[str, List[tuple]] = {
+    "ulcer": [("aspirin", "❌ CONTRAINDICATION: Aspirin specified in plan but patient has history of Ulcers (Risk of bleeding).")],
+    "bleeding": [("aspirin", "❌ CONTRAINDICATION: Aspirin specified in plan but patient has history of Bleeding disorders.")],
+    "allergy": [("penicillin", "❌ CONTRAINDICATION: Penicillin specified in plan but patient has reported Allergies.")],
+    "kidney": [("ibuprofen", "⚠️ CAUTION: Ibuprofen may be risky for patients with Kidney issues.")],
+    "asthma": [("beta blocker", "⚠️ CAUTION: Beta blockes may exacerbate Asthma.")],
+}
+
 class SafetyService:
+    @staticmethod
+    def extract_condition_codes(medical_history: Optional[str]) -> List[str]:
+        """
+        Normalizes free-text medical history into a sorted list of condition codes.
+        Called when the history changes; safety checks read the persisted result.
+        """
+        history = (medical_history or "").lower()
+        if not history:
+            return []
+        return sorted(
+            code for code, keywords in CONDITION_KEYWORDS.items()
+            if any(k in history for k in keywords)
+        )
+
+    @staticmethod
+    def get_condition_codes(patient_profile: PatientProfile) -> set:
+        """
+        Returns the patient's condition codes, falling back to parsing medical_history
+        for profiles that predate the index (condition_codes is NULL).
+        """
+        if patient_profile.condition_codes is not None:
+            return set(patient_profile.condition_codes)
+        return set(SafetyService.extract_condition_codes(patient_profile.medical_history))
+
     @staticmethod
     def check_drug_interactions(soap_note: SOAPNote, patient_profile: PatientProfile) -> List[Dict[str, str]]:
         """
@@ -11,25 +56,22 @@ class SafetyService:
         warnings = []
         soap_json = soap_note.soap_json or {}
         plan_text = soap_json.get("plan", "").lower()
-        medical_history = (patient_profile.medical_history or "").lower()
-        
-        # Mock Knowledge Base of Interactions
-        # Format: (Drug Keyword, Condition Keyword, Warning Message)
-        interactions_db = [
-            ("aspirin", "ulcer", "❌ CONTRAINDICATION: Aspirin specified in plan but patient has history of Ulcers (Risk of bleeding)."),
-            ("aspirin", "bleeding", "❌ CONTRAINDICATION: Aspirin specified in plan but patient has history of Bleeding disorders."),
-            ("penicillin", "allergy", "❌ CONTRAINDICATION: Penicillin specified in plan but patient has reported Allergies."),
-            ("ibuprofen", "kidney", "⚠️ CAUTION: Ibuprofen may be risky for patients with Kidney issues."),
-            ("beta blocker", "asthma", "⚠️ CAUTION: Beta blockes may exacerbate Asthma.")
-        ]
-        
-        for drug, condition, message in interactions_db:
-            if drug in plan_text and condition in medical_history:
-                warnings.append({
-                    "type": "CONTRAINDICATION" if "❌" in message else "CAUTION",
-                    "message": message,
-                    "drug": drug,
-                    "condition": condition
-                })
-                
+        if not plan_text:
+            return warnings
+
+        codes = SafetyService.get_condition_codes(patient_profile)
+
+        # Only conditions the patient actually has need their drug list checked
+        for condition, interactions in INTERACTIONS_BY_CONDITION.items():
+            if condition not in codes:
+                continue
+            for drug, message in interactions:
+                if drug in plan_text:
+                    warnings.append({
+                        "type": "CONTRAINDICATION" if "❌" in message else "CAUTION",
+                        "message": message,
+                        "drug": drug,
+                        "condition": condition
+                    })
+
         return warnings
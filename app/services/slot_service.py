@@ -0,0 +1,114 @@
+from datetime import date, datetime, timedelta, timezone
+from typing import List, Optional
+from uuid import UUID
+from zoneinfo import ZoneInfo
+from sqlmodel import Session, select
+from app.core.config import settings
+from app.models.base import ACTIVE_APPOINTMENT_STATUSES, Appointment, AppointmentStatus, DoctorProfile
+
+# Bounds the look-behind of overlap scans: no appointment lasts longer than this
+MAX_APPOINTMENT_LENGTH = timedelta(hours=24)
+
+class SlotService:
+    """
+    Appointment slots cut from each doctor's working hours (DoctorProfile
+    work_start/work_end/slot_minutes/working_days, in CLINIC_TIMEZONE).
+
+    Appointments store scheduled_at as naive UTC and occupy duration_minutes.
+    Bookings must start on a slot boundary and not overlap a live appointment
+    (ACTIVE_APPOINTMENT_STATUSES: the set the database constraints cover), whether
+    a legacy off-grid row or one booked before a slot-length change. Two
+    concurrent bookings of the same slot are kept apart by the partial unique
+    index on (doctor_id, scheduled_at), and on PostgreSQL any overlap at all by
+    the exclusion constraint - no locks needed.
+    """
+
+    @staticmethod
+    def to_utc(value: datetime) -> datetime:
+        """Naive UTC, the form scheduled_at is stored in. Naive input is taken as UTC."""
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value
+
+    @staticmethod
+    def slot_starts(profile: DoctorProfile, start: date, end: date) -> List[datetime]:
+        """Every slot start (naive UTC, ascending) on the clinic-local days start..end inclusive."""
+        tz = ZoneInfo(settings.CLINIC_TIMEZONE)
+        step = timedelta(minutes=profile.slot_minutes)
+        slots = []
+        day = start
+        while day <= end:
+            if day.weekday() in profile.working_days:
+                slot = datetime.combine(day, profile.work_start, tz)
+                day_end = datetime.combine(day, profile.work_end, tz)
+                while slot + step <= day_end:
+                    slots.append(SlotService.to_utc(slot))
+                    slot += step
+            day += timedelta(days=1)
+        return slots
+
+    @staticmethod
+    def is_slot_start(profile: DoctorProfile, scheduled_at: datetime) -> bool:
+        scheduled_at = SlotService.to_utc(scheduled_at)
+        local_day = scheduled_at.replace(tzinfo=timezone.utc).astimezone(ZoneInfo(settings.CLINIC_TIMEZONE)).date()
+        return scheduled_at in SlotService.slot_starts(profile, local_day, local_day)
+
+    @staticmethod
+    def _live_bookings(session: Session, doctor_id: UUID, start: datetime, end: datetime, exclude_id: Optional[UUID] = None):
+        """(scheduled_at, duration_minutes) of live appointments that may overlap [start, end), by start."""
+        statement = (
+            select(Appointment.scheduled_at, Appointment.duration_minutes)
+            .where(Appointment.doctor_id == doctor_id)
+            .where(Appointment.status.in_(ACTIVE_APPOINTMENT_STATUSES))
+            .where(Appointment.scheduled_at > start - MAX_APPOINTMENT_LENGTH)
+            .where(Appointment.scheduled_at < end)
+            .order_by(Appointment.scheduled_at)
+        )
+        if exclude_id is not None:
+            statement = statement.where(Appointment.id != exclude_id)
+        return session.exec(statement).all()
+
+    @staticmethod
+    def retakes_slot(current: AppointmentStatus, new_status: AppointmentStatus) -> bool:
+        """True when a status change makes a booking live again, e.g. reinstating or checking in a no-show."""
+        return current not in ACTIVE_APPOINTMENT_STATUSES and new_status in ACTIVE_APPOINTMENT_STATUSES
+
+    @staticmethod
+    def has_overlap(
+        session: Session, doctor_id: UUID, scheduled_at: datetime, duration_minutes: int, exclude_id: Optional[UUID] = None
+    ) -> bool:
+        """True when [scheduled_at, +duration) intersects a live appointment of the doctor."""
+        start = SlotService.to_utc(scheduled_at)
+        end = start + timedelta(minutes=duration_minutes)
+        return any(
+            booked + timedelta(minutes=minutes) > start
+            for booked, minutes in SlotService._live_bookings(session, doctor_id, start, end, exclude_id)
+        )
+
+    @staticmethod
+    def free_slots(
+        session: Session, profile: DoctorProfile, start: date, end: date, now: Optional[datetime] = None
+    ) -> List[datetime]:
+        """
+        Future slots on start..end not overlapped by a live appointment. One range
+        scan on (doctor_id, scheduled_at), then a merge of the two sorted lists;
+        each appointment occupies [scheduled_at, scheduled_at + duration_minutes).
+        """
+        slots = SlotService.slot_starts(profile, start, end)
+        if not slots:
+            return []
+        step = timedelta(minutes=profile.slot_minutes)
+        booked = SlotService._live_bookings(session, profile.user_id, slots[0], slots[-1] + step)
+
+        now = SlotService.to_utc(now or datetime.now(timezone.utc))
+        free, i = [], 0
+        latest_end = None # Latest end among appointments starting before the current slot ends
+        for slot in slots:
+            while i < len(booked) and booked[i][0] < slot + step:
+                booked_end = booked[i][0] + timedelta(minutes=booked[i][1])
+                latest_end = booked_end if latest_end is None else max(latest_end, booked_end)
+                i += 1
+            overlapped = latest_end is not None and latest_end > slot
+            if slot >= now and not overlapped:
+                free.append(slot)
+        return free
@@ -0,0 +1,86 @@
+import json
+from typing import List, Tuple, Optional
+
+SOAP_SECTIONS = ("subjective", "objective", "assessment", "plan")
+
+class _Frame:
+    __slots__ = ("is_object", "key", "expect_key")
+
+    def __init__(self, is_object: bool):
+        self.is_object = is_object
+        self.key: Optional[str] = None
+        self.expect_key = is_object
+
+class SoapStreamParser:
+    """
+    Incremental JSON scanner for the streamed SOAP response.
+
+    Text chunks are fed as they arrive; whenever a string value at
+    soap_note.<section> is complete, (section, value) is returned so the
+    section can be persisted/pushed before the rest of the response exists.
+    Only structure is tracked - numbers and literals are skipped, and any
+    text before the first "{" (e.g. a markdown fence) is ignored.
+    """
+    def __init__(self, sections: Tuple[str, ...] = SOAP_SECTIONS):
+        self.sections = set(sections)
+        self.stack: List[_Frame] = []
+        self.in_string = False
+        self.escape = False
+        self.buffer: List[str] = []
+        self.completed: dict = {}
+
+    def feed(self, text: str) -> List[Tuple[str, str]]:
+        events: List[Tuple[str, str]] = []
+        for ch in text:
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                    self.buffer.append(ch)
+                elif ch == "\\":
+                    self.escape = True
+                    self.buffer.append(ch)
+                elif ch == '"':
+                    self.in_string = False
+                    event = self._on_string("".join(self.buffer))
+                    if event:
+                        events.append(event)
+                else:
+                    self.buffer.append(ch)
+                continue
+
+            if not self.stack:
+                if ch == "{":
+                    self.stack.append(_Frame(is_object=True))
+                continue
+
+            top = self.stack[-1]
+            if ch == '"':
+                self.in_string = True
+                self.buffer = []
+            elif ch == "{":
+                self.stack.append(_Frame(is_object=True))
+            elif ch == "[":
+                self.stack.append(_Frame(is_object=False))
+            elif ch in "}]":
+                self.stack.pop()
+            elif ch == ":":
+                top.expect_key = False
+            elif ch == ",":
+                if top.is_object:
+                    top.expect_key = True
+                    top.key = None
+        return events
+
+    def _on_string(self, raw: str) -> Optional[Tuple[str, str]]:
+        top = self.stack[-1]
+        # Raw control characters inside strings (literal newlines) are tolerated, as in parse_soap_json
+        value = json.loads(f'"{raw}"', strict=False)
+        if top.is_object and top.expect_key:
+            top.key = value
+            return None
+
+        # Value string: emit when it sits at soap_note.<section>
+        if len(self.stack) == 2 and self.stack[0].key == "soap_note" and top.is_object and top.key in self.sections:
+            self.completed[top.key] = value
+            return top.key, value
+        return None
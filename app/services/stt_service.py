@@ -1,67 +1,92 @@
-import assemblyai as aai
-import asyncio
+from typing import Dict, Any, Protocol
 from app.core.config import settings
+from app.services.rate_limit_service import assemblyai_limiter, is_rate_limit_error
+from app.services.assemblyai_client import get_assemblyai_client
 
-# Configure global API key
-aai.settings.api_key = settings.ASSEMBLYAI_API_KEY
+# Configure for Medical domain requirements (AssemblyAI v2 transcript parameters)
+TRANSCRIPTION_CONFIG: Dict[str, Any] = {
+    "speaker_labels": True,  # Speaker Diarization
+    "redact_pii": True,      # PII Redaction
+    "redact_pii_policies": [
+        "medical_process",
+        "medical_condition",
+        "person_name",
+        "phone_number",
+    ],
+    "language_code": "en_us",
+    "punctuate": True,
+    "format_text": True,
+    # Word Boost for Neurology (Accent Adaptation)
+    "word_boost": [
+        "Levetiracetam", 
+        "Donepezil", 
+        "Carbamazepine", 
+        "Sumatriptan", 
+        "Topiramate", 
+        "Valproate",
+        "Gabapentin",
+        "Memantine"
+    ],
+    "boost_param": "high",
+}
 
 class AssemblyAIService:
     @staticmethod
     async def transcribe_audio_async(file_path: str) -> dict:
         """
-        Asynchronously transcibes audio using AssemblyAI with polling.
+        Asynchronously transcibes audio using AssemblyAI.
+        Submits the job and waits on the shared transcript poller (or webhook),
+        so no thread is held while the transcription runs.
         Enables Speaker Diarization and PII Redaction.
         """
-        transcriber = aai.Transcriber()
-        
-        # Configure for Medical domain requirements
-        config = aai.TranscriptionConfig(
-            speaker_labels=True,  # Speaker Diarization
-            redact_pii=True,      # PII Redaction
-            redact_pii_policies=[
-                aai.PIIRedactionPolicy.medical_process,
-                aai.PIIRedactionPolicy.medical_condition,
-                aai.PIIRedactionPolicy.person_name,
-                aai.PIIRedactionPolicy.phone_number,
-            ],
-            language_code="en_us",
-            punctuate=True,
-            format_text=True,
-            # Word Boost for Neurology (Accent Adaptation)
-            word_boost=[
-                "Levetiracetam", 
-                "Donepezil", 
-                "Carbamazepine", 
-                "Sumatriptan", 
-                "Topiramate", 
-                "Valproate",
-                "Gabapentin",
-                "Memantine"
-            ],
-            boost_param="high"
-        )
+        # Fails fast with CircuitOpenError if AssemblyAI keeps erroring
+        await assemblyai_limiter.acquire()
 
-        # 1. Transcribe (Blocking call offloaded to thread)
-        # transcriber.transcribe() handles polling internally.
-        loop = asyncio.get_event_loop()
-        transcript = await loop.run_in_executor(
-            None,
-            lambda: transcriber.transcribe(file_path, config=config)
-        )
+        client = get_assemblyai_client()
+        try:
+            transcript = await client.transcribe(file_path, TRANSCRIPTION_CONFIG)
+        except Exception as e:
+            assemblyai_limiter.record_failure(rate_limited=is_rate_limit_error(e))
+            raise
             
-        if transcript.status == aai.TranscriptStatus.error:
-            raise Exception(f"Transcription failed: {transcript.error}")
+        if transcript.get("status") == "error":
+            assemblyai_limiter.record_failure()
+            raise Exception(f"Transcription failed: {transcript.get('error')}")
+        assemblyai_limiter.record_success()
             
         return {
-            "text": transcript.text,
+            "text": transcript.get("text"),
             "utterances": [
                 {
-                    "speaker": u.speaker,
-                    "text": u.text,
-                    "start": u.start,
-                    "end": u.end
-                } for u in transcript.utterances
-            ] if transcript.utterances else [],
-            "confidence": transcript.confidence,
-            "id": transcript.id
+                    "speaker": u.get("speaker"),
+                    "text": u.get("text"),
+                    "start": u.get("start"),
+                    "end": u.get("end")
+                } for u in transcript.get("utterances") or []
+            ],
+            "confidence": transcript.get("confidence"),
+            "id": transcript.get("id")
         }
+
+class STTProvider(Protocol):
+    """
+    Interface every speech-to-text backend implements. Result shape:
+    {"text", "utterances": [{"speaker", "text", "start", "end"}], "confidence", "id"}
+    """
+    @staticmethod
+    async def transcribe_audio_async(file_path: str) -> dict: ...
+
+def get_stt_service() -> STTProvider:
+    """
+    Returns the STT backend selected by Settings.STT_PROVIDER ("assemblyai", "local" or "replay").
+    """
+    provider = settings.STT_PROVIDER.lower()
+    if provider == "assemblyai":
+        return AssemblyAIService
+    if provider == "local":
+        from app.services.local_stt_service import LocalWhisperService
+        return LocalWhisperService
+    if provider == "replay":
+        from app.services.replay_stt_service import ReplaySTTService
+        return ReplaySTTService
+    raise ValueError(f"Unknown STT_PROVIDER: {settings.STT_PROVIDER}")
@@ -0,0 +1,77 @@
+import json
+import logging
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import List, Optional, Iterator
+from uuid import UUID
+from sqlmodel import Session
+from app.models.base import PipelineSpan
+from app.core.metrics import observe_stage
+
+logger = logging.getLogger("app.pipeline")
+
+class PipelineTrace:
+    """
+    Collects per-stage spans for one consultation run.
+    Every span is logged as one JSON line when it ends; the rows are written to
+    pipeline_spans in a single batch by `flush` at the end of the run.
+    """
+    def __init__(self, consultation_id: UUID):
+        self.consultation_id = consultation_id
+        self.spans: List[PipelineSpan] = []
+
+    @contextmanager
+    def span(self, stage: str, **fields) -> Iterator[PipelineSpan]:
+        """
+        Times the enclosed block. Set bytes/tokens/retries/detail on the yielded
+        span as they become known; an exception marks the span FAIL and propagates.
+        """
+        span = PipelineSpan(consultation_id=self.consultation_id, stage=stage, **fields)
+        start = time.perf_counter()
+        try:
+            yield span
+        except Exception as e:
+            span.status = "FAIL"
+            span.error_message = str(e)[:500]
+            raise
+        finally:
+            span.duration_ms = (time.perf_counter() - start) * 1000
+            self.record(span)
+
+    def add(self, stage: str, duration_ms: float, started_at: Optional[datetime] = None, **fields) -> PipelineSpan:
+        """Records a span measured elsewhere (e.g. queue wait derived from timestamps)."""
+        span = PipelineSpan(
+            consultation_id=self.consultation_id, stage=stage, duration_ms=duration_ms,
+            started_at=started_at or datetime.utcnow(), **fields
+        )
+        self.record(span)
+        return span
+
+    def record(self, span: PipelineSpan):
+        self.spans.append(span)
+        emit_span(span)
+
+    def flush(self, session: Session):
+        if not self.spans:
+            return
+        session.add_all(self.spans)
+        session.commit()
+        self.spans = []
+
+def emit_span(span: PipelineSpan):
+    """Feeds the stage histogram and writes the span as one structured log line."""
+    observe_stage(span.stage, span.status, span.duration_ms)
+    logger.info(json.dumps({
+        "event": "stage_span",
+        "consultation_id": str(span.consultation_id),
+        "stage": span.stage,
+        "status": span.status,
+        "duration_ms": round(span.duration_ms, 1),
+        "bytes": span.bytes,
+        "input_tokens": span.input_tokens,
+        "output_tokens": span.output_tokens,
+        "retries": span.retries,
+        "detail": span.detail,
+        "error": span.error_message,
+    }, default=str))
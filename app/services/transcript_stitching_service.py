@@ -0,0 +1,100 @@
+from collections import defaultdict
+from typing import List, Dict, Any
+
+class TranscriptStitchingService:
+    """
+    Joins per-chunk STT results back into one transcript.
+
+    Chunks overlap around each cut: an utterance belongs to the chunk whose owned
+    range contains its midpoint, so the overlap is transcribed twice but kept once.
+    Diarization labels are per chunk ("A" in one chunk can be "B" in the next);
+    utterances heard in both chunks of an overlap vote on the label mapping.
+    """
+
+    @staticmethod
+    def match_speakers(previous: List[Dict[str, Any]], current: List[Dict[str, Any]], known: List[str]) -> Dict[str, str]:
+        """
+        Maps the current chunk's labels onto the global labels used by `previous`.
+        Labels without overlap evidence take the unused known labels in order of
+        first appearance, then fresh letters.
+        """
+        votes = defaultdict(int)
+        for cur in current:
+            for prev in previous:
+                overlap = min(cur["end"], prev["end"]) - max(cur["start"], prev["start"])
+                if overlap > 0:
+                    votes[(cur["speaker"], prev["speaker"])] += overlap
+
+        mapping = {}
+        used = set()
+        for (local, label), _ in sorted(votes.items(), key=lambda kv: -kv[1]):
+            if local not in mapping and label not in used:
+                mapping[local] = label
+                used.add(label)
+
+        for utter in current:
+            local = utter["speaker"]
+            if local in mapping:
+                continue
+            free = [label for label in known if label not in used]
+            if free:
+                label = free[0]
+            else:
+                taken = set(known) | used
+                label = next(chr(c) for c in range(ord("A"), ord("Z") + 1) if chr(c) not in taken)
+            mapping[local] = label
+            used.add(label)
+        return mapping
+
+    @staticmethod
+    def stitch(chunks: List[Dict[str, Any]], results: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        `chunks` are the pre-processing chunk descriptors (start_ms, own_start_ms,
+        own_end_ms on the processed timeline); `results` the STT output per chunk.
+        Returns the usual STT structure with times on the processed timeline.
+        """
+        if len(results) == 1:
+            return results[0]
+
+        utterances = []
+        known = []
+        previous = []
+        confidence_total = 0.0
+        confidence_weight = 0
+        for i, (chunk, result) in enumerate(zip(chunks, results)):
+            shifted = [
+                {**u, "start": u["start"] + chunk["start_ms"], "end": u["end"] + chunk["start_ms"]}
+                for u in result.get("utterances") or []
+                if u.get("start") is not None and u.get("end") is not None
+            ]
+            if i:
+                mapping = TranscriptStitchingService.match_speakers(previous, shifted, known)
+                for utter in shifted:
+                    utter["speaker"] = mapping.get(utter["speaker"], utter["speaker"])
+
+            low = chunk["own_start_ms"] if i else float("-inf")
+            high = chunk["own_end_ms"] if i < len(chunks) - 1 else float("inf")
+            for utter in shifted:
+                if low <= (utter["start"] + utter["end"]) / 2 < high:
+                    utterances.append(utter)
+                    if utter["speaker"] not in known:
+                        known.append(utter["speaker"])
+            previous = shifted
+
+            if result.get("confidence") is not None:
+                weight = chunk["own_end_ms"] - chunk["own_start_ms"]
+                confidence_total += result["confidence"] * weight
+                confidence_weight += weight
+
+        if utterances:
+            text = " ".join(u["text"] for u in utterances)
+        else:
+            text = " ".join(r.get("text", "") for r in results if r.get("text"))
+
+        return {
+            "id": ",".join(str(r.get("id")) for r in results),
+            "text": text,
+            "utterances": utterances,
+            "confidence": confidence_total / confidence_weight if confidence_weight else None,
+            "duration": None,
+        }
@@ -6,7 +6,7 @@ import glob
 from uuid import uuid4
 from datetime import datetime, timezone
 from sqlmodel import Session, select, create_engine, SQLModel
-from app.models.base import Consultation, AudioFile, PatientProfile, User, SOAPNote, ConsultationStatus, AudioUploaderType, UserRole, Appointment, AppointmentStatus
+from app.models.base import Consultation, AudioFile, PatientProfile, User, SOAPNote, AILog, ConsultationStatus, AudioUploaderType, UserRole, Appointment, AppointmentStatus
 from app.services.consultation_processor import process_consultation_flow
 from app.core.config import settings
 
@@ -91,6 +91,8 @@ async def process_single_file(file_path):
                 low_confidence = soap.low_confidence if soap.low_confidence else []
                 if soap.soap_json:
                     soap_snippet = str(soap.soap_json)[:100].replace("\n", " ")
+
+            ai_log = session.exec(select(AILog).where(AILog.consultation_id == cid, AILog.status == "SUCCESS")).first()
             
             return {
                 "Filename": filename,
@@ -99,6 +101,8 @@ async def process_single_file(file_path):
                 "Low Confidence Count": len(low_confidence),
                 "Low Confidence Terms": "; ".join(low_confidence),
                 "Risk Flags": "; ".join(risk_flags),
+                "Prompt Tokens": ai_log.input_tokens if ai_log else "",
+                "Tokens Saved": ai_log.tokens_saved if ai_log else "",
                 "Snippet": soap_snippet
             }
 
@@ -113,6 +117,8 @@ async def process_single_file(file_path):
             "Low Confidence Count": 0,
             "Low Confidence Terms": str(e),
             "Risk Flags": "",
+            "Prompt Tokens": "",
+            "Tokens Saved": "",
             "Snippet": ""
         }
 
@@ -144,10 +150,7 @@ async def main():
                     dict_writer.writeheader()
                     dict_writer.writerows(results)
                 print(f"Progress saved to {REPORT_FILE}")
-        
-        # RATE LIMIT THROTTLE: Sleep 10s between files to respect Free Tier Limits
-        print("Sleeping 10s to avoid rate limits...")
-        time.sleep(10)
+        # Rate limits are enforced by the shared provider limiters in the STT/LLM services
 
     print(f"\nBatch processing complete. Report saved to {REPORT_FILE}")
 
@@ -0,0 +1,87 @@
+import argparse
+import asyncio
+import csv
+import glob
+import os
+import time
+import wave
+from difflib import SequenceMatcher
+from app.core.config import settings
+from app.services.stt_service import get_stt_service
+from calculate_accuracy import parse_textgrid, normalize_text
+
+AUDIO_DIR = "test-audios"
+TRANSCRIPT_DIR = "test-audio-transcripts"
+REPORT_FILE = "stt_benchmark_report.csv"
+
+def audio_duration_seconds(file_path):
+    try:
+        with wave.open(file_path, "rb") as wf:
+            return wf.getnframes() / float(wf.getframerate())
+    except Exception:
+        return None
+
+async def transcribe_one(stt, file_path, semaphore):
+    async with semaphore:
+        start = time.perf_counter()
+        try:
+            result = await stt.transcribe_audio_async(file_path)
+            error = ""
+        except Exception as e:
+            result, error = {}, str(e)
+        elapsed = time.perf_counter() - start
+
+    filename = os.path.basename(file_path)
+    duration = audio_duration_seconds(file_path) or result.get("duration")
+    similarity = ""
+    tg_path = os.path.join(TRANSCRIPT_DIR, f"{os.path.splitext(filename)[0]}.TextGrid")
+    if result and os.path.exists(tg_path):
+        similarity = f"{SequenceMatcher(None, normalize_text(parse_textgrid(tg_path)), normalize_text(result.get('text', ''))).ratio():.2%}"
+
+    return {
+        "Filename": filename,
+        "Audio Seconds": round(duration, 1) if duration else "",
+        "Wall Seconds": round(elapsed, 2),
+        "Real-Time Factor": round(elapsed / duration, 3) if duration else "",
+        "Similarity": similarity,
+        "Error": error,
+    }
+
+async def main():
+    parser = argparse.ArgumentParser(description="Benchmark STT throughput over the test-audios corpus")
+    parser.add_argument("--provider", default=settings.STT_PROVIDER, help="assemblyai | local")
+    parser.add_argument("--concurrency", type=int, default=settings.LOCAL_STT_WORKERS)
+    parser.add_argument("--limit", type=int, default=0, help="Only process the first N files")
+    args = parser.parse_args()
+
+    settings.STT_PROVIDER = args.provider
+    stt = get_stt_service()
+
+    files = sorted(glob.glob(os.path.join(AUDIO_DIR, "*.wav")))
+    if args.limit:
+        files = files[:args.limit]
+    if not files:
+        print(f"No .wav files found in {AUDIO_DIR}")
+        return
+
+    print(f"Benchmarking {args.provider} STT on {len(files)} files (concurrency={args.concurrency})...")
+    semaphore = asyncio.Semaphore(args.concurrency)
+    start = time.perf_counter()
+    results = await asyncio.gather(*(transcribe_one(stt, f, semaphore) for f in files))
+    wall = time.perf_counter() - start
+
+    audio_total = sum(r["Audio Seconds"] for r in results if r["Audio Seconds"])
+    failures = sum(1 for r in results if r["Error"])
+    print(f"\nFiles: {len(results)} ({failures} failed)")
+    print(f"Audio processed: {audio_total / 60:.1f} min in {wall:.1f}s wall")
+    if wall > 0:
+        print(f"Throughput: {audio_total / wall:.2f} audio-seconds per wall-second ({len(results) / wall * 60:.1f} files/min)")
+
+    with open(REPORT_FILE, "w", newline="") as output_file:
+        dict_writer = csv.DictWriter(output_file, results[0].keys())
+        dict_writer.writeheader()
+        dict_writer.writerows(results)
+    print(f"Report saved to {REPORT_FILE}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
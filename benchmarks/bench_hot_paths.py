@@ -0,0 +1,93 @@
+"""
+Micro-benchmarks for the pure-CPU hot paths, over the SOAP fixtures and the
+test-audio-transcripts corpus.
+
+    pip install pytest-benchmark
+    pytest benchmarks/                                 # saved to benchmarks/history
+    pytest benchmarks/ --benchmark-compare             # against the previous saved run
+    pytest benchmarks/ --benchmark-compare=0001 --benchmark-compare-fail=median:10%
+"""
+import random
+from app.models.base import SOAPNote, PatientProfile
+from app.services.triage_service import TriageService
+from app.services.safety_service import SafetyService
+from app.services.prompt_service import PromptService
+from calculate_accuracy import simple_wer, parse_textgrid, normalize_text
+
+def soap_notes(cases):
+    notes = [SOAPNote(soap_json=c["soap_note"], risk_flags={"flags": c.get("risk_flags", [])}) for c in cases]
+    # Routine visit: no flag or keyword matches, so every keyword list is scanned
+    notes.append(SOAPNote(
+        soap_json={"subjective": "Follow-up for medication review. " * 20, "assessment": "Stable.", "plan": "Continue."},
+        risk_flags={"flags": []},
+    ))
+    return notes
+
+def perturb(words, rng):
+    """A plausible STT hypothesis: ~10% of words dropped, substituted or duplicated."""
+    out = []
+    for word in words:
+        roll = rng.random()
+        if roll < 0.03:
+            continue
+        out.append("uh" if roll < 0.07 else word)
+        if roll > 0.97:
+            out.append(word)
+    return out
+
+def test_triage_calculate_urgency(measure, soap_cases):
+    notes = soap_notes(soap_cases)
+    profile = PatientProfile(first_name="Bench", last_name="Mark")
+
+    def run():
+        for note in notes:
+            TriageService.calculate_urgency(note, profile)
+    measure(run)
+
+def test_safety_check_drug_interactions(measure, soap_cases):
+    notes = soap_notes(soap_cases)
+    for note in notes:
+        note.soap_json = dict(note.soap_json, plan=note.soap_json.get("plan", "") + " Start aspirin, ibuprofen and a beta blocker.")
+    # Legacy profile (no persisted codes) exercises the medical_history fallback too
+    profiles = [
+        PatientProfile(first_name="A", last_name="B", condition_codes=["ulcer", "kidney", "asthma"]),
+        PatientProfile(first_name="C", last_name="D", medical_history="Peptic ulcer, asthma and chronic kidney disease."),
+    ]
+
+    def run():
+        for note in notes:
+            for profile in profiles:
+                SafetyService.check_drug_interactions(note, profile)
+    measure(run)
+
+def test_parse_textgrid_corpus(measure, textgrid_paths):
+    def run():
+        for path in textgrid_paths:
+            parse_textgrid(path)
+    measure(run)
+
+def test_normalize_text_corpus(measure, textgrid_paths):
+    corpus = [parse_textgrid(path) for path in textgrid_paths]
+
+    def run():
+        for text in corpus:
+            normalize_text(text)
+    measure(run)
+
+def test_simple_wer_consultation(measure, consultation_utterances):
+    reference = normalize_text(" ".join(u["text"] for u in consultation_utterances)).split()[:600]
+    hypothesis = perturb(reference, random.Random(7))
+    measure(simple_wer, " ".join(reference), " ".join(hypothesis))
+
+def test_build_soap_prompt_single_shot(measure, consultation_utterances):
+    context = {"first_name": "Sarah", "last_name": "Connor", "age": 42, "gender": "F", "notes": "Epilepsy, on levetiracetam."}
+    measure(PromptService.build_soap_prompt, "", consultation_utterances, context)
+
+def test_build_soap_prompt_map_reduce(measure, consultation_utterances):
+    # A budget well under the transcript forces the chunked (map-reduce) path
+    measure(PromptService.build_soap_prompt, "", consultation_utterances, None, 500)
+
+def test_build_soap_prompt_plain_text(measure, consultation_utterances):
+    # No diarization: sentence splitting and cleaning of the raw text
+    transcript = " ".join(u["text"] for u in consultation_utterances)
+    measure(PromptService.build_soap_prompt, transcript)
@@ -0,0 +1,44 @@
+"""
+Cold-start cost of the API and pipeline entry points: wall time and peak RSS
+of a fresh interpreter importing each module. Provider SDKs are loaded on
+first use, so none of these should pull in google.generativeai or gRPC.
+
+    pytest benchmarks/bench_import_time.py
+"""
+import json
+import os
+import subprocess
+import sys
+import pytest
+from benchmarks.conftest import ROOT
+
+PROBE = """
+import json, resource, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{
+    "seconds": elapsed,
+    "max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    "sdk_modules": sorted(m for m in sys.modules if m.startswith(("google.generativeai", "grpc", "faster_whisper", "llama_cpp"))),
+}}))
+"""
+
+def import_probe(module: str) -> dict:
+    result = subprocess.run(
+        [sys.executable, "-W", "ignore", "-c", PROBE.format(module=module)],
+        cwd=ROOT, env=dict(os.environ), capture_output=True, text=True, check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+@pytest.mark.parametrize("module", ["app.main", "app.services.consultation_processor"])
+def test_cold_import(benchmark, module):
+    probes = []
+
+    def run():
+        probes.append(import_probe(module))
+    benchmark.pedantic(run, rounds=5, iterations=1)
+
+    benchmark.extra_info["import_seconds_min"] = round(min(p["seconds"] for p in probes), 3)
+    benchmark.extra_info["max_rss_kb"] = max(p["max_rss_kb"] for p in probes)
+    assert probes[-1]["sdk_modules"] == []
@@ -0,0 +1,103 @@
+"""
+Response serialization on 10k-row payloads, from the rows a handler gets
+back from the database to the rendered body. "before" is the old path:
+dicts or SQLModel rows through FastAPI's serialize_response and stdlib json.
+"after" is the list endpoints' current path: typed models dumped straight
+to JSON bytes by pydantic-core (model_list_response).
+
+    pytest benchmarks/bench_serialization.py
+"""
+import asyncio
+import json
+from datetime import datetime, timedelta
+from typing import Any, Dict, List
+from uuid import uuid4
+import pytest
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from app.models.base import Appointment, Consultation, PatientProfile, TriageCategory
+from app.api.v1.dashboard import QueueEntry
+from app.api.responses import model_list_response
+from app.schemas.appointment import AppointmentRead
+
+ROWS = 10_000
+
+@pytest.fixture(scope="module")
+def loop():
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.close()
+
+@pytest.fixture(scope="module")
+def queue_rows():
+    now = datetime.utcnow()
+    rows = []
+    for i in range(ROWS):
+        patient = PatientProfile(user_id=uuid4(), first_name="Pat", last_name=f"Ient{i}")
+        consultation = Consultation(
+            appointment_id=uuid4(), patient_id=patient.user_id, doctor_id=uuid4(),
+            urgency_score=i % 100, triage_category=list(TriageCategory)[i % 4],
+            safety_warnings=[{"type": "CAUTION"}] if i % 7 == 0 else None,
+            created_at=now - timedelta(minutes=i),
+        )
+        rows.append((consultation, patient))
+    return rows
+
+@pytest.fixture(scope="module")
+def appointment_rows():
+    now = datetime.utcnow()
+    return [
+        Appointment(patient_id=uuid4(), doctor_id=uuid4(), doctor_name="Dr. House", scheduled_at=now + timedelta(hours=i), reason="Headache")
+        for i in range(ROWS)
+    ]
+
+def render(loop, response_class, response_type, content):
+    field = create_response_field(name="response", type_=response_type) if response_type is not None else None
+    body = loop.run_until_complete(serialize_response(field=field, response_content=content))
+    return response_class(body).body
+
+def queue_dicts(rows):
+    now = datetime.utcnow()
+    return [{
+        "consultation_id": str(c.id),
+        "patient_name": f"{p.first_name} {p.last_name}",
+        "urgency_score": c.urgency_score or 0,
+        "triage_category": c.triage_category,
+        "wait_time_minutes": int((now - c.created_at).total_seconds() / 60),
+        "safety_warnings": len(c.safety_warnings) if c.safety_warnings else 0,
+    } for c, p in rows]
+
+def queue_models(rows):
+    now = datetime.utcnow()
+    return [QueueEntry(
+        consultation_id=str(c.id),
+        patient_name=f"{p.first_name} {p.last_name}",
+        urgency_score=c.urgency_score or 0,
+        triage_category=c.triage_category,
+        wait_time_minutes=int((now - c.created_at).total_seconds() / 60),
+        safety_warnings=len(c.safety_warnings) if c.safety_warnings else 0,
+    ) for c, p in rows]
+
+def test_queue_before_dicts_stdlib_json(benchmark, loop, queue_rows):
+    benchmark(lambda: render(loop, JSONResponse, List[Dict[str, Any]], queue_dicts(queue_rows)))
+
+def test_queue_after_models_dump_json(benchmark, queue_rows):
+    benchmark(lambda: model_list_response(QueueEntry, queue_models(queue_rows)).body)
+
+def test_appointments_before_jsonable_encoder(benchmark, loop, appointment_rows):
+    # No response_model: every SQLModel row went through jsonable_encoder
+    benchmark(lambda: render(loop, JSONResponse, None, appointment_rows))
+
+def test_appointments_after_dump_json(benchmark, appointment_rows):
+    benchmark(lambda: model_list_response(AppointmentRead, appointment_rows, from_attributes=True).body)
+
+def test_appointments_response_model_orjson(benchmark, loop, appointment_rows):
+    # Endpoints that keep FastAPI's response_model pass still gain orjson rendering
+    benchmark(lambda: render(loop, ORJSONResponse, List[AppointmentRead], appointment_rows))
+
+def test_payloads_match(loop, queue_rows, appointment_rows):
+    assert json.loads(render(loop, JSONResponse, List[Dict[str, Any]], queue_dicts(queue_rows[:50]))) == \
+        json.loads(model_list_response(QueueEntry, queue_models(queue_rows[:50])).body)
+    assert json.loads(render(loop, JSONResponse, None, appointment_rows[:50])) == \
+        json.loads(model_list_response(AppointmentRead, appointment_rows[:50], from_attributes=True).body)
@@ -0,0 +1,66 @@
+import glob
+import json
+import os
+import re
+import tracemalloc
+import pytest
+
+# The micro-benchmarks never touch the database or a provider; these only satisfy Settings
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("JWT_SECRET", "benchmark-secret")
+os.environ.setdefault("STT_PROVIDER", "replay")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TRANSCRIPT_DIR = os.path.join(ROOT, "test-audio-transcripts")
+INTERVAL_PATTERN = re.compile(r'xmin = ([\d.]+)\s*\n\s*xmax = ([\d.]+)\s*\n\s*text = "(.*)"')
+
+@pytest.fixture(scope="session")
+def textgrid_paths():
+    paths = sorted(glob.glob(os.path.join(TRANSCRIPT_DIR, "*.TextGrid")))
+    if not paths:
+        pytest.skip("test-audio-transcripts corpus not available")
+    return paths
+
+@pytest.fixture(scope="session")
+def consultation_utterances(textgrid_paths):
+    """
+    Diarized utterances ({"speaker", "text", "start", "end"}, ms) of the longest
+    consultation in the corpus, interleaving its doctor and patient TextGrids.
+    """
+    by_consultation = {}
+    for path in textgrid_paths:
+        name = os.path.basename(path)[:-len(".TextGrid")]
+        consultation, _, speaker = name.rpartition("_")
+        with open(path, encoding="utf-8") as f:
+            for start, end, text in INTERVAL_PATTERN.findall(f.read()):
+                if text.strip():
+                    by_consultation.setdefault(consultation, []).append({
+                        "speaker": "A" if speaker == "doctor" else "B",
+                        "text": text,
+                        "start": int(float(start) * 1000),
+                        "end": int(float(end) * 1000),
+                    })
+    longest = max(by_consultation.values(), key=len)
+    return sorted(longest, key=lambda u: u["start"])
+
+@pytest.fixture(scope="session")
+def soap_cases():
+    with open(os.path.join(ROOT, "fixtures", "mock_soap_data.json")) as f:
+        return json.load(f)
+
+@pytest.fixture
+def measure(benchmark):
+    """
+    benchmark() plus the peak traced allocation of one call, stored in the
+    run's extra_info (and so in the saved history) as peak_memory_kb.
+    """
+    def run(func, *args, **kwargs):
+        tracemalloc.start()
+        try:
+            func(*args, **kwargs)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        benchmark.extra_info["peak_memory_kb"] = round(peak / 1024, 1)
+        return benchmark(func, *args, **kwargs)
+    return run
@@ -0,0 +1,480 @@
+"""
+HTTP load test for app.main:app with replayed STT/LLM backends.
+
+Seeds a database (SQLite file or Postgres) with doctors, patients,
+appointments and consultations, boots uvicorn against it and drives a mixed
+workload of logins, bookings, dashboard polling and audio uploads from
+closed-loop virtual users. Reports throughput and p50/p99 per endpoint and
+compares them against a stored baseline.
+
+    python -m benchmarks.load_test --duration 60 --concurrency 32
+    python -m benchmarks.load_test --database-url postgresql://user:pw@localhost/loadtest --reset-db --workers 4
+    python -m benchmarks.load_test --save-baseline
+
+Exits with status 1 when an endpoint regresses past --tolerance.
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import wave
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Any, Optional
+import httpx
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BASELINE = os.path.join(ROOT, "benchmarks", "baselines", "load_test.json")
+PASSWORD = "loadtest-password"
+DEFAULT_MIX = "login=1,book=4,doctors=3,dashboard=8,consultation=4,upload=1"
+SYMPTOMS = [
+    "Recurring headaches for two weeks", "Tremor in the right hand", "Memory lapses and confusion",
+    "Numbness in both feet", "Dizziness when standing up", "Seizure last night",
+]
+TRIAGE = [("CRITICAL", 90), ("HIGH", 70), ("MODERATE", 45), ("LOW", 15)]
+
+def parse_mix(mix: str) -> Dict[str, float]:
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        weights[name.strip()] = float(weight or 1)
+    unknown = set(weights) - set(SCENARIOS)
+    if unknown:
+        raise SystemExit(f"Unknown scenario(s) in --mix: {', '.join(sorted(unknown))}")
+    return weights
+
+def silent_wav(seconds: float = 1.0, sample_rate: int = 16000) -> bytes:
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(sample_rate)
+        wf.writeframes(b"\x00\x00" * int(seconds * sample_rate))
+    return buffer.getvalue()
+
+def seed_database(database_url: str, doctors: int, patients: int, appointments: int, consultations: int, uploads: int) -> Dict[str, Any]:
+    """
+    Drops and recreates the schema, then bulk-inserts the fixture population.
+    Every user shares one password hash (bcrypt per row would dominate seeding
+    time). Returns the ids the virtual users need.
+    """
+    from sqlmodel import Session, SQLModel, create_engine
+    from app.core.security import get_password_hash
+    from app.services.slot_service import SlotService
+    from app.models.base import (
+        User, UserRole, PatientProfile, DoctorProfile, Appointment, AppointmentStatus,
+        Consultation, ConsultationStatus, ProcessingStage, TriageCategory
+    )
+
+    engine = create_engine(database_url)
+    SQLModel.metadata.drop_all(engine)
+    SQLModel.metadata.create_all(engine)
+    rng = random.Random(42)
+    password_hash = get_password_hash(PASSWORD)
+    now = datetime.utcnow()
+
+    doctor_users = [User(email=f"doctor{i}@loadtest.local", password_hash=password_hash, role=UserRole.DOCTOR) for i in range(doctors)]
+    patient_users = [User(email=f"patient{i}@loadtest.local", password_hash=password_hash, role=UserRole.PATIENT) for i in range(patients)]
+    doctor_profiles = [
+        DoctorProfile(
+            user_id=u.id, first_name="Doc", last_name=f"Tor{i}", specialization=rng.choice(["Neurology", "General", "Psychiatry"]),
+            license_number=f"LT-{i:06d}", years_of_experience=rng.randint(1, 30), qualification="MD",
+            clinic_address=f"{i} Clinic Road"
+        ) for i, u in enumerate(doctor_users)
+    ]
+    patient_profiles = [
+        PatientProfile(user_id=u.id, first_name="Pat", last_name=f"Ient{i}", medical_history=rng.choice(["", "Epilepsy", "Hypertension"]))
+        for i, u in enumerate(patient_users)
+    ]
+
+    # Future bookings take distinct slot starts: on PostgreSQL the slot index and
+    # the overlap exclusion constraint reject anything else
+    open_slots = {}
+    for profile in doctor_profiles:
+        slots = SlotService.slot_starts(profile, (now + timedelta(days=1)).date(), (now + timedelta(days=60)).date())
+        rng.shuffle(slots)
+        open_slots[profile.user_id] = (profile.slot_minutes, slots)
+
+    appointment_rows, consultation_rows, upload_targets = [], [], []
+    for i in range(appointments):
+        patient, doctor = rng.choice(patient_users), rng.choice(doctor_users)
+        has_consultation = i < consultations + uploads
+        duration, slots = open_slots[doctor.id]
+        if has_consultation:
+            scheduled = now - timedelta(days=rng.uniform(0, 90))
+        elif slots:
+            scheduled = slots.pop()
+        else:
+            raise ValueError(f"Not enough free slots for {appointments - consultations - uploads} future appointments")
+        appointment = Appointment(
+            patient_id=patient.id, doctor_id=doctor.id, doctor_name=f"Dr. {doctor.email}", scheduled_at=scheduled,
+            duration_minutes=duration,
+            reason=rng.choice(SYMPTOMS),
+            status=AppointmentStatus.COMPLETED if has_consultation else AppointmentStatus.SCHEDULED,
+        )
+        appointment_rows.append(appointment)
+        if not has_consultation:
+            continue
+        consultation = Consultation(
+            appointment_id=appointment.id, patient_id=patient.id, doctor_id=doctor.id, created_at=scheduled,
+        )
+        if i < consultations:
+            category, score = rng.choice(TRIAGE)
+            failed = rng.random() < 0.05
+            consultation.status = ConsultationStatus.FAILED if failed else ConsultationStatus.COMPLETED
+            consultation.requires_manual_review = failed
+            consultation.processing_stage = ProcessingStage.TRANSCRIBED if failed else ProcessingStage.TRIAGED
+            if not failed:
+                consultation.triage_category = TriageCategory(category)
+                consultation.urgency_score = score
+        else:
+            consultation.status = ConsultationStatus.SCHEDULED
+            upload_targets.append(str(consultation.id))
+        consultation_rows.append(consultation)
+
+    with Session(engine, expire_on_commit=False) as session:
+        # Parents first so the foreign keys hold on Postgres
+        for batch in (doctor_users + patient_users, doctor_profiles + patient_profiles, appointment_rows, consultation_rows):
+            for start in range(0, len(batch), 2000):
+                session.add_all(batch[start:start + 2000])
+                session.flush()
+        session.commit()
+
+    engine.dispose()
+    return {
+        "doctors": [{"id": str(u.id), "email": u.email} for u in doctor_users],
+        "patients": [{"id": str(u.id), "email": u.email} for u in patient_users],
+        "consultations": [str(c.id) for c in consultation_rows[:consultations]],
+        "upload_targets": upload_targets,
+    }
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def start_server(args, workdir: str, port: int) -> subprocess.Popen:
+    env = dict(os.environ)
+    env.update({
+        "PYTHONPATH": ROOT + os.pathsep + env.get("PYTHONPATH", ""),
+        "DATABASE_URL": args.database_url,
+        "JWT_SECRET": env.get("JWT_SECRET", "loadtest-secret"),
+        "STT_PROVIDER": "replay",
+        "LLM_PROVIDER": "replay",
+        "STT_REPLAY_LATENCY_MS": str(args.stt_latency_ms),
+        "STT_REPLAY_JITTER_MS": str(args.stt_latency_ms / 4),
+        "LLM_REPLAY_LATENCY_MS": str(args.llm_latency_ms),
+        "LLM_REPLAY_JITTER_MS": str(args.llm_latency_ms / 4),
+        "LLM_REPLAY_ERROR_RATE": str(args.error_rate),
+        "LLM_FIXTURE_PATH": os.path.join(ROOT, "fixtures", "mock_soap_data.json"),
+        "AUDIO_PREPROCESSING_ENABLED": "true" if args.preprocess else "false",
+        "LOG_LEVEL": "WARNING",
+    })
+    # Runs in a scratch directory so uploads/ and any .env in the repo stay untouched
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(args.workers), "--log-level", "warning", "--no-access-log"],
+        cwd=workdir, env=env,
+    )
+
+async def wait_until_ready(base_url: str, server: subprocess.Popen, timeout: float = 60.0):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise SystemExit(f"Server exited with status {server.returncode}")
+            try:
+                if (await client.get("/api/v1/doctors/")).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.25)
+    raise SystemExit("Server did not become ready")
+
+class LoadRun:
+    """Shared state of one run: seeded ids, cached tokens and per-endpoint samples."""
+    def __init__(self, client: httpx.AsyncClient, seed: Dict[str, Any], rng: random.Random):
+        self.client = client
+        self.seed = seed
+        self.rng = rng
+        self.upload_targets = list(seed["upload_targets"])
+        self.audio = silent_wav()
+        self.tokens: Dict[str, str] = {}
+        self.latencies: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+
+    async def request(self, name: str, method: str, url: str, expected: tuple = (), **kwargs) -> Optional[httpx.Response]:
+        start = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, **kwargs)
+            ok = response.status_code < 400 or response.status_code in expected
+        except httpx.HTTPError:
+            response, ok = None, False
+        self.latencies.setdefault(name, []).append((time.perf_counter() - start) * 1000)
+        if not ok:
+            self.errors[name] = self.errors.get(name, 0) + 1
+        return response
+
+    async def login(self, user: Dict[str, str], record: bool = True) -> Optional[str]:
+        kwargs = dict(data={"username": user["email"], "password": PASSWORD})
+        if record:
+            response = await self.request("POST /auth/login", "POST", "/api/v1/auth/login", **kwargs)
+        else:
+            response = await self.client.post("/api/v1/auth/login", **kwargs)
+        if response is None or response.status_code != 200:
+            return None
+        return response.json()["access_token"]
+
+    async def token_for(self, user: Dict[str, str]) -> Dict[str, str]:
+        # Most traffic reuses a session token, as the frontend does
+        if user["id"] not in self.tokens:
+            self.tokens[user["id"]] = await self.login(user, record=False)
+        return {"Authorization": f"Bearer {self.tokens[user['id']]}"}
+
+async def scenario_login(run: LoadRun):
+    await run.login(run.rng.choice(run.seed["patients"]))
+
+async def scenario_book(run: LoadRun):
+    # As the frontend does: list a week of free slots, then book one of them
+    patient, doctor = run.rng.choice(run.seed["patients"]), run.rng.choice(run.seed["doctors"])
+    start = (datetime.now(timezone.utc) + timedelta(days=run.rng.randint(1, 30))).date()
+    response = await run.request(
+        "GET /doctors/{id}/slots", "GET", f"/api/v1/doctors/{doctor['id']}/slots", params={"start": start.isoformat()}
+    )
+    if response is None or response.status_code != 200 or not response.json()["slots"]:
+        return
+    await run.request("POST /appointments", "POST", "/api/v1/appointments/", headers=await run.token_for(patient), json={
+        "patient_id": patient["id"], "doctor_id": doctor["id"], "doctor_name": doctor["email"],
+        "scheduled_at": run.rng.choice(response.json()["slots"]), "reason": run.rng.choice(SYMPTOMS),
+    }, expected=(409,)) # Losing a race for a slot is a normal outcome
+
+async def scenario_doctors(run: LoadRun):
+    await run.request("GET /doctors", "GET", "/api/v1/doctors/")
+
+async def scenario_dashboard(run: LoadRun):
+    # The dashboard polls both queues on every refresh
+    await run.request("GET /dashboard/queue", "GET", "/api/v1/dashboard/queue")
+    await run.request("GET /dashboard/queue/failed", "GET", "/api/v1/dashboard/queue/failed")
+
+async def scenario_consultation(run: LoadRun):
+    doctor = run.rng.choice(run.seed["doctors"])
+    consultation_id = run.rng.choice(run.seed["consultations"])
+    await run.request("GET /consultations/{id}", "GET", f"/api/v1/consultations/{consultation_id}", headers=await run.token_for(doctor))
+
+async def scenario_upload(run: LoadRun):
+    # Each consultation takes one recording; fall back to polling once the targets run out
+    if not run.upload_targets:
+        return await scenario_dashboard(run)
+    doctor = run.rng.choice(run.seed["doctors"])
+    consultation_id = run.upload_targets.pop()
+    await run.request(
+        "POST /consultations/{id}/upload", "POST", f"/api/v1/consultations/{consultation_id}/upload",
+        headers=await run.token_for(doctor), files={"file": ("visit.wav", run.audio, "audio/wav")},
+    )
+
+SCENARIOS = {
+    "login": scenario_login,
+    "book": scenario_book,
+    "doctors": scenario_doctors,
+    "dashboard": scenario_dashboard,
+    "consultation": scenario_consultation,
+    "upload": scenario_upload,
+}
+
+async def virtual_user(run: LoadRun, weights: Dict[str, float], deadline: float, think_ms: float):
+    names, values = list(weights), list(weights.values())
+    while time.monotonic() < deadline:
+        await SCENARIOS[run.rng.choices(names, values)[0]](run)
+        if think_ms:
+            await asyncio.sleep(run.rng.expovariate(1000 / think_ms))
+
+def summarize(run: LoadRun, elapsed: float) -> Dict[str, Dict[str, float]]:
+    endpoints = {}
+    for name, samples in sorted(run.latencies.items()):
+        values = np.array(samples)
+        endpoints[name] = {
+            "requests": len(samples),
+            "errors": run.errors.get(name, 0),
+            "throughput_rps": round(len(samples) / elapsed, 2),
+            "p50_ms": round(float(np.percentile(values, 50)), 1),
+            "p99_ms": round(float(np.percentile(values, 99)), 1),
+        }
+    return endpoints
+
+def pipeline_summary(database_url: str, wait_seconds: float) -> Dict[str, Any]:
+    """
+    Waits for in-flight uploads to finish processing, then reports outcomes and
+    per-stage p50/p99 from pipeline_spans.
+    """
+    from sqlmodel import Session, create_engine, select, func
+    from app.models.base import Consultation, ConsultationStatus, PipelineSpan
+
+    engine = create_engine(database_url)
+    deadline = time.monotonic() + wait_seconds
+    with Session(engine) as session:
+        while time.monotonic() < deadline:
+            pending = session.exec(
+                select(func.count()).select_from(Consultation).where(Consultation.status == ConsultationStatus.IN_PROGRESS)
+            ).one()
+            if not pending:
+                break
+            time.sleep(0.5)
+        stages: Dict[str, List[float]] = {}
+        for stage, duration in session.exec(select(PipelineSpan.stage, PipelineSpan.duration_ms)):
+            stages.setdefault(stage, []).append(duration)
+    engine.dispose()
+    return {
+        "in_progress_at_end": pending,
+        "stages": {
+            stage: {
+                "count": len(values),
+                "p50_ms": round(float(np.percentile(values, 50)), 1),
+                "p99_ms": round(float(np.percentile(values, 99)), 1),
+            } for stage, values in sorted(stages.items())
+        },
+    }
+
+def compare(current: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]], tolerance: float) -> List[str]:
+    """Regressions: p99 up or throughput down by more than `tolerance`, or new errors."""
+    regressions = []
+    for name, base in baseline.items():
+        now = current.get(name)
+        if now is None:
+            continue
+        if now["p99_ms"] > base["p99_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p99 {base['p99_ms']} -> {now['p99_ms']} ms")
+        if now["throughput_rps"] < base["throughput_rps"] * (1 - tolerance):
+            regressions.append(f"{name}: throughput {base['throughput_rps']} -> {now['throughput_rps']} req/s")
+        if now["errors"] / now["requests"] > base["errors"] / max(base["requests"], 1) + 0.01:
+            regressions.append(f"{name}: errors {base['errors']}/{base['requests']} -> {now['errors']}/{now['requests']}")
+    return regressions
+
+def print_report(endpoints: Dict[str, Dict[str, float]], baseline: Optional[Dict[str, Dict[str, float]]], pipeline: Optional[Dict[str, Any]]):
+    header = f"{'endpoint':<32}{'requests':>10}{'errors':>8}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}"
+    if baseline:
+        header += f"{'base p99':>10}{'base req/s':>12}"
+    print(header)
+    print("-" * len(header))
+    for name, stats in endpoints.items():
+        line = f"{name:<32}{stats['requests']:>10}{stats['errors']:>8}{stats['throughput_rps']:>10}{stats['p50_ms']:>10}{stats['p99_ms']:>10}"
+        if baseline and name in baseline:
+            line += f"{baseline[name]['p99_ms']:>10}{baseline[name]['throughput_rps']:>12}"
+        print(line)
+    if pipeline:
+        print(f"\nPipeline (background processing, {pipeline['in_progress_at_end']} still in progress):")
+        for stage, stats in pipeline["stages"].items():
+            print(f"  {stage:<14}{stats['count']:>8} spans  p50 {stats['p50_ms']:>9} ms  p99 {stats['p99_ms']:>9} ms")
+
+async def drive(args, seed: Dict[str, Any], base_url: str) -> Dict[str, Dict[str, float]]:
+    weights = parse_mix(args.mix)
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60.0) as client:
+        run = LoadRun(client, seed, random.Random(args.seed))
+        if args.warmup:
+            await asyncio.gather(*(
+                virtual_user(run, weights, time.monotonic() + args.warmup, args.think_ms) for _ in range(args.concurrency)
+            ))
+            run.latencies.clear()
+            run.errors.clear()
+        started = time.monotonic()
+        await asyncio.gather(*(
+            virtual_user(run, weights, started + args.duration, args.think_ms) for _ in range(args.concurrency)
+        ))
+        return summarize(run, time.monotonic() - started)
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the API with stubbed AI providers")
+    parser.add_argument("--database-url", default=None, help="Defaults to a throwaway SQLite file")
+    parser.add_argument("--reset-db", action="store_true", help="Allow dropping every table of --database-url before seeding")
+    parser.add_argument("--doctors", type=int, default=50)
+    parser.add_argument("--patients", type=int, default=2000)
+    parser.add_argument("--appointments", type=int, default=10000)
+    parser.add_argument("--consultations", type=int, default=5000, help="Processed consultations (dashboard queue population)")
+    parser.add_argument("--uploads", type=int, default=500, help="Consultations left open for the upload scenario")
+    parser.add_argument("--duration", type=float, default=30.0, help="Measured seconds")
+    parser.add_argument("--warmup", type=float, default=5.0, help="Unmeasured seconds before the run")
+    parser.add_argument("--concurrency", type=int, default=16, help="Virtual users")
+    parser.add_argument("--think-ms", type=float, default=0.0, help="Mean pause between a user's requests")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"Scenario weights (default: {DEFAULT_MIX})")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--stt-latency-ms", type=float, default=2000.0)
+    parser.add_argument("--llm-latency-ms", type=float, default=800.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Injected LLM failure rate")
+    parser.add_argument("--preprocess", action="store_true", help="Keep audio pre-processing on (needs ffmpeg)")
+    parser.add_argument("--pipeline-wait", type=float, default=30.0, help="Seconds to wait for uploads to finish processing")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="Store this run as the baseline instead of comparing")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative change before a regression is reported")
+    parser.add_argument("--output", help="Write the full results as JSON")
+    args = parser.parse_args()
+
+    if args.database_url is not None and not args.reset_db:
+        parser.error("seeding drops every table of --database-url; pass --reset-db if it is a disposable database")
+    workdir = tempfile.mkdtemp(prefix="loadtest-")
+    if args.database_url is None:
+        args.database_url = f"sqlite:///{os.path.join(workdir, 'loadtest.db')}"
+    # The app settings are read on import; the seeding process needs them too
+    os.environ.setdefault("DATABASE_URL", args.database_url)
+    os.environ.setdefault("JWT_SECRET", "loadtest-secret")
+    os.environ.setdefault("STT_PROVIDER", "replay")
+
+    print(f"Seeding {args.doctors} doctors, {args.patients} patients, {args.appointments} appointments...")
+    seed = seed_database(args.database_url, args.doctors, args.patients, args.appointments, args.consultations, args.uploads)
+
+    port = free_port()
+    server = start_server(args, workdir, port)
+    try:
+        base_url = f"http://127.0.0.1:{port}"
+        asyncio.run(wait_until_ready(base_url, server))
+        print(f"Running {args.concurrency} virtual users for {args.duration:.0f}s against {base_url}...\n")
+        endpoints = asyncio.run(drive(args, seed, base_url))
+        pipeline = pipeline_summary(args.database_url, args.pipeline_wait) if "upload" in parse_mix(args.mix) else None
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    baseline = None
+    if not args.save_baseline and os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)["endpoints"]
+    print_report(endpoints, baseline, pipeline)
+
+    results = {
+        "recorded_at": datetime.utcnow().isoformat(timespec="seconds"),
+        "config": {k: v for k, v in vars(args).items() if k not in ("baseline", "output", "save_baseline", "database_url")},
+        "database": args.database_url.split(":", 1)[0],
+        "endpoints": endpoints,
+        "pipeline": pipeline,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nBaseline saved to {args.baseline}")
+        return
+    if baseline:
+        regressions = compare(endpoints, baseline, args.tolerance)
+        if regressions:
+            print("\nRegressions against baseline:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"\nNo regressions against baseline (tolerance {args.tolerance:.0%})")
+    else:
+        print(f"\nNo baseline at {args.baseline}; record one with --save-baseline")
+
+if __name__ == "__main__":
+    main()
@@ -13,30 +13,27 @@ REPORT_FILE = "accuracy_report.csv"
 def simple_wer(ref, hyp):
     """
     Calculation of WER with Levenshtein distance.
-    Works on lists of words.
+    Works on lists of words. Only two rows of the cost matrix are kept,
+    so memory grows with the hypothesis length rather than ref x hyp.
     """
     r = ref.split()
     h = hyp.split()
-    # costs will hold the costs, like in the Levenshtein distance algorithm
-    costs = [[0 for _ in range(len(h) + 1)] for _ in range(len(r) + 1)]
-    
-    for i in range(len(r) + 1):
-        costs[i][0] = i
-    for j in range(len(h) + 1):
-        costs[0][j] = j
-        
+    if not r:
+        return 0.0
+    # previous[j] is the distance between r[:i-1] and h[:j]
+    previous = list(range(len(h) + 1))
     for i in range(1, len(r) + 1):
+        current = [i] + [0] * len(h)
+        word = r[i-1]
         for j in range(1, len(h) + 1):
-            if r[i-1] == h[j-1]:
-                costs[i][j] = costs[i-1][j-1]
+            if word == h[j-1]:
+                current[j] = previous[j-1]
             else:
-                sub = costs[i-1][j-1] + 1
-                ins = costs[i][j-1] + 1
-                del_ = costs[i-1][0] + 1 # optimization? No, standard algorithm
-                del_ = costs[i-1][j] + 1
-                costs[i][j] = min(sub, ins, del_)
-                
-    return costs[len(r)][len(h)] / len(r) if len(r) > 0 else 0.0
+                # substitution, insertion, deletion
+                current[j] = min(previous[j-1], current[j-1], previous[j]) + 1
+        previous = current
+
+    return previous[len(h)] / len(r)
 
 def parse_textgrid(file_path):
     """
@@ -7,7 +7,6 @@ from datetime import datetime
 from sqlmodel import Session, select, create_engine, SQLModel
 from app.models.base import Consultation, AudioFile, PatientProfile, User, SOAPNote, ConsultationStatus, AudioUploaderType, UserRole, Appointment, AppointmentStatus, TriageCategory
 from app.services.consultation_processor import process_consultation_flow
-import time
 
 # Setup DB
 DATABASE_URL = "sqlite:///demo_ranking.db"
@@ -168,9 +167,7 @@ async def main():
         res = await process_demo_file(filename)
         if res:
             results.append(res)
-        # Throttle for Free Tier (Aggressive)
-        print("Sleeping 5s...")
-        time.sleep(5)
+        # Free Tier throttling is handled by the shared provider limiters
         
     # RANKING LOGIC
     print("\n\n" + "="*80)
@@ -11,15 +11,17 @@ from app.core.config import settings
 def check_environment():
     """
     Validates that necessary API keys are present in the environment
-    before running any live tests.
+    before running any live tests. Keys are only required for the
+    providers actually selected (STT_PROVIDER=local and
+    LLM_PROVIDER=local/replay need none).
     """
     assemblyai_key = settings.ASSEMBLYAI_API_KEY
     google_key = settings.GOOGLE_API_KEY
     
     missing_keys = []
-    if not assemblyai_key:
+    if settings.STT_PROVIDER.lower() == "assemblyai" and not assemblyai_key:
         missing_keys.append("ASSEMBLYAI_API_KEY")
-    if not google_key:
+    if settings.LLM_PROVIDER.lower() == "gemini" and not google_key:
         missing_keys.append("GOOGLE_API_KEY")
         
     if missing_keys:
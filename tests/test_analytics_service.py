@@ -0,0 +1,93 @@
+from datetime import datetime, timedelta
+from sqlmodel import Session, SQLModel, create_engine, select
+from app.core.config import settings
+from app.models.base import AILog, AILogRollup
+from app.services.analytics_service import AnalyticsService
+
+def add_logs(session, hour, model, latencies, failures=0):
+    for i, latency in enumerate(latencies):
+        session.add(AILog(model_version=model, status="SUCCESS", latency_ms=latency, created_at=hour + timedelta(minutes=i % 60)))
+    for _ in range(failures):
+        session.add(AILog(model_version=model, status="FAIL", error_message="429", created_at=hour))
+    session.commit()
+
+def test_histogram_percentile_interpolates_within_bucket():
+    # 100 latencies: 20 up to 250ms, 80 more up to 500ms
+    cumulative = [20, 100] + [100] * 12
+    assert AnalyticsService.histogram_percentile(cumulative, 100, 0.2) == 250.0
+    assert AnalyticsService.histogram_percentile(cumulative, 100, 0.6) == 375.0
+    assert AnalyticsService.histogram_percentile(cumulative, 0, 0.5) is None
+
+def test_rollups_are_incremental_and_feed_the_report():
+    engine = create_engine("sqlite://")
+    SQLModel.metadata.create_all(engine)
+    hour = datetime(2024, 1, 1, 10)
+    with Session(engine) as session:
+        add_logs(session, hour, "gemini-2.5-flash", [1000.0 + 10 * i for i in range(101)], failures=1)
+        add_logs(session, hour + timedelta(hours=1), "gemini-2.5-flash", [4000.0] * 10)
+        assert AnalyticsService.refresh_rollups(session) == 2
+
+        # New rows only touch the latest hour; older rollups are left alone
+        add_logs(session, hour + timedelta(hours=1), "gemini-2.5-flash", [4000.0] * 10)
+        assert AnalyticsService.refresh_rollups(session) == 1
+        assert len(session.exec(select(AILogRollup)).all()) == 2
+
+        report = AnalyticsService.get_ai_log_analytics(session, hour, hour + timedelta(hours=2))
+        first, second = report["series"]
+        assert first["requests"] == 102 and first["failures"] == 1
+        # Interpolated within the 1000-2000ms and 3000-5000ms histogram buckets
+        assert first["p50_latency_ms"] == 1495.0
+        assert first["p99_latency_ms"] == 1989.9
+        assert second["requests"] == 20 and second["p95_latency_ms"] == 4900.0
+
+        (model,) = report["models"]
+        assert model["model_version"] == "gemini-2.5-flash"
+        assert model["requests"] == 122
+        assert abs(model["failure_rate"] - 1 / 122) < 1e-4
+        assert abs(model["throughput_per_minute"] - 122 / 120) < 1e-3
+        # Merged-histogram percentile lands in the right bucket (3000-5000ms)
+        assert 3000 <= model["p95_latency_ms"] <= 5000
+
+        daily = AnalyticsService.get_ai_log_analytics(session, hour, hour + timedelta(hours=2), bucket="day")
+        assert len(daily["series"]) == 1 and daily["series"][0]["requests"] == 122
+
+        # A bucket holding one hour reports the same percentiles as that hour
+        one_hour = AnalyticsService.get_ai_log_analytics(session, hour, hour + timedelta(hours=1), bucket="day")
+        assert one_hour["series"][0]["p99_latency_ms"] == first["p99_latency_ms"]
+
+def test_analytics_endpoint(client):
+    response = client.get("/api/v1/dashboard/analytics/ai", params={"bucket": "day"})
+    assert response.status_code == 200
+    assert response.json()["bucket"] == "day"
+    assert client.get("/api/v1/dashboard/analytics/ai", params={"bucket": "week"}).status_code == 422
+
+def test_refresh_picks_up_rows_committed_late(monkeypatch):
+    monkeypatch.setattr(settings, "ANALYTICS_LATE_ROW_MINUTES", 120)
+    engine = create_engine("sqlite://")
+    SQLModel.metadata.create_all(engine)
+    hour = datetime(2024, 1, 1, 10)
+    with Session(engine) as session:
+        add_logs(session, hour, "m", [100.0])
+        add_logs(session, hour + timedelta(hours=1), "m", [100.0])
+        AnalyticsService.refresh_rollups(session, now=hour + timedelta(hours=1, minutes=5))
+
+        # A pipeline run that started at 10:30 commits its AILog after 11:00 was rolled up
+        add_logs(session, hour + timedelta(minutes=30), "m", [200.0])
+        now = hour + timedelta(hours=1, minutes=10)
+        assert AnalyticsService.rescan_from(session, now) == datetime(2024, 1, 1, 9)
+        AnalyticsService.refresh_rollups(session, now=now)
+        report = AnalyticsService.get_ai_log_analytics(session, hour, hour + timedelta(hours=2))
+        assert [b["requests"] for b in report["series"]] == [2, 1]
+
+        # Hours past the window are final: the next refresh starts at the latest stored hour
+        assert AnalyticsService.rescan_from(session, hour + timedelta(days=1)) == hour + timedelta(hours=1)
+
+def test_report_does_not_write_rollups(monkeypatch):
+    engine = create_engine("sqlite://")
+    SQLModel.metadata.create_all(engine)
+    hour = datetime(2024, 1, 1, 10)
+    with Session(engine) as session:
+        add_logs(session, hour, "m", [100.0])
+        report = AnalyticsService.get_ai_log_analytics(session, hour, hour + timedelta(hours=1))
+        assert report["series"] == []
+        assert session.exec(select(AILogRollup)).all() == []
@@ -0,0 +1,132 @@
+import json
+import threading
+from datetime import datetime, timedelta
+from uuid import uuid4
+from sqlmodel import Session
+from app.core.config import settings
+from app.core.db import engine
+from app.core.security import create_access_token
+from app.models.base import (
+    User, UserRole, PatientProfile, DoctorProfile, Appointment, Consultation, ConsultationStatus, SOAPNote,
+    TriageCategory
+)
+
+def seed_completed_consultation():
+    patient = User(email=f"{uuid4()}@test.com", password_hash="pw", role=UserRole.PATIENT)
+    doctor = User(email=f"{uuid4()}@test.com", password_hash="pw", role=UserRole.DOCTOR)
+    with Session(engine) as session:
+        session.add_all([patient, doctor])
+        session.add(PatientProfile(user_id=patient.id, first_name="Ada", last_name="Lovelace"))
+        session.add(DoctorProfile(user_id=doctor.id, first_name="Gregory", last_name="House", specialization="Neurology"))
+        appointment = Appointment(patient_id=patient.id, doctor_id=doctor.id, scheduled_at=datetime.utcnow() + timedelta(days=1))
+        session.add(appointment)
+        consultation = Consultation(
+            appointment_id=appointment.id, patient_id=patient.id, doctor_id=doctor.id,
+            status=ConsultationStatus.COMPLETED, urgency_score=90, triage_category=TriageCategory.CRITICAL,
+            safety_warnings=[{"type": "CAUTION"}],
+        )
+        session.add(consultation)
+        session.commit()
+        return patient.id, doctor.id, consultation.id
+
+def test_list_endpoints_serialize_response_models(client):
+    patient_id, doctor_id, consultation_id = seed_completed_consultation()
+    headers = {"Authorization": f"Bearer {create_access_token(subject=patient_id, role='PATIENT')}"}
+
+    queue = client.get("/api/v1/dashboard/queue").json()
+    entry = next(e for e in queue if e["consultation_id"] == str(consultation_id))
+    assert entry["patient_name"] == "Ada Lovelace"
+    assert entry["triage_category"] == "CRITICAL"
+    assert entry["safety_warnings"] == 1
+
+    doctors = client.get("/api/v1/doctors/").json()
+    assert {"id": str(doctor_id), "first_name": "Gregory", "last_name": "House",
+            "specialization": "Neurology", "clinic_address": None} in doctors
+
+    appointments = client.get("/api/v1/appointments/me", headers=headers).json()
+    assert appointments[0]["doctor_id"] == str(doctor_id)
+    assert appointments[0]["status"] == "SCHEDULED"
+    assert appointments[0]["duration_minutes"] == 30
+
+    # /me used to be shadowed by /{id} and answered 422
+    consultations = client.get("/api/v1/consultations/me", headers=headers)
+    assert consultations.status_code == 200
+    assert [c["id"] for c in consultations.json()] == [str(consultation_id)]
+    assert consultations.json()[0]["appointment"]["duration_minutes"] == 30
+    assert consultations.json()[0]["soap_note"] is None
+    detail = client.get(f"/api/v1/consultations/{consultation_id}", headers=headers).json()
+    assert detail == consultations.json()[0]
+
+def test_retry_takes_over_an_expired_lease(client, monkeypatch):
+    from app.services import consultation_processor
+    _, doctor_id, consultation_id = seed_completed_consultation()
+    headers = {"Authorization": f"Bearer {create_access_token(subject=doctor_id, role='DOCTOR')}"}
+    runs = []
+    async def fake_flow(id):
+        runs.append(id)
+    monkeypatch.setattr(consultation_processor, "process_consultation_flow", fake_flow)
+
+    def set_lease(age_seconds):
+        with Session(engine) as session:
+            consultation = session.get(Consultation, consultation_id)
+            consultation.status = ConsultationStatus.FAILED
+            consultation.processing_started_at = datetime.utcnow() - timedelta(seconds=age_seconds)
+            session.add(consultation)
+            session.commit()
+
+    set_lease(60)
+    assert client.post(f"/api/v1/consultations/{consultation_id}/retry", headers=headers).status_code == 409
+    # The run holding the lease died without releasing it
+    set_lease(settings.PROCESSING_LEASE_SECONDS + 60)
+    response = client.post(f"/api/v1/consultations/{consultation_id}/retry", headers=headers)
+    assert response.status_code == 200
+    assert runs == [consultation_id]
+
+def test_soap_stream_checks_ownership_and_polls_when_idle(client, monkeypatch):
+    patient_id, doctor_id, consultation_id = seed_completed_consultation()
+    other_doctor = User(email=f"{uuid4()}@test.com", password_hash="pw", role=UserRole.DOCTOR)
+    with Session(engine) as session:
+        session.add(other_doctor)
+        consultation = session.get(Consultation, consultation_id)
+        consultation.status = ConsultationStatus.IN_PROGRESS
+        session.add(consultation)
+        session.commit()
+        other_doctor_id = other_doctor.id
+    url = f"/api/v1/consultations/{consultation_id}/soap/stream"
+    def headers(user_id, role):
+        return {"Authorization": f"Bearer {create_access_token(subject=user_id, role=role)}"}
+    assert client.get(url, headers=headers(other_doctor_id, "DOCTOR")).status_code == 403
+
+    # The run finishes in another worker: no event reaches this process, the idle poll sees it
+    monkeypatch.setattr(settings, "SSE_KEEPALIVE_SECONDS", 0.05)
+    monkeypatch.setattr(settings, "SSE_IDLE_POLL_SECONDS", 0.2)
+    def finish():
+        with Session(engine) as session:
+            consultation = session.get(Consultation, consultation_id)
+            consultation.status = ConsultationStatus.COMPLETED
+            session.add(consultation)
+            session.add(SOAPNote(consultation_id=consultation_id, soap_json={"subjective": "Headache"}))
+            session.commit()
+    timer = threading.Timer(0.1, finish)
+    timer.start()
+    response = client.get(url, headers=headers(patient_id, "PATIENT"))
+    timer.join()
+    assert response.status_code == 200
+    lines = [line for line in response.text.split("\n\n") if line]
+    assert ": keepalive" in lines
+    events = [json.loads(line[len("data: "):]) for line in lines if line.startswith("data: ")]
+    assert events == [{"event": "section", "section": "subjective", "text": "Headache"}, {"event": "completed"}]
+
+def test_manual_retry_sweep_requires_staff(client, monkeypatch):
+    from app.services.retry_scheduler_service import RetrySchedulerService
+    patient_id, doctor_id, _ = seed_completed_consultation()
+    sweeps = []
+    async def fake_sweep(force=False):
+        sweeps.append(force)
+    monkeypatch.setattr(RetrySchedulerService, "sweep_once", staticmethod(fake_sweep))
+    assert client.post("/api/v1/dashboard/queue/failed/retry").status_code == 401
+    patient = {"Authorization": f"Bearer {create_access_token(subject=patient_id, role='PATIENT')}"}
+    assert client.post("/api/v1/dashboard/queue/failed/retry", headers=patient).status_code == 403
+    doctor = {"Authorization": f"Bearer {create_access_token(subject=doctor_id, role='DOCTOR')}"}
+    assert client.post("/api/v1/dashboard/queue/failed/retry", headers=doctor).status_code == 200
+    assert sweeps == [True]
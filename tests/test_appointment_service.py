@@ -0,0 +1,73 @@
+from datetime import datetime, timedelta
+from uuid import uuid4
+from sqlmodel import Session
+from app.core.db import engine
+from app.core.security import create_access_token
+from app.models.base import User, UserRole, Appointment, AppointmentStatus
+from app.services.appointment_service import AppointmentService
+from app.services.slot_service import SlotService
+
+S = AppointmentStatus
+
+def seed_appointments(*statuses, hour=9):
+    patient = User(email=f"{uuid4()}@test.com", password_hash="pw", role=UserRole.PATIENT)
+    doctor = User(email=f"{uuid4()}@test.com", password_hash="pw", role=UserRole.DOCTOR)
+    appointments = [
+        Appointment(patient_id=patient.id, doctor_id=doctor.id, scheduled_at=datetime(2030, 2, 4, hour) + timedelta(minutes=30 * i), status=status)
+        for i, status in enumerate(statuses)
+    ]
+    with Session(engine) as session:
+        session.add_all([patient, doctor, *appointments])
+        session.commit()
+        return doctor.id, [a.id for a in appointments]
+
+def test_bulk_update_validates_and_reports_per_item():
+    _, (a, b, c, d) = seed_appointments(S.SCHEDULED, S.SCHEDULED, S.COMPLETED, S.CHECKED_IN)
+    missing = uuid4()
+    with Session(engine) as session:
+        results = AppointmentService.bulk_update_status(session, [
+            (a, S.CHECKED_IN), (b, S.NO_SHOW), (c, S.CHECKED_IN), (missing, S.NO_SHOW), (d, S.CHECKED_IN), (a, S.NO_SHOW),
+        ])
+    assert [(r["ok"], r["status"]) for r in results] == [
+        (True, S.CHECKED_IN), (True, S.NO_SHOW), (False, S.COMPLETED), (False, None), (True, S.CHECKED_IN), (False, S.CHECKED_IN),
+    ]
+    assert results[3]["detail"] == "Appointment not found"
+    with Session(engine) as session:
+        assert [session.get(Appointment, id).status for id in (a, b, c)] == [S.CHECKED_IN, S.NO_SHOW, S.COMPLETED]
+
+def test_bulk_reinstate_keeps_taken_slot():
+    doctor_id, (cancelled,) = seed_appointments(S.CANCELLED, hour=11)
+    with Session(engine) as session:
+        session.add(Appointment(patient_id=doctor_id, doctor_id=doctor_id, scheduled_at=datetime(2030, 2, 4, 11, 0)))
+        session.commit()
+        results = AppointmentService.bulk_update_status(session, [(cancelled, S.SCHEDULED)])
+    assert results[0]["ok"] is False
+    assert results[0]["detail"] == "Slot already booked"
+
+def test_checking_in_a_no_show_rechecks_its_slot():
+    doctor_id, (no_show,) = seed_appointments(S.NO_SHOW, hour=13)
+    with Session(engine) as session:
+        # A no-show no longer holds its slot, so an off-grid booking may overlap it
+        assert not SlotService.has_overlap(session, doctor_id, datetime(2030, 2, 4, 13, 15), 30)
+        session.add(Appointment(patient_id=doctor_id, doctor_id=doctor_id, scheduled_at=datetime(2030, 2, 4, 13, 15)))
+        session.commit()
+        results = AppointmentService.bulk_update_status(session, [(no_show, S.CHECKED_IN)])
+    assert (results[0]["ok"], results[0]["detail"]) == (False, "Slot already booked")
+
+def test_bulk_endpoint_requires_staff(client):
+    doctor_id, (a,) = seed_appointments(S.SCHEDULED, hour=13)
+    body = {"changes": [{"id": str(a), "status": "CHECKED_IN"}]}
+
+    patient_user = User(email=f"{uuid4()}@test.com", password_hash="pw", role=UserRole.PATIENT)
+    with Session(engine) as session:
+        session.add(patient_user)
+        session.commit()
+        patient = {"Authorization": f"Bearer {create_access_token(subject=patient_user.id, role='PATIENT')}"}
+    assert client.patch("/api/v1/appointments/status", json=body, headers=patient).status_code == 403
+
+    doctor = {"Authorization": f"Bearer {create_access_token(subject=doctor_id, role='DOCTOR')}"}
+    response = client.patch("/api/v1/appointments/status", json=body, headers=doctor)
+    assert response.status_code == 200
+    assert response.json() == {"updated": 1, "results": [{"id": str(a), "ok": True, "status": "CHECKED_IN", "detail": None}]}
+    # The single-item endpoint shares the transition rules
+    assert client.patch(f"/api/v1/appointments/{a}/status", params={"new_status": "SCHEDULED"}, headers=doctor).status_code == 409
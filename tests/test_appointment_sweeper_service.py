@@ -0,0 +1,90 @@
+import asyncio
+from datetime import datetime, timedelta
+from uuid import uuid4
+import pytest
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session, SQLModel, create_engine
+from app.core.config import settings
+from app.models.base import Appointment, AppointmentStatus
+from app.services import appointment_sweeper_service
+from app.services.appointment_sweeper_service import AppointmentSweeperService
+
+NOW = datetime(2030, 3, 4, 12)
+
+class RecordingSink:
+    def __init__(self, fail=False):
+        self.batches, self.fail = [], fail
+
+    async def send(self, reminders):
+        if self.fail:
+            raise RuntimeError("gateway down")
+        self.batches.append(reminders)
+
+@pytest.fixture
+def sweep_engine(monkeypatch):
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    SQLModel.metadata.create_all(engine)
+    monkeypatch.setattr(appointment_sweeper_service, "engine", engine)
+    monkeypatch.setattr(settings, "APPOINTMENT_SWEEP_BATCH_SIZE", 2)
+    monkeypatch.setattr(settings, "NO_SHOW_GRACE_MINUTES", 30)
+    monkeypatch.setattr(settings, "REMINDER_LEAD_MINUTES", 60)
+    return engine
+
+def add(engine, minutes, status=AppointmentStatus.SCHEDULED):
+    appointment = Appointment(patient_id=uuid4(), doctor_id=uuid4(), scheduled_at=NOW + timedelta(minutes=minutes), status=status)
+    with Session(engine) as session:
+        session.add(appointment)
+        session.commit()
+        return appointment.id
+
+def statuses(engine, ids):
+    with Session(engine) as session:
+        return [session.get(Appointment, id).status for id in ids]
+
+def test_sweep_marks_no_shows_and_sends_reminders_once(sweep_engine):
+    overdue = [add(sweep_engine, -60 - i) for i in range(3)]
+    within_grace = add(sweep_engine, -10)
+    checked_in = add(sweep_engine, -90, AppointmentStatus.CHECKED_IN)
+    upcoming = [add(sweep_engine, 15 + i) for i in range(3)]
+    later = add(sweep_engine, 120)
+
+    sink = RecordingSink()
+    result = asyncio.run(AppointmentSweeperService.sweep_once(sink, now=NOW))
+    assert result == {"no_show": 3, "reminders": 3}
+    assert statuses(sweep_engine, overdue) == [AppointmentStatus.NO_SHOW] * 3
+    assert statuses(sweep_engine, [within_grace, checked_in]) == [AppointmentStatus.SCHEDULED, AppointmentStatus.CHECKED_IN]
+    # Batches of APPOINTMENT_SWEEP_BATCH_SIZE, in scheduled_at order
+    assert [[r["appointment_id"] for r in batch] for batch in sink.batches] == [[str(upcoming[0]), str(upcoming[1])], [str(upcoming[2])]]
+    assert str(later) not in str(sink.batches)
+
+    assert asyncio.run(AppointmentSweeperService.sweep_once(sink, now=NOW)) == {"no_show": 0, "reminders": 0}
+
+def test_failed_sink_releases_claimed_reminders(sweep_engine):
+    add(sweep_engine, 30)
+    with pytest.raises(RuntimeError):
+        asyncio.run(AppointmentSweeperService.send_reminders(RecordingSink(fail=True), now=NOW))
+    sink = RecordingSink()
+    assert asyncio.run(AppointmentSweeperService.send_reminders(sink, now=NOW)) == 1
+
+def test_cancelled_send_releases_claimed_reminders(sweep_engine):
+    add(sweep_engine, 30)
+    class HangingSink:
+        async def send(self, reminders):
+            await asyncio.sleep(60)
+
+    async def cancel_mid_send():
+        task = asyncio.create_task(AppointmentSweeperService.send_reminders(HangingSink(), now=NOW))
+        await asyncio.sleep(0.2)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+    asyncio.run(cancel_mid_send())
+    assert asyncio.run(AppointmentSweeperService.send_reminders(RecordingSink(), now=NOW)) == 1
+
+def test_sweep_skips_while_another_worker_holds_the_lock(sweep_engine, monkeypatch):
+    overdue = add(sweep_engine, -60)
+    monkeypatch.setattr(AppointmentSweeperService, "mark_no_shows_locked", staticmethod(lambda now=None: None))
+    sink = RecordingSink()
+    assert asyncio.run(AppointmentSweeperService.sweep_once(sink, now=NOW)) == {"no_show": 0, "reminders": 0}
+    assert statuses(sweep_engine, [overdue]) == [AppointmentStatus.SCHEDULED]
+    assert sink.batches == []
@@ -0,0 +1,88 @@
+import builtins
+from datetime import datetime, timedelta
+from uuid import uuid4
+import pytest
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session, SQLModel, create_engine, select
+from app.core.config import settings
+from app.models.base import (
+    AILog, ArchivedPayload, AudioFile, AudioUploaderType, Consultation, ConsultationStatus, SOAPNote
+)
+from app.services import archive_service
+from app.services.archive_service import ArchiveService, compress, decompress
+
+NOW = datetime(2031, 1, 1)
+
+@pytest.fixture
+def archive_engine(monkeypatch):
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    SQLModel.metadata.create_all(engine)
+    monkeypatch.setattr(archive_service, "engine", engine)
+    monkeypatch.setattr(settings, "ARCHIVE_AFTER_DAYS", 180)
+    monkeypatch.setattr(settings, "AILOG_RETENTION_DAYS", 90)
+    monkeypatch.setattr(settings, "ARCHIVE_BATCH_SIZE", 2)
+    return engine
+
+def add_consultation(engine, age_days, status=ConsultationStatus.COMPLETED):
+    created = NOW - timedelta(days=age_days)
+    consultation = Consultation(appointment_id=uuid4(), patient_id=uuid4(), doctor_id=uuid4(), status=status)
+    with Session(engine) as session:
+        session.add(consultation)
+        session.add(AudioFile(
+            consultation_id=consultation.id, uploaded_by=AudioUploaderType.DOCTOR, file_name="a.wav", file_url="/a.wav",
+            transcription="Doctor: How are you?", utterances=[{"speaker": "A", "text": "How are you?"}], uploaded_at=created,
+        ))
+        session.add(SOAPNote(consultation_id=consultation.id, soap_json={"plan": "Rest"}, created_at=created))
+        session.add_all([
+            AILog(consultation_id=consultation.id, model_version="m", status="SUCCESS", latency_ms=100.0 + i, created_at=created)
+            for i in range(3)
+        ])
+        session.commit()
+        return consultation.id
+
+def test_codecs_round_trip(monkeypatch):
+    data = b'{"transcription": "' + b"words " * 1000 + b'"}'
+    codec, blob = compress(data)
+    assert codec == "zstd" or codec == "zlib"
+    assert decompress(codec, blob) == data and len(blob) < len(data)
+
+    real_import = builtins.__import__
+    def no_zstd(name, *args, **kwargs):
+        if name == "zstandard":
+            raise ImportError(name)
+        return real_import(name, *args, **kwargs)
+    monkeypatch.setattr(builtins, "__import__", no_zstd)
+    codec, blob = compress(data)
+    assert codec == "zlib" and decompress(codec, blob) == data
+
+def test_archive_moves_old_completed_payloads_and_rehydrates(archive_engine):
+    old = [add_consultation(archive_engine, 400) for _ in range(3)]
+    recent = add_consultation(archive_engine, 10)
+    failed = add_consultation(archive_engine, 400, ConsultationStatus.FAILED)
+
+    counts = ArchiveService.archive_once(NOW)
+    # Only rows of old completed consultations; failed ones may still be retried
+    assert counts == {"transcripts": 3, "soap_notes": 3, "ai_logs": 12}
+    assert ArchiveService.archive_once(NOW) == {"transcripts": 0, "soap_notes": 0, "ai_logs": 0}
+
+    with Session(archive_engine) as session:
+        hot = session.exec(select(AudioFile).where(AudioFile.consultation_id.in_(old))).all()
+        assert all(a.transcription is None and a.utterances is None and a.archived_at == NOW for a in hot)
+        for id in (recent, failed):
+            assert session.exec(select(AudioFile).where(AudioFile.consultation_id == id)).one().archived_at is None
+        # Old AI logs left the hot table as JSONL blobs per consultation (and batch)
+        assert session.exec(select(AILog).where(AILog.created_at < NOW - timedelta(days=90))).all() == []
+        blobs = session.exec(select(ArchivedPayload).where(ArchivedPayload.kind == "ai_logs")).all()
+        assert sum(b.row_count for b in blobs) == 12 and len({b.source_id for b in blobs}) == 4
+
+        consultation = ArchiveService.rehydrate(session, session.get(Consultation, old[0]))
+        assert consultation.audio_file.transcription == "Doctor: How are you?"
+        assert consultation.audio_file.utterances == [{"speaker": "A", "text": "How are you?"}]
+        assert consultation.soap_note.soap_json == {"plan": "Rest"}
+        logs = ArchiveService.ai_logs(session, old[0])
+        assert [log.latency_ms for log in logs] == [100.0, 101.0, 102.0]
+
+        # Rehydrated values stay in memory; a commit does not un-archive them
+        session.commit()
+    with Session(archive_engine) as session:
+        assert session.get(Consultation, old[0]).audio_file.transcription is None
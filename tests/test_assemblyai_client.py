@@ -0,0 +1,81 @@
+import asyncio
+import itertools
+import pytest
+import httpx
+from fastapi import FastAPI, Request
+from app.services.assemblyai_client import AssemblyAIAsyncClient
+
+def make_fake_stt_server(polls_until_done: int = 2):
+    """
+    Local stand-in for the AssemblyAI v2 API: /upload, /transcript and polling.
+    Each transcript completes after `polls_until_done` GETs.
+    """
+    app = FastAPI()
+    app.state.jobs = {}
+    app.state.polls = 0
+    counter = itertools.count(1)
+
+    @app.post("/upload")
+    async def upload(request: Request):
+        body = await request.body()
+        return {"upload_url": f"https://fake/{len(body)}"}
+
+    @app.post("/transcript")
+    async def submit(request: Request):
+        payload = await request.json()
+        transcript_id = f"t{next(counter)}"
+        app.state.jobs[transcript_id] = {"payload": payload, "polls": 0}
+        return {"id": transcript_id, "status": "queued"}
+
+    @app.get("/transcript/{transcript_id}")
+    async def get_transcript(transcript_id: str):
+        app.state.polls += 1
+        job = app.state.jobs[transcript_id]
+        job["polls"] += 1
+        if job["polls"] < polls_until_done:
+            return {"id": transcript_id, "status": "processing"}
+        return {
+            "id": transcript_id,
+            "status": "completed",
+            "text": f"Transcript for {job['payload']['audio_url']}",
+            "confidence": 0.9,
+            "utterances": [{"speaker": "A", "text": "Hello", "start": 0, "end": 500}],
+        }
+
+    return app
+
+@pytest.mark.asyncio
+async def test_concurrent_transcriptions_share_one_poller(tmp_path):
+    fake = make_fake_stt_server(polls_until_done=2)
+    client = AssemblyAIAsyncClient("key", "http://fake-stt", poll_interval=0.01, transport=httpx.ASGITransport(app=fake))
+
+    files = []
+    for i in range(20):
+        path = tmp_path / f"audio_{i}.wav"
+        path.write_bytes(b"x" * (i + 1))
+        files.append(str(path))
+
+    results = await asyncio.gather(*(client.transcribe(f, {"speaker_labels": True}) for f in files))
+
+    assert [r["status"] for r in results] == ["completed"] * 20
+    assert results[4]["text"] == "Transcript for https://fake/5"
+    assert client.poller.pending_count == 0
+    # Every job submitted with the config and polled by the single loop (2 polls each)
+    assert all(job["payload"]["speaker_labels"] for job in fake.state.jobs.values())
+    assert fake.state.polls == 40
+    await client.aclose()
+
+@pytest.mark.asyncio
+async def test_webhook_resolves_waiter_without_polling():
+    fake = make_fake_stt_server(polls_until_done=1)
+    client = AssemblyAIAsyncClient("key", "http://fake-stt", poll_interval=60, transport=httpx.ASGITransport(app=fake))
+
+    transcript_id = await client.submit("https://fake/audio", {})
+    waiter = asyncio.create_task(client.wait_for_transcript(transcript_id))
+    await asyncio.sleep(0)
+
+    assert await client.handle_webhook(transcript_id) is True
+    result = await asyncio.wait_for(waiter, timeout=1)
+    assert result["status"] == "completed"
+    assert await client.handle_webhook("unknown") is False
+    await client.aclose()
@@ -0,0 +1,78 @@
+import wave
+import numpy as np
+from app.services.audio_preprocessing_service import AudioPreprocessingService, TARGET_SAMPLE_RATE
+
+def write_test_wav(path, rate=44100, channels=2):
+    """
+    1s tone, 5s near-silence, 1s tone (stereo, 44.1kHz) - the shape of the
+    long empty intervals seen in the consultation TextGrids.
+    """
+    t = np.arange(rate) / rate
+    tone = (8000 * np.sin(2 * np.pi * 440 * t)).astype(np.int16)
+    silence = (np.random.default_rng(0).normal(0, 5, rate * 5)).astype(np.int16)
+    mono = np.concatenate([tone, silence, tone])
+    interleaved = np.repeat(mono, channels)
+    with wave.open(str(path), "wb") as wf:
+        wf.setnchannels(channels)
+        wf.setsampwidth(2)
+        wf.setframerate(rate)
+        wf.writeframes(interleaved.tobytes())
+
+def test_decode_downmixes_and_resamples(tmp_path):
+    path = tmp_path / "stereo.wav"
+    write_test_wav(path)
+    samples = AudioPreprocessingService.decode(str(path))
+    assert samples.dtype == np.int16
+    assert abs(len(samples) - 7 * TARGET_SAMPLE_RATE) <= 1
+
+def test_silence_is_compacted_and_times_map_back(tmp_path):
+    path = tmp_path / "stereo.wav"
+    write_test_wav(path)
+    result = AudioPreprocessingService.preprocess(str(path))
+
+    assert len(result["chunks"]) == 1
+    offsets = result["offsets"]
+    assert len(offsets) == 2
+    # 2s of tone + hangover padding + one kept pause, down from 7s
+    assert result["processed_seconds"] < 3.0 < result["original_seconds"]
+    assert result["processed_bytes"] < result["original_bytes"]
+
+    # A word at the start of the second tone in the processed file lands ~6s into the original
+    second_proc_start, second_orig_start, _ = offsets[1]
+    assert abs(second_orig_start - 6000) <= 250
+    utterances = [{"speaker": "A", "text": "hi", "start": second_proc_start + 100, "end": second_proc_start + 500}]
+    AudioPreprocessingService.remap_utterances(utterances, offsets)
+    assert utterances[0]["start"] == second_orig_start + 100
+    assert utterances[0]["end"] == second_orig_start + 500
+
+def test_continuous_speech_is_kept_whole():
+    t = np.arange(TARGET_SAMPLE_RATE * 3) / TARGET_SAMPLE_RATE
+    tone = (8000 * np.sin(2 * np.pi * 300 * t)).astype(np.int16)
+    regions = AudioPreprocessingService.detect_speech(tone)
+    assert regions == [(0, len(tone))]
+
+def test_long_audio_is_chunked_at_pauses():
+    rate = TARGET_SAMPLE_RATE
+    t = np.arange(rate * 9) / rate
+    speech = (8000 * np.sin(2 * np.pi * 300 * t)).astype(np.int16)
+    pause = np.zeros(rate // 2, dtype=np.int16)
+    # 9s speech | 0.5s pause | 9s speech | 0.5s pause | 9s speech
+    samples = np.concatenate([speech, pause, speech, pause, speech])
+
+    plan = AudioPreprocessingService.plan_chunks(samples, chunk_ms=10000, overlap_ms=1000)
+    assert len(plan) == 3
+    assert plan[0]["own_start"] == 0 and plan[-1]["own_end"] == len(samples)
+    # Cuts land in the middle of the pauses (9.25s and 18.75s)
+    for chunk, pause_center in zip(plan[1:], (9.25, 18.75)):
+        assert abs(chunk["own_start"] / rate - pause_center) < 0.1
+    for prev, nxt in zip(plan, plan[1:]):
+        # Owned ranges tile the audio; the chunk audio overlaps by 1s either side
+        assert prev["own_end"] == nxt["own_start"]
+        assert nxt["start"] == nxt["own_start"] - rate
+        assert prev["end"] == prev["own_end"] + rate
+
+def test_short_audio_is_a_single_chunk():
+    samples = np.zeros(TARGET_SAMPLE_RATE * 5, dtype=np.int16)
+    assert AudioPreprocessingService.plan_chunks(samples, chunk_ms=10000, overlap_ms=1000) == [
+        {"start": 0, "end": len(samples), "own_start": 0, "own_end": len(samples)}
+    ]
@@ -0,0 +1,11 @@
+from calculate_accuracy import simple_wer, normalize_text
+
+def test_simple_wer_counts_substitutions_insertions_and_deletions():
+    assert simple_wer("the patient has a headache", "the patient has a headache") == 0.0
+    assert simple_wer("the patient has a headache", "the patient had headache") == 2 / 5
+    assert simple_wer("take one tablet", "take one tablet daily now") == 2 / 3
+    assert simple_wer("a b c", "") == 1.0
+    assert simple_wer("", "anything") == 0.0
+
+def test_normalize_text_splits_on_punctuation():
+    assert normalize_text("Day-to-day,  OK?") == "day to day ok"
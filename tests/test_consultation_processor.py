@@ -0,0 +1,155 @@
+from datetime import datetime
+from unittest.mock import AsyncMock, patch
+from uuid import uuid4
+import pytest
+from sqlmodel import Session, SQLModel, create_engine, select
+from app.models.base import (
+    User, UserRole, Appointment, Consultation, ConsultationStatus, ProcessingStage, AudioFile, SOAPNote,
+    AILog, PipelineSpan
+)
+from app.services.llm_service import get_llm_model_version
+from app.services import consultation_processor
+from app.services.consultation_processor import process_consultation_flow, claim_consultation
+
+SOAP_RESULT = {
+    "soap_note": {"subjective": "Headache", "objective": "None", "assessment": "Migraine", "plan": "Rest"},
+    "risk_flags": [],
+}
+
+@pytest.fixture
+def engine(monkeypatch):
+    engine = create_engine("sqlite://")
+    SQLModel.metadata.create_all(engine)
+    monkeypatch.setattr(consultation_processor, "engine", engine)
+    return engine
+
+def create_consultation(engine):
+    patient = User(email=f"{uuid4()}@test.com", password_hash="pw", role=UserRole.PATIENT)
+    doctor = User(email=f"{uuid4()}@test.com", password_hash="pw", role=UserRole.DOCTOR)
+    with Session(engine) as session:
+        session.add(patient)
+        session.add(doctor)
+        appt = Appointment(patient_id=patient.id, doctor_id=doctor.id, scheduled_at=datetime(2023, 1, 1, 10))
+        session.add(appt)
+        consultation = Consultation(appointment_id=appt.id, patient_id=patient.id, doctor_id=doctor.id)
+        session.add(consultation)
+        session.add(AudioFile(
+            consultation_id=consultation.id, uploaded_by="DOCTOR",
+            file_name="test.wav", file_url="/tmp/missing.wav"
+        ))
+        session.commit()
+        return consultation.id
+
+@pytest.mark.asyncio
+async def test_retry_resumes_after_transcription(engine):
+    consultation_id = create_consultation(engine)
+    transcribe = AsyncMock(return_value={
+        "text": "Patient has a headache.",
+        "utterances": [{"speaker": "A", "text": "Patient has a headache.", "start": 0, "end": 900}],
+        "confidence": 0.9,
+    })
+    generate = AsyncMock(side_effect=[Exception("429 Resource exhausted"), SOAP_RESULT])
+
+    with patch.object(consultation_processor, "get_stt_service") as stt, \
+         patch.object(consultation_processor, "get_llm_service") as llm:
+        stt.return_value.transcribe_audio_async = transcribe
+        llm.return_value.generate_soap_note_async = generate
+
+        await process_consultation_flow(consultation_id)
+        with Session(engine) as session:
+            consultation = session.get(Consultation, consultation_id)
+            assert consultation.status == ConsultationStatus.FAILED
+            assert consultation.requires_manual_review
+            assert consultation.processing_stage == ProcessingStage.TRANSCRIBED
+            assert consultation.processing_started_at is None
+
+        await process_consultation_flow(consultation_id)
+        # Re-running a finished consultation is a no-op
+        await process_consultation_flow(consultation_id)
+
+    assert transcribe.await_count == 1
+    assert generate.await_count == 2
+    # The retry is fed the stored utterances, not a fresh transcription
+    assert generate.await_args.args[1][0]["text"] == "Patient has a headache."
+
+    with Session(engine) as session:
+        consultation = session.get(Consultation, consultation_id)
+        assert consultation.status == ConsultationStatus.COMPLETED
+        assert not consultation.requires_manual_review
+        assert consultation.processing_stage == ProcessingStage.TRIAGED
+        notes = session.exec(select(SOAPNote).where(SOAPNote.consultation_id == consultation_id)).all()
+        assert len(notes) == 1
+        assert notes[0].soap_json["assessment"] == "Migraine"
+        assert notes[0].confidence == 0.9
+
+        # Every run's spans are persisted; transcription ran once, the LLM twice
+        spans = session.exec(select(PipelineSpan).where(PipelineSpan.consultation_id == consultation_id)).all()
+        by_stage = {}
+        for span in spans:
+            by_stage.setdefault(span.stage, []).append(span.status)
+        assert by_stage["stt"] == ["SUCCESS"]
+        assert sorted(by_stage["llm"]) == ["FAIL", "SUCCESS"]
+        assert by_stage["commit"] == ["SUCCESS", "SUCCESS"]
+
+        logs = session.exec(select(AILog).where(AILog.consultation_id == consultation_id)).all()
+        assert {log.model_version for log in logs} == {get_llm_model_version()}
+
+def test_double_trigger_is_rejected_while_lease_is_held(engine):
+    consultation_id = create_consultation(engine)
+    with Session(engine) as session:
+        assert claim_consultation(session, consultation_id)
+        assert not claim_consultation(session, consultation_id)
+
+@pytest.mark.asyncio
+async def test_failed_run_drops_partially_streamed_soap_note(engine):
+    consultation_id = create_consultation(engine)
+    transcribe = AsyncMock(return_value={"text": "Patient has a headache.", "utterances": [], "confidence": 0.9})
+
+    async def stream_then_fail(transcript, utterances, context, on_section=None):
+        await on_section("subjective", "Headache")
+        raise Exception("connection reset")
+
+    with patch.object(consultation_processor, "get_stt_service") as stt, \
+         patch.object(consultation_processor, "get_llm_service") as llm:
+        stt.return_value.transcribe_audio_async = transcribe
+        llm.return_value.generate_soap_note_async = stream_then_fail
+        await process_consultation_flow(consultation_id)
+
+    with Session(engine) as session:
+        assert session.get(Consultation, consultation_id).status == ConsultationStatus.FAILED
+        assert session.exec(select(SOAPNote).where(SOAPNote.consultation_id == consultation_id)).all() == []
+
+@pytest.mark.asyncio
+async def test_missing_audio_marks_consultation_failed(engine):
+    consultation_id = create_consultation(engine)
+    with Session(engine) as session:
+        session.delete(session.exec(select(AudioFile).where(AudioFile.consultation_id == consultation_id)).one())
+        session.commit()
+
+    await process_consultation_flow(consultation_id)
+
+    with Session(engine) as session:
+        consultation = session.get(Consultation, consultation_id)
+        assert consultation.status == ConsultationStatus.FAILED
+        assert consultation.requires_manual_review
+        assert consultation.processing_error == "Audio file missing"
+        assert consultation.processing_started_at is None
+
+@pytest.mark.asyncio
+async def test_failed_checkpoint_write_is_rolled_back_before_recording_failure(engine):
+    consultation_id = create_consultation(engine)
+    # Utterances that cannot be serialized make the transcription checkpoint's flush fail
+    transcribe = AsyncMock(return_value={"text": "Patient has a headache.", "utterances": [object()], "confidence": 0.9})
+
+    with patch.object(consultation_processor, "get_stt_service") as stt:
+        stt.return_value.transcribe_audio_async = transcribe
+        await process_consultation_flow(consultation_id)
+
+    with Session(engine) as session:
+        consultation = session.get(Consultation, consultation_id)
+        assert consultation.status == ConsultationStatus.FAILED
+        assert consultation.processing_stage == ProcessingStage.PENDING
+        assert "not JSON serializable" in consultation.processing_error
+        assert consultation.processing_started_at is None
+        audio_file = session.exec(select(AudioFile).where(AudioFile.consultation_id == consultation_id)).one()
+        assert audio_file.transcription is None
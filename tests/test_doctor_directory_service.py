@@ -0,0 +1,73 @@
+from uuid import uuid4
+from sqlmodel import Session
+from app.core.db import engine
+from app.models.base import User, UserRole, DoctorProfile
+from app.services.doctor_directory_service import DoctorDirectoryService
+
+def add_doctor(last_name):
+    doctor = User(email=f"{uuid4()}@test.com", password_hash="pw", role=UserRole.DOCTOR)
+    with Session(engine) as session:
+        session.add(doctor)
+        session.add(DoctorProfile(user_id=doctor.id, first_name="Dir", last_name=last_name))
+        session.commit()
+
+def test_build_runs_once_per_version():
+    DoctorDirectoryService.invalidate()
+    calls = []
+    def build():
+        calls.append(1)
+        return b"[]"
+
+    first = DoctorDirectoryService.get("test", build)
+    second = DoctorDirectoryService.get("test", build)
+    assert first is second
+    assert len(calls) == 1
+
+    DoctorDirectoryService.invalidate()
+    third = DoctorDirectoryService.get("test", build)
+    assert len(calls) == 2
+    # Same body: the validators survive the rebuild
+    assert (third["etag"], third["last_modified"]) == (first["etag"], first["last_modified"])
+
+def test_directory_conditional_requests_and_invalidation(client):
+    add_doctor("Before")
+    response = client.get("/api/v1/doctors/")
+    assert response.status_code == 200
+    etag = response.headers["etag"]
+    assert response.headers["cache-control"] == "public, no-cache"
+    assert any(d["last_name"] == "Before" for d in response.json())
+
+    not_modified = client.get("/api/v1/doctors/", headers={"If-None-Match": etag})
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+    assert client.get("/api/v1/doctors/", headers={"If-Modified-Since": response.headers["last-modified"]}).status_code == 304
+
+    # A new doctor profile invalidates both directory payloads
+    add_doctor("After")
+    refreshed = client.get("/api/v1/doctors/", headers={"If-None-Match": etag})
+    assert refreshed.status_code == 200
+    assert refreshed.headers["etag"] != etag
+    assert any(d["last_name"] == "After" for d in refreshed.json())
+    assert any(d["last_name"] == "After" for d in client.get("/api/v1/users/doctors").json())
+
+def test_invalidates_on_commit_not_flush():
+    DoctorDirectoryService.get("test", lambda: b"[]")
+    version = DoctorDirectoryService._version
+    doctor = User(email=f"{uuid4()}@test.com", password_hash="pw", role=UserRole.DOCTOR)
+    with Session(engine) as session:
+        session.add(doctor)
+        session.add(DoctorProfile(user_id=doctor.id, first_name="Dir", last_name="Rolled"))
+        session.flush()
+        # Not visible to other connections yet: rebuilding now would cache the old directory
+        assert DoctorDirectoryService._version == version
+        session.rollback()
+    assert DoctorDirectoryService._version == version
+
+    patient = User(email=f"{uuid4()}@test.com", password_hash="pw", role=UserRole.PATIENT)
+    with Session(engine) as session:
+        session.add(patient)
+        session.commit()
+    assert DoctorDirectoryService._version == version
+
+    add_doctor("Committed")
+    assert DoctorDirectoryService._version == version + 1
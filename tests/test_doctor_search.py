@@ -0,0 +1,55 @@
+from uuid import uuid4
+from sqlmodel import Session
+from app.core.db import engine
+from app.models.base import User, UserRole, DoctorProfile
+
+CITY = f"Search-{uuid4().hex[:8]}"
+
+def add_doctor(first_name, last_name, specialization="Neurology", fee=500.0, available=True):
+    doctor = User(email=f"{uuid4()}@test.com", password_hash="pw", role=UserRole.DOCTOR)
+    with Session(engine) as session:
+        session.add(doctor)
+        session.add(DoctorProfile(
+            user_id=doctor.id, first_name=first_name, last_name=last_name, specialization=specialization,
+            city=CITY, consultation_fee=fee, is_available=available
+        ))
+        session.commit()
+
+def search(client, **params):
+    response = client.get("/api/v1/doctors/search", params={"city": CITY, **params})
+    assert response.status_code == 200
+    return response.json()
+
+def test_search_filters_and_name_prefix(client):
+    add_doctor("Johanna", "Smithers", fee=300.0)
+    add_doctor("John", "Doe", specialization="Cardiology", fee=800.0)
+    add_doctor("Mary", "Johnson", available=False)
+
+    names = lambda page: [d["last_name"] for d in page["items"]]
+    assert names(search(client)) == ["Doe", "Johnson", "Smithers"]
+    assert names(search(client, q="joh")) == ["Doe", "Johnson", "Smithers"]
+    assert names(search(client, q="jo smi")) == ["Smithers"]
+    assert names(search(client, q="ohn")) == []
+    assert names(search(client, specialization="Cardiology")) == ["Doe"]
+    assert names(search(client, available=True)) == ["Doe", "Smithers"]
+    assert names(search(client, min_fee=400, max_fee=600)) == ["Johnson"]
+
+    item = search(client, q="Doe")["items"][0]
+    assert item["city"] == CITY and item["consultation_fee"] == 800.0
+
+def test_search_keyset_pagination(client):
+    for i in range(5):
+        add_doctor(f"Page{i}", "Paged", specialization="Pagination")
+
+    seen, cursor = [], None
+    while True:
+        page = search(client, specialization="Pagination", limit=2, **({"cursor": cursor} if cursor else {}))
+        seen += [d["first_name"] for d in page["items"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == [f"Page{i}" for i in range(5)]
+
+def test_search_rejects_bad_cursor(client):
+    response = client.get("/api/v1/doctors/search", params={"cursor": "not-a-cursor"})
+    assert response.status_code == 400
@@ -0,0 +1,15 @@
+import os
+import subprocess
+import sys
+
+def test_api_and_pipeline_imports_do_not_load_provider_sdks():
+    # A fresh interpreter: this test session may already have imported the SDKs
+    code = (
+        "import sys, app.main, app.services.consultation_processor;"
+        "print(','.join(sorted(m for m in sys.modules if m.startswith(('google.generativeai', 'grpc')))))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-W", "ignore", "-c", code],
+        env=dict(os.environ), capture_output=True, text=True, check=True,
+    )
+    assert result.stdout.strip() == ""
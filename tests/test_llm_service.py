@@ -0,0 +1,40 @@
+import asyncio
+from app.services.llm_service import GeminiService, SOAP_GENERATION_CONFIG
+
+def test_model_client_is_reused():
+    """
+    The same (model, generation_config) pair must return one long-lived client.
+    """
+    first = GeminiService.get_model("gemini-2.5-flash", SOAP_GENERATION_CONFIG)
+    second = GeminiService.get_model("gemini-2.5-flash", {"response_mime_type": "application/json"})
+    other = GeminiService.get_model("gemini-2.5-flash", None)
+
+    assert first is second
+    assert first is not other
+
+def test_stream_callback_errors_do_not_fail_the_call(monkeypatch):
+    response = '{"soap_note": {"subjective": "Headache", "plan": "Rest"}, "risk_flags": []}'
+
+    async def fake_call(prompt, generation_config=None, on_text=None):
+        for i in range(0, len(response), 10):
+            await on_text(response[i:i + 10])
+        return response
+    monkeypatch.setattr(GeminiService, "_call_model_async", staticmethod(fake_call))
+
+    sections = []
+    async def on_section(section, text):
+        sections.append(section)
+        raise RuntimeError("subscriber went away")
+
+    result = asyncio.run(GeminiService._generate_soap_json_async("prompt", on_section))
+    assert result["soap_note"]["plan"] == "Rest"
+    # Streaming stopped at the first error; the full response still came back
+    assert sections == ["subjective"]
+
+def test_model_clients_are_not_shared_across_event_loops():
+    async def get_twice():
+        first = GeminiService.get_model("gemini-2.5-flash", SOAP_GENERATION_CONFIG)
+        assert GeminiService.get_model("gemini-2.5-flash", SOAP_GENERATION_CONFIG) is first
+        return first
+
+    assert asyncio.run(get_twice()) is not asyncio.run(get_twice())
@@ -0,0 +1,24 @@
+from app.core.metrics import observe_stage
+
+def sample(body, line_prefix):
+    for line in body.splitlines():
+        if line.startswith(line_prefix):
+            return float(line.rsplit(" ", 1)[1])
+    return 0.0
+
+def test_metrics_endpoint_reports_route_templates(client):
+    count = 'http_request_duration_seconds_count{method="GET",route="/api/v1/auth/check-email"}'
+    before = sample(client.get("/metrics").text, count)
+
+    client.get("/api/v1/auth/check-email", params={"email": "nobody@example.com"})
+    client.get("/no-such-route")
+
+    body = client.get("/metrics").text
+    assert sample(body, count) == before + 1
+    assert sample(body, 'http_requests_total{method="ANY",route="unmatched",status="4xx"}') >= 1
+    assert 'consultation_queue_depth{queue="manual_review"}' in body
+
+def test_stage_durations_are_exported(client):
+    observe_stage("llm", "SUCCESS", 1500)
+    body = client.get("/metrics").text
+    assert sample(body, 'pipeline_stage_duration_seconds_count{stage="llm",status="SUCCESS"}') >= 1
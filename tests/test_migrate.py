@@ -0,0 +1,67 @@
+from datetime import datetime, time
+from uuid import uuid4
+from sqlalchemy import create_engine, inspect, text
+from sqlmodel import Session, SQLModel, select
+from app.core.migrate import NEW_COLUMNS, NEW_INDEXES, migrate
+from app.models.base import Appointment, AppointmentStatus, DoctorProfile, User, UserRole
+
+def legacy_engine(tmp_path):
+    """A database shaped like the original schema: current tables minus the newer columns and indexes."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    SQLModel.metadata.create_all(engine)
+    with engine.begin() as connection:
+        for names in NEW_INDEXES.values():
+            for name in names:
+                connection.execute(text(f"DROP INDEX IF EXISTS {name}"))
+        for table_name, columns in NEW_COLUMNS.items():
+            for name in columns:
+                connection.execute(text(f"ALTER TABLE {table_name} DROP COLUMN {name}"))
+        for trigger in ("insert", "update", "delete"):
+            connection.execute(text(f"DROP TRIGGER doctor_profiles_fts_{trigger}"))
+        connection.execute(text("DROP TABLE doctor_profiles_fts"))
+        connection.execute(text("DROP TABLE archived_payloads"))
+    return engine
+
+def test_migrate_upgrades_legacy_schema_once(tmp_path):
+    engine = legacy_engine(tmp_path)
+    patient_id, doctor_id = uuid4(), uuid4()
+    with engine.begin() as connection:
+        for user_id, role in ((patient_id, "PATIENT"), (doctor_id, "DOCTOR")):
+            connection.execute(
+                text("INSERT INTO users (id, email, password_hash, role, created_at, updated_at) VALUES (:id, :email, 'pw', :role, :now, :now)"),
+                {"id": user_id.hex, "email": f"{user_id}@test.com", "role": role, "now": datetime(2030, 1, 1)},
+            )
+        connection.execute(
+            text("INSERT INTO doctor_profiles (id, user_id, first_name, last_name, is_available, created_at, updated_at) "
+                 "VALUES (:id, :user_id, 'Legacy', 'Doc', 1, :now, :now)"),
+            {"id": uuid4().hex, "user_id": doctor_id.hex, "now": datetime(2030, 1, 1)},
+        )
+        # Two live bookings of the same slot, one overlapping off-grid booking, one completed duplicate
+        for minute, status, created in ((0, "SCHEDULED", 1), (0, "SCHEDULED", 2), (15, "CHECKED_IN", 3), (0, "COMPLETED", 4)):
+            connection.execute(
+                text("INSERT INTO appointments (id, patient_id, doctor_id, scheduled_at, status, created_at, updated_at) "
+                     "VALUES (:id, :patient_id, :doctor_id, :at, :status, :created, :created)"),
+                {"id": uuid4().hex, "patient_id": patient_id.hex, "doctor_id": doctor_id.hex,
+                 "at": datetime(2030, 1, 7, 9, minute), "status": status, "created": datetime(2030, 1, 1, 0, created)},
+            )
+
+    planned = migrate(engine, dry_run=True)
+    assert "CREATE TABLE archived_payloads" in planned
+    assert "ALTER TABLE appointments ADD COLUMN duration_minutes INTEGER DEFAULT 30 NOT NULL" in planned
+    assert sum(action.startswith("Cancel double-booked") for action in planned) == 2
+    assert "duration_minutes" not in {c["name"] for c in inspect(engine).get_columns("appointments")}
+
+    actions = migrate(engine)
+    assert actions[:len(planned)] == planned
+    assert "uq_appointments_doctor_slot" in {i["name"] for i in inspect(engine).get_indexes("appointments")}
+    with Session(engine) as session:
+        appointments = session.exec(select(Appointment).order_by(Appointment.created_at)).all()
+        assert [a.status for a in appointments] == [
+            AppointmentStatus.SCHEDULED, AppointmentStatus.CANCELLED, AppointmentStatus.CANCELLED, AppointmentStatus.COMPLETED,
+        ]
+        assert "schema migration" in appointments[1].notes
+        profile = session.exec(select(DoctorProfile)).one()
+        assert (profile.work_start, profile.slot_minutes, profile.working_days) == (time(9, 0), 30, [0, 1, 2, 3, 4])
+        assert session.execute(text("SELECT profile_id FROM doctor_profiles_fts WHERE doctor_profiles_fts MATCH 'legacy'")).all()
+
+    assert migrate(engine) == []
@@ -0,0 +1,48 @@
+from app.services.prompt_service import PromptService
+
+UTTERANCES = [
+    {"speaker": "A", "text": "Um, good morning. Uh, what brings you in today?"},
+    {"speaker": "B", "text": "I I have, um, a headache."},
+    {"speaker": "B", "text": "Uh, since yesterday."},
+    {"speaker": "A", "text": "Hmm. Any nausea?"},
+]
+
+def test_compaction_drops_fillers_and_merges_turns():
+    compact = PromptService.compact_utterances(UTTERANCES)
+    assert [u["speaker"] for u in compact] == ["A", "B", "A"]
+    assert compact[1]["text"] == "I have, a headache. since yesterday."
+    assert "um" not in compact[0]["text"].lower().split()
+
+def test_prompt_stats_report_tokens_saved():
+    build = PromptService.build_soap_prompt("", UTTERANCES, {"first_name": "Jane", "last_name": "Doe"})
+    stats = build["stats"]
+    assert build["prompt"] is not None
+    assert "Speaker B: I have, a headache. since yesterday." in build["prompt"]
+    assert stats["tokens_saved"] > 0
+    assert stats["compact_transcript_tokens"] < stats["raw_transcript_tokens"]
+    assert stats["chunks"] == 1
+
+def test_long_transcript_is_chunked_for_map_reduce():
+    utterances = [{"speaker": "A" if i % 2 else "B", "text": f"Line {i} about symptoms and history."} for i in range(200)]
+    build = PromptService.build_soap_prompt("", utterances, None, token_budget=200)
+    assert build["prompt"] is None
+    assert build["stats"]["chunks"] == len(build["chunks"]) > 1
+    assert "Transcript part 1 of" in build["chunks"][0]
+    # Every line lands in exactly one chunk, in order
+    joined = "\n".join(build["chunks"])
+    assert joined.index("Line 0 ") < joined.index("Line 199 ")
+
+def test_compaction_keeps_units_abbreviations_and_grammatical_doubles():
+    utterances = [
+        {"speaker": "A", "text": "Um, found a 5 mm lesion and a 2 cm nodule, uh, on the scan."},
+        {"speaker": "B", "text": "I I went to the ER last night. He had had chest pain. Took 500 mg."},
+        {"speaker": "A", "text": "Hmm. Deposits of 5 um. I know that that hurts. Mm, mhm."},
+    ]
+    prompt = PromptService.build_soap_prompt("", utterances, None)["prompt"]
+    assert "Speaker A: found a 5 mm lesion and a 2 cm nodule, on the scan." in prompt
+    assert "Speaker B: I went to the ER last night. He had had chest pain. Took 500 mg." in prompt
+    assert "Deposits of 5 um. I know that that hurts. Mm, mhm." in prompt
+    assert "Hmm" not in prompt
+
+    plain = PromptService.build_soap_prompt("Um, went to the ER. Er, measured 3 mm.", None, None)["prompt"]
+    assert "went to the ER. Er, measured 3 mm." in plain
@@ -0,0 +1,61 @@
+import pytest
+from app.services.rate_limit_service import TokenBucket, CircuitBreaker, ProviderLimiter, CircuitOpenError
+
+def test_token_bucket_wait_time():
+    """
+    An empty bucket reports how long until enough tokens have refilled.
+    """
+    bucket = TokenBucket(rate_per_minute=60)  # 1 token/second, capacity 60
+    now = bucket.updated_at
+    assert bucket.time_until_available(60, now) == 0
+    bucket.consume(60)
+    assert bucket.time_until_available(2, now) == pytest.approx(2.0)
+    assert bucket.time_until_available(2, now + 2) == 0
+
+def test_circuit_breaker_opens_and_half_opens():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0)
+    breaker.record_failure()
+    breaker.before_call("test")  # still closed
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+
+    # reset_timeout elapsed: one trial call allowed, concurrent calls rejected
+    breaker.before_call("test")
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call("test")
+
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+def test_circuit_breaker_reopens_after_abandoned_trial(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr("app.services.rate_limit_service.time.monotonic", lambda: clock[0])
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, trial_timeout=30)
+    breaker.record_failure()
+    clock[0] += 10
+    breaker.before_call("test")  # the trial call, which gets cancelled and never reports back
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+
+    clock[0] += 30
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call("test")
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.retry_after() == 10
+    clock[0] += 10
+    breaker.before_call("test")  # a fresh trial
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+
+@pytest.mark.asyncio
+async def test_limiter_fails_fast_when_open():
+    limiter = ProviderLimiter("test", requests_per_minute=600, failure_threshold=1, reset_timeout=60)
+    waited = await limiter.acquire()
+    assert waited == 0
+    limiter.record_failure()
+
+    with pytest.raises(CircuitOpenError):
+        await limiter.acquire()
+    stats = limiter.stats()
+    assert stats["acquisitions"] == 1
+    assert stats["rejections"] == 1
+    assert stats["circuit_state"] == CircuitBreaker.OPEN
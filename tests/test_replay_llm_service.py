@@ -0,0 +1,33 @@
+import pytest
+from app.core.config import settings
+from app.services.llm_service import get_llm_service
+from app.services.replay_llm_service import FixtureReplayService
+
+@pytest.fixture
+def replay_settings(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_PROVIDER", "replay")
+    monkeypatch.setattr(settings, "LLM_REPLAY_LATENCY_MS", 0.0)
+    monkeypatch.setattr(settings, "LLM_REPLAY_JITTER_MS", 0.0)
+    monkeypatch.setattr(settings, "LLM_REPLAY_ERROR_RATE", 0.0)
+
+@pytest.mark.asyncio
+async def test_replay_is_deterministic_and_streams_sections(replay_settings, mock_soap_cases):
+    assert get_llm_service() is FixtureReplayService
+
+    sections = []
+    async def on_section(section, text):
+        sections.append(section)
+
+    first = await FixtureReplayService.generate_soap_note_async("Patient reports chest pain.", on_section=on_section)
+    second = await FixtureReplayService.generate_soap_note_async("Patient reports chest pain.")
+
+    assert first["soap_note"] == second["soap_note"]
+    assert first["soap_note"] in [case["soap_note"] for case in mock_soap_cases]
+    assert sections == ["subjective", "objective", "assessment", "plan"]
+    assert "prompt_stats" in first
+
+@pytest.mark.asyncio
+async def test_replay_error_injection(replay_settings, monkeypatch):
+    monkeypatch.setattr(settings, "LLM_REPLAY_ERROR_RATE", 1.0)
+    with pytest.raises(Exception, match="429"):
+        await FixtureReplayService.generate_soap_note_async("Any transcript")
@@ -0,0 +1,30 @@
+import pytest
+from app.core.config import settings
+from app.services.stt_service import get_stt_service
+from app.services.replay_stt_service import ReplaySTTService
+
+@pytest.fixture
+def replay_settings(monkeypatch):
+    monkeypatch.setattr(settings, "STT_PROVIDER", "replay")
+    monkeypatch.setattr(settings, "STT_REPLAY_LATENCY_MS", 0.0)
+    monkeypatch.setattr(settings, "STT_REPLAY_JITTER_MS", 0.0)
+    monkeypatch.setattr(settings, "STT_REPLAY_ERROR_RATE", 0.0)
+
+@pytest.mark.asyncio
+async def test_replay_transcript_is_deterministic(replay_settings):
+    assert get_stt_service() is ReplaySTTService
+
+    first = await ReplaySTTService.transcribe_audio_async("uploads/visit-1.wav")
+    second = await ReplaySTTService.transcribe_audio_async("/elsewhere/visit-1.wav")
+
+    assert first == second
+    assert {u["speaker"] for u in first["utterances"]} == {"A", "B"}
+    starts = [u["start"] for u in first["utterances"]]
+    assert starts == sorted(starts)
+    assert first["text"].startswith("What brings you in today?")
+
+@pytest.mark.asyncio
+async def test_replay_error_injection(replay_settings, monkeypatch):
+    monkeypatch.setattr(settings, "STT_REPLAY_ERROR_RATE", 1.0)
+    with pytest.raises(Exception, match="Transcription failed"):
+        await ReplaySTTService.transcribe_audio_async("uploads/visit-1.wav")
@@ -0,0 +1,89 @@
+from datetime import datetime, timedelta
+from uuid import uuid4
+import pytest
+from sqlalchemy import event
+from sqlmodel import Session, SQLModel, create_engine
+from app.core.config import settings
+from app.models.base import Consultation, ConsultationStatus
+from app.services.retry_scheduler_service import RetrySchedulerService
+
+def test_backoff_doubles_and_is_capped(monkeypatch):
+    monkeypatch.setattr(settings, "RETRY_BACKOFF_BASE_SECONDS", 60)
+    monkeypatch.setattr(settings, "RETRY_BACKOFF_MAX_SECONDS", 300)
+    assert [RetrySchedulerService.backoff_seconds(n) for n in range(5)] == [60, 120, 240, 300, 300]
+
+def test_off_peak_window_wraps_midnight(monkeypatch):
+    monkeypatch.setattr(settings, "RETRY_OFF_PEAK_START_HOUR", 19)
+    monkeypatch.setattr(settings, "RETRY_OFF_PEAK_END_HOUR", 7)
+    at = lambda hour: datetime(2024, 1, 1, hour)
+    assert RetrySchedulerService.is_off_peak(at(23))
+    assert RetrySchedulerService.is_off_peak(at(3))
+    assert not RetrySchedulerService.is_off_peak(at(7))
+    assert not RetrySchedulerService.is_off_peak(at(12))
+
+def test_claim_due_respects_backoff_and_attempt_limit(monkeypatch):
+    monkeypatch.setattr(settings, "RETRY_MAX_ATTEMPTS", 3)
+    engine = create_engine("sqlite://")
+    SQLModel.metadata.create_all(engine)
+    now = datetime(2024, 1, 1, 22)
+
+    def failed(**kwargs):
+        return Consultation(
+            appointment_id=uuid4(), patient_id=uuid4(), doctor_id=uuid4(),
+            status=ConsultationStatus.FAILED, requires_manual_review=True, **kwargs
+        )
+
+    with Session(engine) as session:
+        fresh = failed()
+        due = failed(retry_count=1, next_retry_at=now - timedelta(minutes=1))
+        backing_off = failed(retry_count=1, next_retry_at=now + timedelta(minutes=10))
+        exhausted = failed(retry_count=3)
+        session.add_all([fresh, due, backing_off, exhausted])
+        session.commit()
+        expected = {fresh.id, due.id}
+
+        claimed = RetrySchedulerService.claim_due(session, limit=10, now=now)
+        assert set(claimed) == expected
+
+        session.refresh(due)
+        assert due.retry_count == 2
+        assert due.next_retry_at == now + timedelta(seconds=RetrySchedulerService.backoff_seconds(1))
+        # Claimed items are not picked again until their backoff elapses
+        assert RetrySchedulerService.claim_due(session, limit=10, now=now) == []
+
+@pytest.mark.asyncio
+async def test_sweep_is_skipped_without_quota(monkeypatch):
+    monkeypatch.setattr(RetrySchedulerService, "quota_headroom", staticmethod(lambda: 0))
+    claim = []
+    monkeypatch.setattr(RetrySchedulerService, "claim_due", staticmethod(lambda *a, **k: claim.append(1) or []))
+    assert await RetrySchedulerService.sweep_once(force=True) == []
+    assert claim == []
+
+def test_concurrent_claims_count_one_attempt(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'retry.db'}")
+    SQLModel.metadata.create_all(engine)
+    now = datetime(2024, 1, 1, 22)
+    with Session(engine) as session:
+        consultation = Consultation(
+            appointment_id=uuid4(), patient_id=uuid4(), doctor_id=uuid4(),
+            status=ConsultationStatus.FAILED, requires_manual_review=True,
+        )
+        session.add(consultation)
+        session.commit()
+        consultation_id = consultation.id
+
+    # A second sweep claims the row between this sweep's SELECT and its UPDATE
+    other, raced = [], []
+    def race(connection, cursor, statement, *args):
+        if statement.lstrip().startswith("UPDATE") and not raced:
+            raced.append(True)
+            with Session(engine) as session:
+                other.extend(RetrySchedulerService.claim_due(session, limit=10, now=now))
+    event.listen(engine, "before_cursor_execute", race)
+    with Session(engine) as session:
+        assert RetrySchedulerService.claim_due(session, limit=10, now=now) == []
+    event.remove(engine, "before_cursor_execute", race)
+
+    assert other == [consultation_id]
+    with Session(engine) as session:
+        assert session.get(Consultation, consultation_id).retry_count == 1
@@ -0,0 +1,39 @@
+from app.services.safety_service import SafetyService
+from app.models.base import SOAPNote, PatientProfile
+
+def test_extract_condition_codes():
+    """
+    Free-text history is normalized into sorted condition codes.
+    """
+    codes = SafetyService.extract_condition_codes("History of stomach ULCERS and mild Asthma.")
+    assert codes == ["asthma", "ulcer"]
+    assert SafetyService.extract_condition_codes(None) == []
+
+def test_safety_check_uses_condition_index():
+    """
+    When condition_codes is populated, the check relies on it rather than the history text.
+    """
+    patient = PatientProfile(
+        user_id=None, first_name="Test", last_name="User",
+        medical_history="No relevant history.", condition_codes=["ulcer"]
+    )
+    note = SOAPNote(soap_json={"plan": "Prescribe Aspirin 81mg daily for heart health."})
+
+    warnings = SafetyService.check_drug_interactions(note, patient)
+    assert len(warnings) == 1
+    assert warnings[0]["type"] == "CONTRAINDICATION"
+    assert warnings[0]["condition"] == "ulcer"
+
+def test_safety_check_falls_back_to_history_text(mock_soap_cases):
+    """
+    Profiles without an index (legacy rows) still get checked from medical_history.
+    """
+    for case in mock_soap_cases:
+        p_data = case["patient_profile"]
+        patient = PatientProfile(user_id=None, first_name=p_data["first_name"], last_name=p_data["last_name"], medical_history=p_data.get("medical_history"))
+        indexed = PatientProfile(
+            user_id=None, first_name=p_data["first_name"], last_name=p_data["last_name"],
+            condition_codes=SafetyService.extract_condition_codes(p_data.get("medical_history"))
+        )
+        note = SOAPNote(soap_json=case["soap_note"])
+        assert SafetyService.check_drug_interactions(note, patient) == SafetyService.check_drug_interactions(note, indexed)
@@ -0,0 +1,112 @@
+from datetime import date, datetime, time, timedelta
+from uuid import uuid4
+import pytest
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, select
+from app.core.db import engine
+from app.core.security import create_access_token
+from app.models.base import User, UserRole, DoctorProfile, Appointment, AppointmentStatus
+from app.services.slot_service import SlotService
+
+MONDAY = date(2030, 1, 7)
+
+def seed_doctor():
+    patient = User(email=f"{uuid4()}@test.com", password_hash="pw", role=UserRole.PATIENT)
+    doctor = User(email=f"{uuid4()}@test.com", password_hash="pw", role=UserRole.DOCTOR)
+    with Session(engine) as session:
+        session.add_all([patient, doctor])
+        session.add(DoctorProfile(
+            user_id=doctor.id, first_name="Slot", last_name="Doc",
+            work_start=time(9, 0), work_end=time(11, 0), slot_minutes=30,
+        ))
+        session.commit()
+        return patient.id, doctor.id
+
+def test_slot_starts_follow_working_hours():
+    profile = DoctorProfile(user_id=uuid4(), first_name="A", last_name="B", work_start=time(9, 0), work_end=time(10, 45), slot_minutes=30)
+    # Saturday and Sunday are not working days by default
+    slots = SlotService.slot_starts(profile, MONDAY - timedelta(days=2), MONDAY)
+    assert slots == [datetime(2030, 1, 7, 9, 0), datetime(2030, 1, 7, 9, 30), datetime(2030, 1, 7, 10, 0)]
+    assert SlotService.is_slot_start(profile, datetime(2030, 1, 7, 9, 30))
+    assert not SlotService.is_slot_start(profile, datetime(2030, 1, 7, 9, 15))
+    assert not SlotService.is_slot_start(profile, datetime(2030, 1, 7, 10, 30))
+
+def test_free_slots_skip_overlapping_appointments():
+    patient_id, doctor_id = seed_doctor()
+    with Session(engine) as session:
+        session.add_all([
+            Appointment(patient_id=patient_id, doctor_id=doctor_id, scheduled_at=datetime(2030, 1, 7, 9, 0)),
+            # Off-grid legacy booking overlaps two slots
+            Appointment(patient_id=patient_id, doctor_id=doctor_id, scheduled_at=datetime(2030, 1, 7, 9, 45)),
+            Appointment(patient_id=patient_id, doctor_id=doctor_id, scheduled_at=datetime(2030, 1, 7, 10, 30),
+                        status=AppointmentStatus.CANCELLED),
+        ])
+        session.commit()
+        profile = session.exec(select(DoctorProfile).where(DoctorProfile.user_id == doctor_id)).one()
+        free = SlotService.free_slots(session, profile, MONDAY, MONDAY, now=datetime(2030, 1, 1))
+        assert free == [datetime(2030, 1, 7, 10, 30)]
+        assert SlotService.free_slots(session, profile, MONDAY, MONDAY, now=datetime(2030, 1, 7, 10, 31)) == []
+
+def test_unique_slot_rejects_second_live_booking():
+    patient_id, doctor_id = seed_doctor()
+    slot = datetime(2030, 1, 8, 9, 0)
+    with Session(engine) as first, Session(engine) as second:
+        first.add(Appointment(patient_id=patient_id, doctor_id=doctor_id, scheduled_at=slot))
+        second.add(Appointment(patient_id=patient_id, doctor_id=doctor_id, scheduled_at=slot))
+        first.commit()
+        with pytest.raises(IntegrityError):
+            second.commit()
+
+def test_booking_endpoint(client):
+    patient_id, doctor_id = seed_doctor()
+    headers = {"Authorization": f"Bearer {create_access_token(subject=patient_id, role='PATIENT')}"}
+
+    slots = client.get(f"/api/v1/doctors/{doctor_id}/slots", params={"start": "2030-01-09", "end": "2030-01-09"}).json()
+    assert slots["slot_minutes"] == 30
+    assert len(slots["slots"]) == 4
+
+    def book(scheduled_at):
+        return client.post("/api/v1/appointments/", headers=headers, json={
+            "patient_id": str(patient_id), "doctor_id": str(doctor_id), "doctor_name": "Dr. Doc",
+            "scheduled_at": scheduled_at, "reason": "Headache",
+        })
+
+    assert book(slots["slots"][0]).status_code == 201
+    assert book(slots["slots"][0]).status_code == 409
+    assert book("2030-01-09T09:10:00+00:00").status_code == 400
+    remaining = client.get(f"/api/v1/doctors/{doctor_id}/slots", params={"start": "2030-01-09", "end": "2030-01-09"}).json()
+    assert remaining["slots"] == slots["slots"][1:]
+
+    assert client.get(f"/api/v1/doctors/{doctor_id}/slots", params={"start": "2030-01-09", "end": "2030-03-09"}).status_code == 400
+
+def test_booking_rejects_overlap_with_off_grid_appointment(client):
+    patient_id, doctor_id = seed_doctor()
+    headers = {"Authorization": f"Bearer {create_access_token(subject=patient_id, role='PATIENT')}"}
+    with Session(engine) as session:
+        # Legacy booking at 09:45 (off the 30-minute grid) covers 09:30 and 10:00
+        session.add(Appointment(patient_id=patient_id, doctor_id=doctor_id, scheduled_at=datetime(2030, 1, 10, 9, 45)))
+        session.commit()
+
+    slots = client.get(f"/api/v1/doctors/{doctor_id}/slots", params={"start": "2030-01-10", "end": "2030-01-10"}).json()["slots"]
+    assert [s[11:16] for s in slots] == ["09:00", "10:30"]
+
+    def book(scheduled_at):
+        return client.post("/api/v1/appointments/", headers=headers, json={
+            "patient_id": str(patient_id), "doctor_id": str(doctor_id), "doctor_name": "Dr. Doc",
+            "scheduled_at": scheduled_at, "reason": "Headache",
+        })
+
+    assert book("2030-01-10T09:30:00+00:00").status_code == 409
+    assert book("2030-01-10T10:00:00+00:00").status_code == 409
+    assert book("2030-01-10T10:30:00+00:00").status_code == 201
+
+def test_free_slots_respect_longer_booked_durations():
+    patient_id, doctor_id = seed_doctor()
+    with Session(engine) as session:
+        # Booked when the doctor still used 60-minute slots
+        session.add(Appointment(patient_id=patient_id, doctor_id=doctor_id, scheduled_at=datetime(2030, 1, 11, 9, 0), duration_minutes=60))
+        session.commit()
+        profile = session.exec(select(DoctorProfile).where(DoctorProfile.user_id == doctor_id)).one()
+        free = SlotService.free_slots(session, profile, date(2030, 1, 11), date(2030, 1, 11), now=datetime(2030, 1, 1))
+        assert free == [datetime(2030, 1, 11, 10, 0), datetime(2030, 1, 11, 10, 30)]
+        assert SlotService.has_overlap(session, doctor_id, datetime(2030, 1, 11, 9, 30), 30)
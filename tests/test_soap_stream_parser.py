@@ -0,0 +1,40 @@
+import json
+from app.services.soap_stream_parser import SoapStreamParser
+
+SOAP_RESPONSE = {
+    "soap_note": {
+        "subjective": "Headache for \"two\" days, worse at night.",
+        "objective": "BP 120/80. Temp 37.1",
+        "assessment": "Tension headache {likely}",
+        "plan": "Rest; ibuprofen 400mg.\nFollow up in 1 week."
+    },
+    "low_confidence": ["night", "ibuprofen"],
+    "risk_flags": []
+}
+
+def test_sections_are_emitted_as_they_complete():
+    text = json.dumps(SOAP_RESPONSE, indent=2)
+    parser = SoapStreamParser()
+    events = []
+    # Feed in small, uneven chunks to mimic a streamed response
+    for i in range(0, len(text), 7):
+        events.extend(parser.feed(text[i:i + 7]))
+
+    assert [section for section, _ in events] == ["subjective", "objective", "assessment", "plan"]
+    assert dict(events) == SOAP_RESPONSE["soap_note"]
+
+def test_section_emitted_before_response_is_complete():
+    text = json.dumps(SOAP_RESPONSE)
+    cut = text.index('"objective"')
+    parser = SoapStreamParser()
+    assert parser.feed("```json\n" + text[:cut]) == [("subjective", SOAP_RESPONSE["soap_note"]["subjective"])]
+
+def test_nested_strings_outside_soap_note_are_ignored():
+    parser = SoapStreamParser()
+    events = parser.feed(json.dumps({"risk_flags": ["plan"], "meta": {"plan": "not a section"}}))
+    assert events == []
+
+def test_raw_control_characters_in_strings_are_tolerated():
+    parser = SoapStreamParser()
+    events = parser.feed('{"soap_note": {"plan": "Rest.\nFollow up"}}')
+    assert events == [("plan", "Rest.\nFollow up")]
@@ -0,0 +1,37 @@
+from app.services.transcript_stitching_service import TranscriptStitchingService
+
+def test_overlap_is_deduplicated_and_speakers_relabeled():
+    chunks = [
+        {"start_ms": 0, "own_start_ms": 0, "own_end_ms": 10000},
+        {"start_ms": 8000, "own_start_ms": 10000, "own_end_ms": 20000},
+    ]
+    results = [
+        {"id": "t1", "confidence": 0.9, "utterances": [
+            {"speaker": "A", "text": "What brings you in?", "start": 0, "end": 4000},
+            {"speaker": "B", "text": "I have a headache.", "start": 5000, "end": 9000},
+            # Heard in the overlap; its midpoint (10.5s) belongs to the second chunk
+            {"speaker": "A", "text": "Since when?", "start": 9500, "end": 11500},
+        ]},
+        # The second chunk's diarizer named the speakers the other way round
+        {"id": "t2", "confidence": 0.7, "utterances": [
+            {"speaker": "A", "text": "I have a headache.", "start": 0, "end": 1000},
+            {"speaker": "B", "text": "Since when?", "start": 1500, "end": 3500},
+            {"speaker": "A", "text": "Two days.", "start": 4000, "end": 6000},
+        ]},
+    ]
+
+    result = TranscriptStitchingService.stitch(chunks, results)
+
+    assert [(u["speaker"], u["text"]) for u in result["utterances"]] == [
+        ("A", "What brings you in?"),
+        ("B", "I have a headache."),
+        ("A", "Since when?"),
+        ("B", "Two days."),
+    ]
+    assert result["utterances"][-1]["start"] == 12000
+    assert result["text"] == "What brings you in? I have a headache. Since when? Two days."
+    assert abs(result["confidence"] - 0.8) < 1e-9
+
+def test_single_chunk_passes_through():
+    result = {"id": "t1", "text": "hello", "utterances": [], "confidence": 0.5}
+    assert TranscriptStitchingService.stitch([{"start_ms": 0, "own_start_ms": 0, "own_end_ms": 1000}], [result]) is result
@@ -20,17 +20,17 @@ engine = create_engine(sqlite_url)
 SQLModel.metadata.create_all(engine)
 
 @patch("app.services.consultation_processor.engine", engine)
-@patch("app.services.consultation_processor.AssemblyAIService")
-@patch("app.services.consultation_processor.GeminiService")
+@patch("app.services.consultation_processor.get_stt_service")
+@patch("app.services.consultation_processor.get_llm_service")
 async def test_flow(MockGemini, MockAssemblyAI):
     # Setup Mocks to be awaitable
-    MockAssemblyAI.transcribe_audio_async = AsyncMock(return_value={
+    MockAssemblyAI.return_value.transcribe_audio_async = AsyncMock(return_value={
         "text": "Patient has a headache.",
         "utterances": [{"speaker": "A", "text": "Patient has a headache."}],
         "confidence": 0.98
     })
     
-    MockGemini.generate_soap_note_async = AsyncMock(return_value={
+    MockGemini.return_value.generate_soap_note_async = AsyncMock(return_value={
         "soap_note": {
             "subjective": "Headache",
             "objective": "None",